@@ -1,20 +1,58 @@
-from fastapi import FastAPI, APIRouter, Request, Query, Depends, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, Request, Response, Query, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import List, Dict
+import asyncio
+import json
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import and_, or_
+from sqlalchemy.sql import text
 import uvicorn
 
 from settings.get_config import get_config
 from database.models.mysql import SettingsModel
-from api.mysql.models import SettingResponse, SettingUpdate, SettingCreate
+from api.mysql.models import SettingResponse, SettingUpdate, SettingCreate, SettingBatchUpdate
+from api.mysql.snapshot import SettingsSnapshot
 from database.connectors.connector import get_client
+from database.connectors import sql_stats
 from logger import sender as lg
 
 
-app = FastAPI()  # Создание FastApi приложения
 config = get_config()  # Получение локальных настроек
 DB = get_client("mysql", **config['mysql'])
 
+MYSQL_DUPLICATE_KEY = 1062  # Код ошибки MySQL ER_DUP_ENTRY
+SNAPSHOT = SettingsSnapshot(DB, **config.get("settings_snapshot", {}))  # Снимок таблицы настроек в памяти
+INSTANCE_LOCK = "airborne_settings_api"  # Именованная блокировка MySQL: один экземпляр API на БД
+
+
+# Блокировка единственного экземпляра: снимок, его версия и ETag живут в памяти процесса, поэтому
+# второй процесс (worker uvicorn или реплика) отдавал бы устаревшие данные и другие ETag.
+# Блокировка держится отдельным соединением до остановки API
+async def acquire_instance_lock():
+    if not await DB.is_connected():
+        raise RuntimeError("MySQL недоступна: не удалось проверить единственность экземпляра API настроек")
+
+    connection = await DB.engine.connect()
+    if not await connection.scalar(text("SELECT GET_LOCK(:name, 0)"), {"name": INSTANCE_LOCK}):
+        await connection.close()
+        raise RuntimeError("API настроек уже запущен (workers > 1 или вторая реплика): поддерживается один экземпляр")
+    return connection
+
+
+# Один экземпляр API, загрузка снимка при запуске и его фоновая перезагрузка
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    lock = await acquire_instance_lock()
+    await SNAPSHOT.ensure_loaded()
+    refresher = asyncio.create_task(SNAPSHOT.refresh_loop())
+    yield
+    refresher.cancel()
+    await asyncio.gather(refresher, return_exceptions=True)
+    await lock.close()
+
+
+app = FastAPI(lifespan=lifespan)  # Создание FastApi приложения
+
 
 # Предоставление URL адреса для подключения
 def get_url():
@@ -47,86 +85,144 @@ async def log_requests(request: Request, call_next):
     return response
 
 
+# Статистика процесса: задержки запросов к БД, пулы соединений, очереди логера
+@app.get("/stats")
+async def get_stats():
+    return {
+        "database": sql_stats.stats(),
+        "logger": lg.get_stats(),
+    }
+
+
+# Проверка If-None-Match: снимок не менялся с прошлого ответа клиента
+def not_modified(request: Request, response: Response) -> bool:
+    response.headers["ETag"] = SNAPSHOT.etag
+    response.headers["Cache-Control"] = "no-cache"  # Кэшировать можно, но только с ревалидацией
+    return request.headers.get("If-None-Match") == SNAPSHOT.etag
+
+
 # Получение настроек с поиском по key, tag, type, editable
 @app.get("/secret", response_model=List[SettingResponse])
-async def get_settings(key: str = Query(None), tag: str = Query(None), value_type: str = Query(None), editable: bool = Query(None)):
-    filters = []
-
-    # Добавляем параметры в фильтрацию
-    if key is not None:
-        filters.append(SettingsModel.key == key)
-    if tag is not None:
-        filters.append(SettingsModel.tag == tag)
-    if value_type is not None:
-        filters.append(SettingsModel.type == value_type)
-    if editable is not None:
-        filters.append(SettingsModel.editable == editable)
-
-    result = await DB.select_model(
-        model=SettingsModel,
-        filters=and_(*filters) if filters else None
-    )
-    return result
+async def get_settings(request: Request, response: Response, key: str = Query(None), tag: str = Query(None), value_type: str = Query(None), editable: bool = Query(None)):
+    await SNAPSHOT.ensure_loaded()
+    if not_modified(request, response):
+        return Response(status_code=304, headers=dict(response.headers))
+
+    return SNAPSHOT.select(key=key, tag=tag, value_type=value_type, editable=editable)
 
 
 # Получение множества значений ключей
 @app.get("/secret/many", response_model=Dict[str, str])
-async def get_list_settings(keys: List[str] = Query(None), tag: str = Query(None)):
-    filters = []
+async def get_list_settings(request: Request, response: Response, keys: List[str] = Query(None), tag: str = Query(None)):
+    await SNAPSHOT.ensure_loaded()
+    if not_modified(request, response):
+        return Response(status_code=304, headers=dict(response.headers))
 
-    if keys:
-        filters.append(SettingsModel.key.in_(keys))
-    if tag:
-        filters.append(SettingsModel.tag == tag)
+    return SNAPSHOT.values(keys=keys, tag=tag)
 
-    if not filters:
-        return {}
 
-    results = await DB.select_model(
-        model=SettingsModel,
-        filters=or_(*filters)
-    )
+# Ожидание изменений настроек после версии since (long-poll или SSE при Accept: text/event-stream)
+@app.get("/secret/watch")
+async def watch_settings(request: Request, since: int = Query(0), boot: str = Query(None), timeout: float = Query(30, ge=0, le=120)):
+    await SNAPSHOT.ensure_loaded()
+
+    # Клиент помнит версию другого запуска API - начинаем с полного сброса
+    if boot is not None and boot != SNAPSHOT.boot_id:
+        since = -1
+
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(watch_events(request, since, timeout), media_type="text/event-stream")
+
+    if since == SNAPSHOT.version:
+        await SNAPSHOT.wait(since, timeout)
+    return {"boot": SNAPSHOT.boot_id, **SNAPSHOT.changes_since(since)}
 
-    return {setting.key: setting.value for setting in results}
 
+# Поток событий SSE: событие на каждую новую версию, комментарий keep-alive по таймауту
+async def watch_events(request: Request, since: int, timeout: float):
+    while not await request.is_disconnected():
+        if since != SNAPSHOT.version:
+            data = {"boot": SNAPSHOT.boot_id, **SNAPSHOT.changes_since(since)}
+            since = data["version"]
+            yield f"id: {since}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        elif not await SNAPSHOT.wait(since, timeout):
+            yield ": keep-alive\n\n"
 
-# Добавление новых настроек
+
+# Добавление новых настроек (уникальность ключа проверяет первичный ключ таблицы)
 @app.post("/secret", response_model=SettingResponse)
 async def create_setting(payload: SettingCreate):
-    # Проверка, есть ли уже такая настройка
-    existing = await DB.select_model(SettingsModel, SettingsModel.key == payload.key, fetch_one=True)
-    if existing:
-        raise HTTPException(status_code=409, detail="Setting with this key already exists")
-
     try:
-        await DB.insert_model(SettingsModel, payload.dict())
-        return payload
-    except IntegrityError:
+        created = await DB.insert_model(SettingsModel, payload.dict(), refresh=False, raise_conflict=True)
+    except IntegrityError as e:
+        # 409 только для дубликата ключа (ER_DUP_ENTRY), остальные нарушения (NOT NULL, CHECK, FK) - 400
+        if getattr(e.orig, "args", None) and e.orig.args[0] == MYSQL_DUPLICATE_KEY:
+            raise HTTPException(status_code=409, detail="Setting with this key already exists")
         raise HTTPException(status_code=400, detail="Invalid data")
 
+    if created is None:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+
+    await SNAPSHOT.apply(payload.key, created)
+    return created
 
-# Обновление настроек с поиском по ключу
-@app.put("/secret/{key}", response_model=SettingResponse)
-async def update_setting(key: str, payload: SettingUpdate):
-    # Проверка, что запись существует
-    existing = await DB.select_model(SettingsModel, SettingsModel.key == key, fetch_one=True)
-    if not existing:
-        raise HTTPException(status_code=404, detail="Setting not found")
 
-    # Проверка, что запись поддается изменения
-    if existing.editable is False:
-        raise HTTPException(status_code=400, detail="No change this secret")
+# Причина, по которой ключи не обновлены: запись отсутствует (404) или не поддается изменению (400)
+async def reject_update(keys: List[str]):
+    found = await DB.select_rows(SettingsModel, columns=["key"], filters=SettingsModel.key.in_(keys))
+    missing = sorted(set(keys) - {row["key"] for row in found})
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Setting not found: {', '.join(missing)}")
+    raise HTTPException(status_code=400, detail=f"No change this secret: {', '.join(sorted(keys))}")
 
+
+# Обновление настроек с поиском по ключу (одно условное UPDATE, только для изменяемых записей)
+@app.put("/secret/{key}", response_model=SettingResponse)
+async def update_setting(key: str, payload: SettingUpdate):
     # Проверка на разрешенные поля
     new_data = payload.dict(exclude_unset=True)
     if not new_data:
         raise HTTPException(status_code=400, detail="No valid fields provided")
 
-    # Обновление записи
-    await DB.update_fields(SettingsModel, {"key": key}, new_data)
-
-    # Возврат обновлённой записи
-    updated = await DB.select_model(SettingsModel, SettingsModel.key == key, fetch_one=True)
+    updated = await DB.update_where(
+        SettingsModel,
+        (SettingsModel.key == key) & SettingsModel.editable.is_(True),
+        new_data,
+        returning=True,
+    )
+    if updated is None:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    if not updated:
+        await reject_update([key])
+
+    await SNAPSHOT.apply(key, updated[0])
+    return updated[0]
+
+
+# Пакетное обновление настроек в одной транзакции (все ключи или ни одного)
+@app.put("/secret", response_model=List[SettingResponse])
+async def update_settings(payload: List[SettingBatchUpdate]):
+    items = []
+    for item in payload:
+        new_data = item.dict(exclude_unset=True, exclude={"key"})
+        if not new_data:
+            raise HTTPException(status_code=400, detail=f"No valid fields provided: {item.key}")
+        items.append(((SettingsModel.key == item.key) & SettingsModel.editable.is_(True), new_data))
+
+    keys = [item.key for item in payload]
+    if len(set(keys)) != len(keys):
+        raise HTTPException(status_code=400, detail="Duplicate keys in batch")
+
+    results = await DB.update_batch(SettingsModel, items, returning=True)
+    if results is None:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+
+    failed = [key for key, rows in zip(keys, results) if not rows]
+    if failed:
+        await reject_update(failed)
+
+    updated = [rows[0] for rows in results]
+    await SNAPSHOT.apply_many(updated)
     return updated
 
 
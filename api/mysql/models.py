@@ -24,3 +24,7 @@ class SettingUpdate(BaseModel):
     value: str | None = None
     tag: str | None = None
     description: str | None = None
+
+
+class SettingBatchUpdate(SettingUpdate):
+    key: str
@@ -0,0 +1,153 @@
+import asyncio  # Блокировки и ожидание изменений
+import time  # Время последней полной загрузки
+import uuid  # Идентификатор запуска API
+from collections import deque  # История изменений
+from typing import Dict, Any, Iterable, List, Optional  # Типы данных
+
+from database.models.mysql import SettingsModel  # Модель таблицы настроек
+
+
+# Снимок таблицы settings в памяти процесса с монотонной версией.
+# Версия, ETag и ожидание изменений действуют в пределах процесса: API настроек работает одним экземпляром
+# (одним процессом uvicorn), это обеспечивает блокировка MySQL в api.mysql.fastapi_app
+class SettingsSnapshot:
+    def __init__(self, client, refresh_interval: float = 300, history: int = 1000):
+        """
+        :param client: SqlClient для чтения таблицы settings
+        :param refresh_interval: Период полной перезагрузки снимка (изменения в обход API)
+        :param history: Количество изменений, хранимых для /secret/watch
+        """
+
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.boot_id = uuid.uuid4().hex[:8]  # Версии разных запусков API не сравниваются
+
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self.version = 0
+        self.loaded_at = 0.0
+        self.changes = deque(maxlen=history)  # (версия, ключ, тэг)
+
+        self._lock = asyncio.Lock()  # Последовательные загрузки и изменения
+        self._changed = asyncio.Condition()  # Пробуждение ожидающих изменений
+
+    # ETag текущей версии
+    @property
+    def etag(self) -> str:
+        return f'W/"{self.boot_id}-{self.version}"'
+
+    # Первая загрузка снимка (если при запуске БД была недоступна - при первом запросе)
+    async def ensure_loaded(self):
+        if self.loaded_at:
+            return
+        async with self._lock:
+            if not self.loaded_at:
+                await self._load()
+
+    # Периодическая перезагрузка в фоновой задаче (изменения в обход API), не на пути запроса
+    async def refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                async with self._lock:
+                    await self._load()
+            except Exception as e:
+                print(f"[SettingsSnapshot][ERROR] Ошибка перезагрузки снимка настроек: {e}")
+
+    # Полная загрузка таблицы с заменой снимка одной операцией
+    async def _load(self):
+        rows = await self.client.select_rows(SettingsModel)
+        if not rows and not await self.client.is_connected():
+            return  # БД недоступна - продолжаем отдавать прежний снимок
+
+        fresh = {row["key"]: row for row in rows}
+        changed = [
+            (key, (fresh.get(key) or self.rows.get(key)).get("tag"))
+            for key in fresh.keys() | self.rows.keys()
+            if fresh.get(key) != self.rows.get(key)
+        ]
+
+        self.rows = fresh
+        self.loaded_at = time.monotonic()
+        if changed:
+            await self._publish(changed)
+
+    # Применение изменения, записанного через API (row=None - запись удалена)
+    async def apply(self, key: str, row: Optional[Dict[str, Any]]):
+        async with self._lock:
+            previous = self.rows.get(key)
+            rows = dict(self.rows)
+            if row is None:
+                rows.pop(key, None)
+            else:
+                rows[key] = dict(row)
+            self.rows = rows
+
+            # Изменение тэга затрагивает выборки по старому и новому тэгу
+            tags = {(previous or {}).get("tag"), (row or {}).get("tag")}
+            await self._publish([(key, tag) for tag in tags])
+
+    # Применение пакета изменений одной версией
+    async def apply_many(self, rows: Iterable[Dict[str, Any]]):
+        async with self._lock:
+            current = dict(self.rows)
+            changed = []
+            for row in rows:
+                previous = current.get(row["key"])
+                current[row["key"]] = dict(row)
+                changed.extend((row["key"], tag) for tag in {(previous or {}).get("tag"), row.get("tag")})
+            self.rows = current
+            if changed:
+                await self._publish(changed)
+
+    # Увеличение версии и уведомление ожидающих
+    async def _publish(self, changed: List[tuple]):
+        async with self._changed:
+            self.version += 1
+            for key, tag in changed:
+                self.changes.append((self.version, key, tag))
+            self._changed.notify_all()
+
+    # Выборка настроек из снимка (все условия через AND)
+    def select(self, key: str = None, tag: str = None, value_type: str = None, editable: bool = None) -> List[Dict[str, Any]]:
+        if key is not None:
+            row = self.rows.get(key)
+            rows = [row] if row is not None else []
+        else:
+            rows = self.rows.values()
+
+        return [
+            row for row in rows
+            if (tag is None or row["tag"] == tag)
+            and (value_type is None or row["type"] == value_type)
+            and (editable is None or row["editable"] == editable)
+        ]
+
+    # Значения по списку ключей или тэгу (условия через OR)
+    def values(self, keys: Optional[List[str]] = None, tag: str = None) -> Dict[str, str]:
+        result = {}
+        for key in keys or ():
+            row = self.rows.get(key)
+            if row is not None:
+                result[key] = row["value"]
+        if tag:
+            result.update({row["key"]: row["value"] for row in self.rows.values() if row["tag"] == tag})
+        return result
+
+    # Изменения после версии since (reset - клиенту нужно сбросить весь кэш)
+    def changes_since(self, since: int) -> Dict[str, Any]:
+        oldest = self.changes[0][0] if self.changes else self.version + 1
+        reset = since > self.version or (since < self.version and since < oldest - 1)
+        return {
+            "version": self.version,
+            "reset": reset,
+            "changes": [{"key": key, "tag": tag} for version, key, tag in self.changes if version > since],
+        }
+
+    # Ожидание версии новее since (не дольше timeout секунд)
+    async def wait(self, since: int, timeout: float) -> bool:
+        try:
+            async with self._changed:
+                await asyncio.wait_for(self._changed.wait_for(lambda: self.version != since), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
@@ -0,0 +1,154 @@
+import asyncio  # Объединение одновременных запросов
+import json  # Сериализация (если orjson не установлен)
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional  # Типы данных
+
+try:
+    import orjson  # Быстрая компактная сериализация (необязательная зависимость)
+except ImportError:
+    orjson = None
+
+
+# Сериализация записей (datetime -> ISO 8601)
+def dumps(value: Any):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def loads(value):
+    return orjson.loads(value) if orjson is not None else json.loads(value)
+
+
+# Запись выборки, только если с начала загрузки не было инвалидации (поколение в Redis не изменилось):
+# устаревшая загрузка любого процесса не попадает в кэш после сброса, выполненного другим процессом
+FILL_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+local ttl = tonumber(ARGV[3])
+if ttl > 0 then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ttl)
+else
+    redis.call('SET', KEYS[1], ARGV[2])
+end
+for i = 3, #KEYS do
+    redis.call('SADD', KEYS[i], KEYS[1])
+    if ttl > 0 then
+        redis.call('EXPIRE', KEYS[i], ttl * 2)
+    end
+end
+return 1
+"""
+
+
+# Кэш выборок базы знаний в Redis (read-through) с индексами по id и тэгу для инвалидации
+class KnowledgeCache:
+    PREFIX = "knowledge"
+    GENERATION = f"{PREFIX}:generation"  # Растет при каждой инвалидации (общий для всех процессов)
+
+    def __init__(self, redis_client, ttl: int = 300, enabled: bool = True):
+        """
+        :param redis_client: RedisClient (None - кэш отключен, все запросы идут в БД)
+        :param ttl: Время жизни записей кэша (сек)
+        :param enabled: Использовать кэш
+        """
+
+        self.redis = redis_client
+        self.ttl = int(ttl)
+        self.enabled = enabled and redis_client is not None
+
+        # Загрузки, выполняющиеся сейчас: ключ -> Future (холодный ключ читается из БД один раз)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    # Ключ выборки по параметрам запроса
+    def query_key(self, **params) -> str:
+        return f"{self.PREFIX}:q:" + "|".join(f"{name}={params[name]}" for name in sorted(params) if params[name] is not None)
+
+    # Индексы выборки: по id, по тэгу или общий (выборки без id и тэга)
+    def indexes(self, id: Optional[int] = None, tag: Optional[str] = None, **_) -> List[str]:
+        index = []
+        if id is not None:
+            index.append(f"{self.PREFIX}:idx:id:{id}")
+        if tag is not None:
+            index.append(f"{self.PREFIX}:idx:tag:{tag}")
+        return index or [f"{self.PREFIX}:idx:all"]
+
+    # Получение выборки из кэша или из БД через loader
+    async def get_or_load(self, loader: Callable[[], Awaitable[List[Dict[str, Any]]]], **params) -> List[Dict[str, Any]]:
+        if not self.enabled:
+            return await loader()
+
+        key = self.query_key(**params)
+        while True:
+            cached = await self.redis.get_raw(key)
+            if cached is not None:
+                self.hits += 1
+                return loads(cached)
+
+            # Ключ уже загружается другим запросом - ждем его результат
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self.coalesced += 1
+            await asyncio.wait({inflight})  # Отмена этого запроса не затрагивает загрузку
+            if not inflight.cancelled():
+                return inflight.result()
+            # Запрос, выполнявший загрузку, отменен (клиент отключился) - повторяем попытку
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            generation = await self.redis.get_raw(self.GENERATION)  # До чтения из БД
+            rows = await loader()
+            future.set_result(rows)
+        except asyncio.CancelledError:
+            future.cancel()  # Ожидающие запросы не получают чужую отмену, а загружают ключ сами
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Ошибка уже передана ожидающим, не логируем ее повторно
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        if rows is not None:
+            await self.redis.run_script(
+                FILL_SCRIPT,
+                keys=[key, self.GENERATION, *self.indexes(**params)],
+                args=[generation or b"", dumps(rows), self.ttl],
+            )
+        return rows
+
+    # Сброс выборок, затронутых изменением записи (по id и по старому/новому тэгу)
+    async def invalidate(self, id: Optional[int] = None, tags: Iterable[Optional[str]] = ()):
+        if not self.enabled:
+            return
+
+        self.invalidations += 1
+        index = [f"{self.PREFIX}:idx:all"]
+        if id is not None:
+            index.append(f"{self.PREFIX}:idx:id:{id}")
+        index.extend(f"{self.PREFIX}:idx:tag:{tag}" for tag in set(tags) if tag is not None)
+
+        # Сначала новое поколение (загрузки, начатые раньше, уже не запишутся), затем удаление выборок
+        await self.redis.batch([("incr", self.GENERATION)])
+        await self.redis.delete(index=index)
+
+    # Счетчики попаданий и промахов
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "hit_ratio": round((self.hits + self.coalesced) / total, 4) if total else 0.0,
+            "redis": self.redis.stats() if self.redis is not None else None,
+        }
@@ -1,22 +1,38 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 import uvicorn
-import requests
 
-from api.mysql.fastapi_app import get_url  # Получение URL API настроек
+from settings import client as settings_client  # Клиент API настроек (кэш)
 from logger import sender as lg  # Логер
-from api.postgres.routes import knowledge
+from database.connectors import sql_stats  # Статистика запросов к БД
+from api.postgres.routes import knowledge, activity
+from storage import converter  # Очередь конвертации файлов
 
 
 def get_api_settings():
-    data = requests.get(f"{get_url()}/secret/many?tag=api").json()
+    data = settings_client.get_many(tag="api")
     return {
         "host": data.get("api_host"),
         "port": int(data.get("api_port"))
     }
 
 
-app = FastAPI()  # Создание FastApi приложения
+# Отслеживание изменений настроек и подключение к очереди конвертации на время работы приложения
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    client = settings_client.get_settings_client()
+    client.start_watch()
+    await converter.publisher.connect()  # Не на пути первой загрузки файла
+    await knowledge.FILES_REDIS.connect()  # Отслеживание сброса кэша файлов другими процессами
+    yield
+    await knowledge.FILES_REDIS.close()
+    await converter.publisher.close()
+    await client.close()
+
+
+app = FastAPI(lifespan=lifespan)  # Создание FastApi приложения
 app.include_router(knowledge.router)  # Присоединение путей запросов
+app.include_router(activity.router)
 
 config = get_api_settings()  # Получение настроек API
 
@@ -52,6 +68,16 @@ async def log_requests(request: Request, call_next):
     return response
 
 
+# Статистика процесса: задержки запросов к БД, пулы соединений, очереди логера
+@app.get("/stats")
+async def get_stats():
+    return {
+        "database": sql_stats.stats(),
+        "logger": lg.get_stats(),
+        "knowledge_cache": knowledge.CACHE.stats(),
+    }
+
+
 if __name__ == "__main__":
     # Запуск API для общения с PostgreSQL
     uvicorn.run(
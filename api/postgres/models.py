@@ -12,6 +12,7 @@ class Knowledge:
         tag: str
         description: str
         value: str
+        meta: dict | None = None
 
     class Create(BaseModel):
         editor: int
@@ -19,6 +20,7 @@ class Knowledge:
         tag: str | None = None
         description: str | None = None
         value: str
+        meta: dict = {}
 
     class Update(BaseModel):
         edited: datetime
@@ -27,3 +29,4 @@ class Knowledge:
         tag: str | None = None
         description: str | None = None
         value: str
+        meta: dict | None = None
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import Response
+from typing import Optional
+
+from database.connectors.connector import get_client  # Подключение к Redis
+from settings import client as settings_client  # Клиент API настроек (кэш)
+from scheduler.jobs.sync_redis_sql import SyncEngine  # Счетчики активности в Redis (перенос в БД - sync_redis_sql)
+
+
+# Получение настроек подключения к Redis
+def get_redis_settings():
+    data = settings_client.get_many(tag="redis")
+    return {
+        "host": data.get("rd_host", "localhost"),
+        "port": int(data.get("rd_port", 6379)),
+        "username": data.get("rd_username"),
+        "password": data.get("rd_password"),
+        "database": data.get("rd_database", "0"),
+    }
+
+
+router = APIRouter()  # Подключение роутера
+SYNC = SyncEngine(get_client("redis", **get_redis_settings()))  # Только запись счетчиков, перенос в БД выполняет планировщик
+
+
+# Запрос пользователя к боту: request_total, request_first, request_last
+@router.post("/activity/request", status_code=204)
+async def post_request(
+    user_id: int = Query(..., description="ID пользователя"),
+    timestamp: Optional[float] = Query(None, description="Время запроса (epoch), по умолчанию - текущее"),
+):
+    if not await SYNC.track_request(user_id, timestamp):
+        raise HTTPException(status_code=503, detail="Redis недоступен")
+    return Response(status_code=204)
+
+
+# Просмотр новости пользователем
+@router.post("/activity/view", status_code=204)
+async def post_view(
+    news_id: int = Query(..., description="ID новости"),
+    user_id: int = Query(..., description="ID пользователя"),
+):
+    if not await SYNC.track_view(news_id, user_id):
+        raise HTTPException(status_code=503, detail="Redis недоступен")
+    return Response(status_code=204)
@@ -1,24 +1,29 @@
-from fastapi import APIRouter, Query, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Query, HTTPException, UploadFile, File, Form, Request
+from fastapi.responses import FileResponse, Response
 from sqlalchemy import and_
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from typing import List, Optional, Literal
+from email.utils import parsedate_to_datetime
+import asyncio
 from pydantic import ValidationError
 from pathlib import Path
-import requests
-import shutil
 import os
 
-from database.connectors.connector import get_client  # Подключение к PostgreSQL
-from api.mysql.fastapi_app import get_url  # Получение url API настроек
-from database.models.postgresql import KnowledgeModel  # Модель таблиц БД
+from database.connectors.connector import get_client  # Подключение к PostgreSQL и Redis
+from settings.get_config import get_config  # Получение локального конфига
+from api.postgres.cache import KnowledgeCache  # Кэш выборок в Redis
+from database.connectors.redis_client import LocalCache  # LRU кэш процесса
+from storage.uploader import BlobStore, UploadTooLarge, add_ref, release_ref, CHUNK_SIZE  # Хранилище файлов по содержимому
+from storage import converter  # Очередь конвертации файлов
+from settings import client as settings_client  # Клиент API настроек (кэш)
+from database.models.postgresql import KnowledgeModel, BlobVariantsModel  # Модель таблиц БД
 from api.postgres.models import Knowledge  # Модели HTTP запросов
 from logger import sender as lg  # Логер
 
 
 # Получение настроек подключения к Postgre
 def get_connection_settings():
-    data = requests.get(f"{get_url()}/secret/many?tag=postgres").json()
+    data = settings_client.get_many(tag="postgres")
     return {
         "host": data.get("pg_host"),
         "port": int(data.get("pg_port")),
@@ -28,17 +33,93 @@ def get_connection_settings():
     }
 
 
+# Получение настроек подключения к Redis
+def get_redis_settings():
+    data = settings_client.get_many(tag="redis")
+    return {
+        "host": data.get("rd_host", "localhost"),
+        "port": int(data.get("rd_port", 6379)),
+        "username": data.get("rd_username"),
+        "password": data.get("rd_password"),
+        "database": data.get("rd_database", "0"),
+    }
+
+
 router = APIRouter()  # Подключение роутера
 config = get_connection_settings()  # Получение настроек подключения к БД
 DB = get_client("postgres", **config)  # Подключение к БД
 
+cache_config = get_config().get("knowledge_cache", {})
+CACHE = KnowledgeCache(
+    get_client("redis", **get_redis_settings()) if cache_config.get("enabled", True) else None,
+    ttl=cache_config.get("ttl", 300),
+)  # Кэш выборок базы знаний
+
+BLOBS = BlobStore()  # Файлы базы знаний (одинаковое содержимое хранится один раз)
+
+storage_config = get_config().get("storage", {})
+FILE_PREFIX = "knowledge:file:"  # Ключи кэша файлов: knowledge:file:{id}, knowledge:file:{id}:{variant}
+FILES_REDIS = get_client(
+    "redis", **get_redis_settings(),
+    local_cache=True,
+    local_cache_prefixes=[FILE_PREFIX],
+    local_cache_size=int(storage_config.get("file_cache_size", 10000)),
+    local_cache_ttl=float(storage_config.get("file_cache_ttl", 300)),
+)  # Сброс кэша файлов во всех процессах API - уведомлениями Redis CLIENT TRACKING (BCAST)
+FILES: LocalCache = FILES_REDIS.local_cache  # id записи -> путь и заголовки файла (повторные скачивания без запроса к БД)
+BLOB_MAX_AGE = int(storage_config.get("cache_max_age", 31536000))  # Блоб по хэшу никогда не меняется
+ACCEL_REDIRECT = storage_config.get("accel_redirect") or None  # Внутренний location nginx для отдачи блобов
+
+
+BLOB_META = ("sha256", "size")  # Поля метаданных файла: задаются только загрузкой, не клиентом
+
+
+# Метаданные от клиента без полей файла (иначе запись могла бы ссылаться на чужой блоб)
+def client_meta(meta: Optional[dict]) -> dict:
+    return {key: value for key, value in (meta or {}).items() if key not in BLOB_META}
+
+
+# Ключ кэша FILES: исходный файл или вариант конвертации
+def file_key(id: int, variant: Optional[str] = None) -> str:
+    return f"{FILE_PREFIX}{id}:{variant}" if variant else f"{FILE_PREFIX}{id}"
+
+
+# Ключи кэша FILES записи: исходный файл и все варианты конвертации (тип записи мог измениться)
+def file_keys(id: int) -> List[str]:
+    names = {name for specs in converter.VARIANTS.values() for name in specs}
+    return [file_key(id), *(file_key(id, name) for name in sorted(names))]
+
+
+# Сброс кэша файлов записи: в этом процессе сразу, в остальных - по уведомлению Redis об изменении ключей
+async def invalidate_files(id: int):
+    keys = file_keys(id)
+    FILES.invalidate(keys)
+    await FILES_REDIS.batch([("setex", key, 60, 1) for key in keys])  # Запись ключа - повод для уведомления
+
+
+# Совпадение ETag с заголовком If-None-Match (слабое сравнение, как для GET)
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+# Файл не изменялся с даты If-Modified-Since (учитывается, только если нет If-None-Match)
+def not_modified_since(if_modified_since: str, mtime: float) -> bool:
+    try:
+        return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
 
 # Получение компонентов по ID, TAG, TYPE
 @router.get("/knowledge", response_model=List[Knowledge.Response])
 async def get_knowledge(
         id: Optional[int] = Query(None, description="ID записи для поиска"),
         tag: Optional[str] = Query(None, description="Тэг для поиска записи"),
-        type_: Optional[str] = Query(None, alias="type", description="Тип записи для поиска")
+        type_: Optional[str] = Query(None, alias="type", description="Тип записи для поиска"),
+        limit: Optional[int] = Query(None, ge=1, le=1000, description="Максимальное количество записей"),
+        offset: Optional[int] = Query(None, ge=0, description="Смещение выборки"),
+        after_id: Optional[int] = Query(None, description="ID последней записи предыдущей страницы")
 ):
     """
     Получение компонентов из БД с фильтрацией по полям
@@ -46,6 +127,9 @@ async def get_knowledge(
     :param id: ID компонента
     :param tag: Тэг для поиска компонентов
     :param type_: Тип компонента
+    :param limit: Максимальное количество записей
+    :param offset: Смещение выборки (пагинация limit/offset)
+    :param after_id: ID последней записи предыдущей страницы (keyset-пагинация)
     :return: Запись\Записи из БД
     """
 
@@ -60,10 +144,22 @@ async def get_knowledge(
         if type_:
             filters.append(KnowledgeModel.type == type_)
 
-        # Отправка запроса к БД
-        results = await DB.select_model(
-            model=KnowledgeModel,
-            filters=and_(*filters) if filters else None
+        # Отправка запроса к БД (строки без создания ORM-объектов, сортировка по ID)
+        async def load():
+            rows = await DB.select_rows(
+                model=KnowledgeModel,
+                filters=and_(*filters) if filters else None,
+                order_by=["id"],
+                limit=limit,
+                offset=offset,
+                after=after_id
+            )
+            return None if not rows and not DB.connected else rows  # Ошибку БД не кэшируем как пустой ответ
+
+        # Чтение через кэш Redis (одновременные запросы холодного ключа ждут одну выборку)
+        results = await CACHE.get_or_load(
+            load,
+            id=id or None, tag=tag or None, type=type_ or None, limit=limit, offset=offset, after=after_id
         )
 
         # Логируем ситуацию, когда результатов нет
@@ -96,7 +192,11 @@ async def post_knowledge(payload: Knowledge.Create):
     """
 
     try:
-        result = await DB.insert_model(KnowledgeModel, payload.dict())
+        data = payload.dict()
+        data["meta"] = client_meta(data["meta"])
+        result = await DB.insert_model(KnowledgeModel, data)
+        if result:
+            await CACHE.invalidate(result["id"], [result["tag"]])
         return result
     except IntegrityError:
         raise HTTPException(status_code=400, detail="Некорректные данные")
@@ -138,8 +238,21 @@ async def put_knowledge(
         if not new_data:
             raise HTTPException(status_code=400, detail="No valid fields provided")
 
-        # Обновление записи и возврат новой записи
-        return await DB.update_fields(KnowledgeModel, {"id": id}, new_data)
+        # Файл заменяется только новой загрузкой: хэш и размер в метаданных не редактируются
+        blob = (existing.meta or {}).get("sha256")
+        if blob and new_data.get("value", existing.value) != existing.value:
+            raise HTTPException(status_code=400, detail="Содержимое файла изменяется загрузкой нового файла")
+        if new_data.get("meta") is not None or (blob and "meta" in new_data):
+            meta = client_meta(new_data["meta"])
+            if blob:
+                meta = {**existing.meta, **meta, "sha256": blob, "size": existing.meta.get("size")}
+            new_data["meta"] = meta
+
+        # Обновление записи и сброс кэша по старому и новому тэгу
+        updated = await DB.update_fields(KnowledgeModel, {"id": id}, new_data)
+        await CACHE.invalidate(id, [existing.tag, (updated or {}).get("tag")])
+        await invalidate_files(id)
+        return updated
 
     except HTTPException as http_exc:
         raise http_exc  # Пробрасываем стандартные ошибки дальше
@@ -193,66 +306,123 @@ async def upload_file(
             return "unknown"
 
     try:
-        # Путь сохранения
         safe_name = name.replace(" ", "_")  # Преобразование названия файла
         ext = os.path.splitext(file.filename)[-1]   # Получение расширения файла
         file_type = detect_file_type(ext)   # Определение типа файла
-        save_path = Path(f"storage/files/{file_type}/{safe_name}{ext}")  # Создание пути сохранения
-        save_path.parent.mkdir(parents=True, exist_ok=True)  # Создание директорий в пути сохранения
 
-        # Сохранение файла
-        with open(save_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Потоковое сохранение в хранилище по содержимому (повторная загрузка того же файла не занимает места)
+        stored = await BLOBS.put(file)
+
+        # Ссылка на блоб создается до записи: сборщик мусора не удалит файл, на который ссылается запись
+        if not await add_ref(DB, stored.sha256, stored.size):
+            raise HTTPException(status_code=503, detail="База данных недоступна")
 
-        # Добавление записи в БД
+        # Добавление записи в БД (имя файла - в метаданных, значение - хэш содержимого)
         data = {
             "editor": creator_id,
             "type": file_type,
             "tag": tag,
             "description": description,
-            "value": f"{safe_name}{ext}"
+            "value": stored.sha256,
+            "meta": {
+                "name": f"{safe_name}{ext}",
+                "ext": ext,
+                "size": stored.size,
+                "sha256": stored.sha256,
+                "content_type": file.content_type,
+            },
         }
-        return await DB.insert_model(KnowledgeModel, data)
+        try:
+            result = await DB.insert_model(KnowledgeModel, data)
+        except BaseException:
+            # Запрос отменен (клиент отключился) до создания записи - ссылка не должна остаться без записи
+            await asyncio.shield(release_ref(DB, stored.sha256))
+            raise
+        if not result:
+            await release_ref(DB, stored.sha256)
+            raise HTTPException(status_code=503, detail="Не удалось сохранить запись")
+
+        await CACHE.invalidate(result["id"], [tag])
+
+        # Варианты для Telegram (WebP/JPEG, превью, OGG/Opus) создаются в фоне обработчиком storage.converter
+        await converter.enqueue(stored.sha256, file_type, result["id"])
+        return result
+
+    except UploadTooLarge as e:
+        lg.warning(f"Отклонена загрузка файла {file.filename}: {e}", module="KnowledgeAPI")
+        raise HTTPException(status_code=413, detail="Файл слишком большой")
 
     except HTTPException as http_exc:
         raise http_exc
 
 
-# Получение файла или изображения
+# Получение файла или изображения (Range, ETag, If-None-Match / If-Modified-Since)
 @router.get("/knowledge/file")
 async def get_knowledge_file(
-        id: int = Query(..., description="ID файла для получения")
+        request: Request,
+        id: int = Query(..., description="ID файла для получения"),
+        variant: Optional[str] = Query(None, description="Вариант файла (webp_1280, jpeg_1280, thumb, voice)")
 ):
     """
     Получение файлов по ID записи в базе знаний.
 
+    :param request: HTTP запрос (заголовки Range и условных запросов)
     :param id: Уникальный идентификатор записи с файлом
-    :return: Файл в виде HTTP-ответа
+    :param variant: Вариант, полученный конвертацией (None - исходный файл)
+    :return: Файл в виде HTTP-ответа (206 - часть файла, 304 - файл у клиента актуален)
     """
 
     try:
-        # Поиск записи по ID
-        record = await DB.select_model(
-            KnowledgeModel,
-            KnowledgeModel.id == id,
-            fetch_one=True
+        # Путь и заголовки файла: из кэша процесса или из БД
+        cache_key = file_key(id, variant)
+        file = FILES.get(cache_key)
+        if file is None:
+            epoch = FILES.epoch
+            file = await find_file(id, variant)
+            FILES.put(cache_key, file, epoch)
+
+        # Размер и дата изменения (вне event loop)
+        try:
+            stat_result = await asyncio.to_thread(os.stat, file["path"])
+        except FileNotFoundError:
+            FILES.invalidate([cache_key])
+            lg.error(f"Файл записи id={id} отсутствует в хранилище: {file['path']}", module="KnowledgeAPI")
+            raise HTTPException(status_code=404, detail="Файл не найден")
+
+        # Блоб адресуется хэшем: сильный ETag и долгий кэш, файлы старого формата - ревалидация по mtime+size
+        headers = {"Cache-Control": f"public, max-age={BLOB_MAX_AGE}, immutable" if file["sha256"] else "no-cache"}
+        if file["sha256"]:
+            headers["ETag"] = f'"{file["sha256"]}"'
+        if ACCEL_REDIRECT and file["sha256"]:
+            headers["X-Accel-Redirect"] = f"{ACCEL_REDIRECT.rstrip('/')}/{file['path'].relative_to(BLOBS.root).as_posix()}"
+
+        response = FileResponse(
+            path=file["path"],
+            headers=headers,
+            media_type=file["media_type"],
+            filename=file["filename"],
+            stat_result=stat_result,
         )
-
-        # Проверка, что запись с таким ID существует
-        if not record:
-            lg.warning(f"Запись с id={id} не найдена", module="KnowledgeAPI")
-            raise HTTPException(status_code=404, detail="Записи с таким ID не существует")
-
-        # Проверка, что запись является файлом
-        if record.type not in ["file", "document", "image", "audio", "video"]:
-            lg.warning(f"Запись с id={id} не является файлом", module="KnowledgeAPI")
-            raise HTTPException(status_code=404, detail="Запись не является файлом")
-
-        # Генерация пути до файла
-        file_path = f"storage/files/{record.type}/{record.value}"
-
-        # Возвращаем файл как ответ
-        return FileResponse(path=file_path, filename=record.value)
+        response.chunk_size = CHUNK_SIZE
+
+        # Условный запрос: файл у клиента актуален
+        etag = response.headers["etag"]
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = request.headers.get("if-modified-since")
+        if (etag_matches(if_none_match, etag) if if_none_match is not None
+                else if_modified_since is not None and not_modified_since(if_modified_since, stat_result.st_mtime)):
+            return Response(status_code=304, headers={
+                "ETag": etag,
+                "Last-Modified": response.headers["last-modified"],
+                "Cache-Control": headers["Cache-Control"],
+            })
+
+        # Файл отдает nginx (sendfile без копирования через приложение), Range обрабатывается им же
+        if "X-Accel-Redirect" in headers:
+            return Response(headers={**headers, "Content-Type": response.media_type,
+                                     "Content-Disposition": response.headers["content-disposition"]})
+
+        return response  # Range / If-Range обрабатывает FileResponse (206, 416)
 
     except HTTPException as http_exc:
         raise http_exc
@@ -264,3 +434,60 @@ async def get_knowledge_file(
     except Exception as e:
         lg.error(f"Неизвестная ошибка при получении файла id={id}: {str(e)}", module="KnowledgeAPI")
         raise HTTPException(status_code=500, detail="Внутренняя ошибка сервера")
+
+
+# Поиск файла записи в БД: путь, имя для скачивания, тип содержимого
+async def find_file(id: int, variant: Optional[str] = None) -> dict:
+    record = await DB.select_model(
+        KnowledgeModel,
+        KnowledgeModel.id == id,
+        fetch_one=True
+    )
+
+    # Проверка, что запись с таким ID существует
+    if not record:
+        lg.warning(f"Запись с id={id} не найдена", module="KnowledgeAPI")
+        raise HTTPException(status_code=404, detail="Записи с таким ID не существует")
+
+    # Файл из хранилища по содержимому (имя для скачивания - из метаданных)
+    meta = record.meta or {}
+    if meta.get("sha256") and variant:
+        return await find_variant(meta, variant)
+    if meta.get("sha256"):
+        return {
+            "path": BLOBS.path_for(meta["sha256"]),
+            "filename": meta.get("name", record.value),
+            "media_type": meta.get("content_type"),
+            "sha256": meta["sha256"],
+        }
+
+    # Проверка, что запись является файлом
+    if record.type not in ["file", "document", "image", "audio", "video"]:
+        lg.warning(f"Запись с id={id} не является файлом", module="KnowledgeAPI")
+        raise HTTPException(status_code=404, detail="Запись не является файлом")
+
+    # Файл старого формата (до переноса в хранилище: python -m storage.uploader migrate)
+    return {
+        "path": Path(f"storage/files/{record.type}/{record.value}"),
+        "filename": record.value,
+        "media_type": None,
+        "sha256": None,
+    }
+
+
+# Вариант файла (результат конвертации по хэшу исходного содержимого)
+async def find_variant(meta: dict, variant: str) -> dict:
+    row = await DB.select_rows(
+        BlobVariantsModel,
+        filters=(BlobVariantsModel.source == meta["sha256"]) & (BlobVariantsModel.variant == variant),
+    )
+    if not row:
+        raise HTTPException(status_code=404, detail="Вариант файла не найден или еще не создан")
+
+    extension = {"image/webp": ".webp", "image/jpeg": ".jpg", "audio/ogg": ".ogg"}.get(row[0]["content_type"], "")
+    return {
+        "path": BLOBS.path_for(row[0]["sha256"]),
+        "filename": f"{Path(meta.get('name', meta['sha256'])).stem}_{variant}{extension}",
+        "media_type": row[0]["content_type"],
+        "sha256": row[0]["sha256"],
+    }
@@ -0,0 +1,76 @@
+import gzip  # GZIP сжатие
+import shutil  # Потоковое копирование файлов
+import zipfile  # ZIP архивация данных
+from pathlib import Path  # Путь
+
+try:
+    import zstandard  # Сжатие ZSTD (необязательная зависимость)
+except ImportError:
+    zstandard = None
+
+
+# Расширения архивов для каждого кодека
+CODECS = {
+    "deflate": ".zip",
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+CHUNK_SIZE = 1024 * 1024  # Размер блока потокового сжатия (1 МБ)
+
+
+# Список кодеков, доступных в текущем окружении
+def available_codecs() -> list:
+    return [codec for codec in CODECS if codec != "zstd" or zstandard is not None]
+
+
+# Выбор кодека с откатом на gzip, если zstd не установлен
+def resolve_codec(codec: str) -> str:
+    if codec not in CODECS:
+        raise ValueError(f"Неизвестный кодек архивации: {codec}")
+    if codec == "zstd" and zstandard is None:
+        print("[Archiver][WARNING] Пакет zstandard не установлен, используется gzip")
+        return "gzip"
+    return codec
+
+
+# Имя архива для файла
+def archive_path(source: Path, target_dir: Path, codec: str, prefix: str = "archive_") -> Path:
+    if codec == "deflate":
+        return target_dir / f"{prefix}{source.stem}{CODECS[codec]}"
+    return target_dir / f"{prefix}{source.name}{CODECS[codec]}"
+
+
+# Потоковое сжатие файла блоками (память не зависит от размера файла)
+def compress_file(source: Path, target_dir: Path, codec: str = "deflate", level: int = None, chunk_size: int = CHUNK_SIZE) -> Path:
+    """
+    :param source: Путь до сжимаемого файла
+    :param target_dir: Директория для архива
+    :param codec: Кодек сжатия (deflate, gzip, zstd)
+    :param level: Уровень сжатия (None - значение по умолчанию кодека)
+    :param chunk_size: Размер блока чтения
+    :return: Путь до созданного архива
+    """
+
+    codec = resolve_codec(codec)
+    target = archive_path(source, target_dir, codec)
+    temp = target.with_name(target.name + ".tmp")
+
+    # Пишем во временный файл, чтобы незавершенный архив не попал в выборку
+    with source.open("rb") as src:
+        if codec == "deflate":
+            with zipfile.ZipFile(temp, "w", zipfile.ZIP_DEFLATED, compresslevel=level) as archive:
+                with archive.open(source.name, "w", force_zip64=True) as dst:
+                    shutil.copyfileobj(src, dst, chunk_size)
+
+        elif codec == "gzip":
+            with gzip.open(temp, "wb", compresslevel=9 if level is None else level) as dst:
+                shutil.copyfileobj(src, dst, chunk_size)
+
+        else:
+            compressor = zstandard.ZstdCompressor(level=3 if level is None else level)
+            with temp.open("wb") as raw, compressor.stream_writer(raw) as dst:
+                shutil.copyfileobj(src, dst, chunk_size)
+
+    temp.replace(target)
+    return target
@@ -0,0 +1,61 @@
+"""
+Микро-бенчмарк стоимости вызова lg.info() (нс/вызов): старый путь через asyncio.create_task
+с ISO timestamp против синхронного put_nowait с epoch timestamp.
+
+В обоих случаях учитывается время до фактического попадания записи в очередь.
+RabbitMQ не требуется: логер помечается инициализированным без запуска наблюдателей.
+
+Запуск: python -m benchmarks.logger_calls [--calls 200000]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from logger import sender
+
+
+# Старый путь: задача на каждый вызов и ISO timestamp
+async def legacy_enqueue(level, message, module, code):
+    if not sender.state.initialized:
+        await sender.init_logger()
+        await sender.state.ready_event.wait()
+    await sender.state.log_queue.put({
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "level": level.upper(),
+        "module": module.upper(),
+        "message": message,
+        "status_code": code
+    })
+
+
+def legacy_info(message: str, module="None", code=0):
+    asyncio.create_task(legacy_enqueue("INFO", message, module, code))
+
+
+async def measure(call, calls: int) -> float:
+    sender.state = sender.LoggerState({"queue_size": calls, "overflow_policy": "drop_newest"})
+    sender.state.initialized = True
+    queue = sender.state.log_queue
+
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        call("GET /knowledge?id=1 from 127.0.0.1:50000", "fastapi-postgres", 200)
+    while queue.qsize() < calls:
+        await asyncio.sleep(0)
+    return (time.perf_counter_ns() - start) / calls
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк стоимости вызова lg.info()")
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    legacy = await measure(legacy_info, args.calls)
+    fast = await measure(sender.info, args.calls)
+    print(f"  legacy: {legacy:>8,.0f} нс/вызов")
+    print(f"    fast: {fast:>8,.0f} нс/вызов ({legacy / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
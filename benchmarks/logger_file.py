@@ -0,0 +1,71 @@
+"""
+Бенчмарк записи логов в файл (logger.methods.to_file): строк/сек старого способа
+(открытие файла и проверка ротации на каждую строку) против буферизованного FileLogger.
+
+Запуск: python -m benchmarks.logger_file [--lines 200000] [--batch 200]
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from logger.methods.to_file import FileLogger
+
+
+# Старый способ: timezone + datetime.now на каждую строку, открытие файла в режиме append
+def legacy_log(path: Path, utc: int, entry: dict):
+    tz = timezone(timedelta(hours=utc))
+    datetime.now(tz)
+
+    dt = datetime.fromtimestamp(entry["timestamp"], timezone.utc).astimezone(tz)
+    line = f"[{dt.strftime('%Y-%m-%d %H:%M:%S')}] [{entry['level']}] [{entry['module']}] {entry['message']} [code: {entry['status_code']}]\n"
+    with path.open("a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def make_entries(count: int) -> list:
+    now = time.time()
+    return [
+        {"timestamp": now + i / 1000, "level": "INFO", "module": "BENCH", "message": f"benchmark line #{i}", "status_code": 0}
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк FileLogger")
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=200, help="Размер пакета для writelines()")
+    args = parser.parse_args()
+    entries = make_entries(args.lines)
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_path = Path(directory) / "legacy.log"
+        start = time.perf_counter()
+        for entry in entries:
+            legacy_log(legacy_path, 3, entry)
+        legacy = args.lines / (time.perf_counter() - start)
+
+        logger = FileLogger(settings={"directory": f"{directory}/single"}, utc=3)
+        start = time.perf_counter()
+        for entry in entries:
+            logger.log(entry)
+        logger.flush()
+        single = args.lines / (time.perf_counter() - start)
+        logger.close()
+
+        logger = FileLogger(settings={"directory": f"{directory}/batch"}, utc=3)
+        start = time.perf_counter()
+        for i in range(0, args.lines, args.batch):
+            logger.writelines(entries[i:i + args.batch])
+        logger.flush()
+        batched = args.lines / (time.perf_counter() - start)
+        logger.close()
+
+    print(f"       legacy: {legacy:>12,.0f} строк/сек")
+    print(f"   log() x N: {single:>12,.0f} строк/сек ({single / legacy:.1f}x)")
+    print(f"writelines(): {batched:>12,.0f} строк/сек ({batched / legacy:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
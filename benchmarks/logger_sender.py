@@ -0,0 +1,107 @@
+"""
+Бенчмарк отправителя логов (logger.sender): записи/сек старого и пакетного наблюдателя.
+
+RabbitMQ не требуется: публикация подменяется заглушкой, которая имитирует задержку
+подтверждения брокера (publisher confirm) и стоимость отправки каждого байта.
+
+Запуск: python -m benchmarks.logger_sender [--entries 20000] [--rtt-ms 0.5]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import aio_pika
+
+from logger import sender
+
+
+# Заглушка exchange: каждая публикация ждет "подтверждения" брокера
+class FakeExchange:
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.messages = 0
+        self.bytes = 0
+
+    async def publish(self, message: aio_pika.Message, routing_key: str):
+        self.messages += 1
+        self.bytes += len(message.body)
+        await asyncio.sleep(self.rtt)
+
+
+class FakeChannel:
+    def __init__(self, rtt: float):
+        self.default_exchange = FakeExchange(rtt)
+
+
+# Старый наблюдатель (одна публикация на запись, две задачи get() на каждой итерации)
+async def legacy_worker():
+    state = sender.state
+    while True:
+        log_task = asyncio.create_task(state.log_queue.get())
+        query_task = asyncio.create_task(state.query_queue.get())
+
+        done, _ = await asyncio.wait([log_task, query_task], return_when=asyncio.FIRST_COMPLETED)
+
+        if log_task in done:
+            try:
+                await state.channel.default_exchange.publish(
+                    aio_pika.Message(body=json.dumps(log_task.result()).encode()), routing_key="logs"
+                )
+            finally:
+                state.log_queue.task_done()
+
+        if query_task in done:
+            try:
+                await state.channel.default_exchange.publish(
+                    aio_pika.Message(body=json.dumps(query_task.result()).encode()), routing_key="queries"
+                )
+            finally:
+                state.query_queue.task_done()
+
+
+# Прогон одного варианта наблюдателя
+async def run(mode: str, entries: int, rtt: float) -> dict:
+    sender.state = sender.LoggerState()
+    state = sender.state
+    state.channel = FakeChannel(rtt)
+    state.confirm_slots = asyncio.Semaphore(state.confirm_window)
+
+    if mode == "legacy":
+        tasks = [asyncio.create_task(legacy_worker())]
+    else:
+        tasks = [
+            asyncio.create_task(sender._publisher(state.log_queue, "logs")),
+            asyncio.create_task(sender._publisher(state.query_queue, "queries")),
+        ]
+
+    start = time.perf_counter()
+    for i in range(entries):
+        state.log_queue.put_nowait(sender._build_log("INFO", f"benchmark message #{i}", "BENCH", 0))
+    await state.log_queue.join()
+    elapsed = time.perf_counter() - start
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, *state.pending, return_exceptions=True)
+
+    exchange = state.channel.default_exchange
+    return {"mode": mode, "rate": entries / elapsed, "messages": exchange.messages, "bytes": exchange.bytes}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк logger.sender")
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="Имитация задержки подтверждения брокера")
+    args = parser.parse_args()
+
+    for mode in ("legacy", "batched"):
+        result = await run(mode, args.entries, args.rtt_ms / 1000)
+        print(
+            f"{result['mode']:>8}: {result['rate']:>12,.0f} записей/сек | "
+            f"сообщений: {result['messages']:>6} | байт: {result['bytes']:>10,}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
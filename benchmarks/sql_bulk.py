@@ -0,0 +1,95 @@
+"""
+Бенчмарк массовых операций SqlClient (строк/сек): insert_model / update_fields по одной записи
+против insert_many / upsert_many / update_where.
+
+Требуется запущенная СУБД. Таблица bench_bulk создается и удаляется самим бенчмарком.
+По умолчанию используются настройки MySQL из settings/local_settings.json.
+
+Запуск: python -m benchmarks.sql_bulk [--rows 5000] [--db-type postgres --host ... --port ... ...]
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from database.connectors.connector import get_client
+from settings.get_config import get_config
+
+
+class BenchBase(DeclarativeBase):
+    pass
+
+
+# Временная таблица бенчмарка
+class BenchModel(BenchBase):
+    __tablename__ = "bench_bulk"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    value: Mapped[str] = mapped_column(String(64), nullable=False)
+    counter: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+async def recreate_table(client):
+    async with client.engine.begin() as conn:
+        await conn.run_sync(BenchBase.metadata.drop_all)
+        await conn.run_sync(BenchBase.metadata.create_all)
+
+
+async def timed(title: str, rows: int, coroutine) -> float:
+    start = time.perf_counter()
+    await coroutine
+    rate = rows / (time.perf_counter() - start)
+    print(f"{title:>28}: {rate:>12,.0f} строк/сек")
+    return rate
+
+
+async def main():
+    mysql = get_config()["mysql"]
+    parser = argparse.ArgumentParser(description="Бенчмарк массовых операций SqlClient")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--db-type", default="mysql")
+    parser.add_argument("--host", default=mysql["host"])
+    parser.add_argument("--port", default=mysql["port"])
+    parser.add_argument("--username", default=mysql["username"])
+    parser.add_argument("--password", default=mysql["password"])
+    parser.add_argument("--database", default=mysql["database"])
+    args = parser.parse_args()
+
+    client = get_client(args.db_type, args.host, args.port, args.username, args.password, args.database)
+    if not await client.is_connected():
+        print("Нет подключения к СУБД")
+        return
+
+    rows = [{"id": i, "value": f"value-{i}", "counter": 0} for i in range(args.rows)]
+
+    # Вставка
+    await recreate_table(client)
+
+    async def insert_one_by_one():
+        for row in rows:
+            await client.insert_model(BenchModel, row)
+
+    await timed("insert_model x N", len(rows), insert_one_by_one())
+    await recreate_table(client)
+    await timed("insert_many", len(rows), client.insert_many(BenchModel, rows))
+
+    # Обновление
+    async def update_one_by_one():
+        for row in rows:
+            await client.update_fields(BenchModel, {"id": row["id"]}, {"counter": 1})
+
+    await timed("update_fields x N", len(rows), update_one_by_one())
+    await timed("update_where", len(rows), client.update_where(BenchModel, BenchModel.id >= 0, {"counter": 2}))
+
+    changed = [{"id": row["id"], "value": row["value"], "counter": 3} for row in rows]
+    await timed("upsert_many", len(rows), client.upsert_many(BenchModel, changed))
+
+    async with client.engine.begin() as conn:
+        await conn.run_sync(BenchBase.metadata.drop_all)
+    await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
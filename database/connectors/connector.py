@@ -1,8 +1,9 @@
 from database.connectors.sql_client import Client as SqlClient
 from database.connectors.redis_client import Client as RedisClient
+from settings.get_config import get_config
 
 
-def get_client(db_type: str, host: str, port: int, username: str, password: str, database: str):
+def get_client(db_type: str, host: str, port: int, username: str, password: str, database: str, **pool_options):
     """
     :param db_type: Тип СУБД
     :param host: Хост для подключения
@@ -10,16 +11,20 @@ def get_client(db_type: str, host: str, port: int, username: str, password: str,
     :param username: Логин для подключения
     :param password: Пароль для подключения
     :param database: База Данных для подключения
+    :param pool_options: Настройки пула SQL (pool_size, max_overflow, pool_recycle, statement_cache_size,
+                         report_to_logger - отправлять ошибки и медленные запросы в логер)
+                         или Redis (max_connections, socket_timeout, serializer, local_cache, ...)
     :return: Client
     """
 
     # Подключение к SQL базам данных
     if db_type in ["postgres", "mysql", "timescale", "mariadb"]:
-        return SqlClient(db_type, host, port, username, password, database)
+        return SqlClient(db_type, host, port, username, password, database, **pool_options)
 
     # Подключение к Redis
     elif db_type == "redis":
-        return RedisClient(host, port, username, password)
+        options = {**get_config().get("redis_pool", {}), **pool_options}  # Секция "redis_pool" локального конфига
+        return RedisClient(host, port, password, database, username=username, **options)
 
     # Обработка неверного типа СУБД
     else:
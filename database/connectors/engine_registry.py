@@ -0,0 +1,136 @@
+from typing import Dict, Any, Optional  # Типы данных
+
+from sqlalchemy.engine import make_url  # Разбор строки подключения
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine  # Асинхронный движок SQLAlchemy
+
+from settings.get_config import get_config  # Получение локального конфига
+from database.connectors import sql_stats  # Замер времени выполнения запросов
+
+
+# Настройки пула по умолчанию (перекрываются секцией "sql_pool" локального конфига и параметрами клиента)
+DEFAULT_POOL = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": 1800,
+    "pool_pre_ping": True,
+    "statement_cache_size": None,  # Только asyncpg: размер кэша подготовленных выражений
+}
+
+
+# Статистика ожидания соединений из пула
+class PoolStats:
+    def __init__(self):
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.waits += 1
+        self.wait_total += seconds
+        if seconds > self.wait_max:
+            self.wait_max = seconds
+
+
+# Общий на процесс реестр движков: один движок и один пул на DSN
+_engines: Dict[str, AsyncEngine] = {}
+_stats: Dict[str, PoolStats] = {}
+_options: Dict[str, Dict[str, Any]] = {}  # Настройки, с которыми создан движок DSN
+
+
+# Итоговые настройки пула для клиента
+def pool_options(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    options = dict(DEFAULT_POOL)
+    options.update(get_config().get("sql_pool", {}))
+    options.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return options
+
+
+# Получение движка по DSN (создается один раз на процесс)
+def get_engine(url: str, **overrides) -> AsyncEngine:
+    engine = _engines.get(url)
+    if engine is not None:
+        _check_options(url, overrides)
+        return engine
+
+    options = pool_options(overrides)
+    _options[url] = dict(options)
+    statement_cache_size = options.pop("statement_cache_size", None)
+    connect_args = {}
+    driver = make_url(url).drivername
+    if statement_cache_size is not None and driver.endswith("asyncpg"):
+        connect_args["statement_cache_size"] = int(statement_cache_size)
+    if driver.endswith("asyncmy"):
+        # rowcount UPDATE - найденные, а не измененные строки: обновление без изменений не считается "не найдено"
+        from asyncmy.constants import CLIENT
+        connect_args["client_flag"] = CLIENT.FOUND_ROWS
+
+    engine = create_async_engine(url, echo=False, connect_args=connect_args, **options)
+    sql_stats.instrument(engine)
+    _engines[url] = engine
+    _stats[url] = PoolStats()
+    return engine
+
+
+# Пул уже создан первым клиентом DSN: другие настройки следующих клиентов не применяются - предупреждаем
+def _check_options(url: str, overrides: Dict[str, Any]):
+    current = _options.get(url, {})
+    conflicts = {
+        name: (current.get(name), value)
+        for name, value in overrides.items()
+        if value is not None and current.get(name) != value
+    }
+    if conflicts:
+        details = ", ".join(f"{name}={new} (используется {old})" for name, (old, new) in conflicts.items())
+        dsn = make_url(url).render_as_string(hide_password=True)
+        print(f"[database][WARNING] Движок {dsn} уже создан, настройки пула не применены: {details}")
+
+
+# Статистика ожидания пула для DSN
+def get_stats(url: str) -> PoolStats:
+    return _stats.setdefault(url, PoolStats())
+
+
+# Закрытие всех соединений пула после сбоя (движок остается в реестре и создает новый пул)
+async def reset_engine(url: str):
+    engine = _engines.get(url)
+    if engine is not None:
+        await engine.dispose()
+
+
+# Закрытие движка и удаление его из реестра
+async def dispose_engine(url: str):
+    engine = _engines.pop(url, None)
+    _options.pop(url, None)
+    if engine is not None:
+        await engine.dispose()
+
+
+# Закрытие всех движков процесса (при завершении приложения)
+async def dispose_all():
+    for url in list(_engines):
+        await dispose_engine(url)
+
+
+# Статистика пула одного DSN (checked out, overflow, ожидание соединения)
+def engine_stats(url: str) -> Dict[str, Any]:
+    engine = _engines.get(url)
+    if engine is None:
+        return {}
+
+    pool = engine.pool
+    stats = get_stats(url)
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(0, pool.overflow()),
+        "waits": stats.waits,
+        "wait_avg_ms": round(stats.wait_total / stats.waits * 1000, 3) if stats.waits else 0.0,
+        "wait_max_ms": round(stats.wait_max * 1000, 3),
+    }
+
+
+# Статистика всех пулов процесса (пароли в DSN скрыты)
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    return {make_url(url).render_as_string(hide_password=True): engine_stats(url) for url in _engines}
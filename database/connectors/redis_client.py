@@ -1,39 +1,194 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterable, Mapping, Union
+from collections import OrderedDict
+import asyncio
 import json
+import time
 import redis.asyncio as redis
 
+try:
+    import orjson  # Быстрая сериализация JSON (необязательная зависимость)
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack  # Компактная бинарная сериализация (необязательная зависимость)
+except ImportError:
+    msgpack = None
+
+
+# Сериализаторы значений: имя -> (dumps, loads)
+SERIALIZERS = {
+    "json": (
+        lambda value: json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode(),
+        json.loads,
+    ),
+    "raw": (lambda value: value, lambda value: value),
+}
+if orjson is not None:
+    SERIALIZERS["orjson"] = (orjson.dumps, orjson.loads)
+if msgpack is not None:
+    SERIALIZERS["msgpack"] = (
+        lambda value: msgpack.packb(value, use_bin_type=True, default=str),
+        lambda value: msgpack.unpackb(value, raw=False),
+    )
+
+
+# Выбор сериализатора с откатом на json, если пакет не установлен
+def resolve_serializer(name: str) -> str:
+    if name in SERIALIZERS:
+        return name
+    if name in ("orjson", "msgpack"):
+        print(f"[Redis][WARNING] Пакет {name} не установлен, используется json")
+        return "json"
+    raise ValueError(f"Неизвестный сериализатор: {name}")
+
+
+# Локальный кэш значений процесса (LRU с временем жизни), сбрасывается уведомлениями Redis
+class LocalCache:
+    def __init__(self, max_size: int = 10000, ttl: float = 60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.data: "OrderedDict[str, tuple]" = OrderedDict()
+        self.epoch = 0  # Растет при каждой инвалидации
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        item = self.data.get(key)
+        if item is None or item[1] < time.monotonic():
+            self.misses += 1
+            return None
+        self.data.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def put(self, key: str, value, epoch: int):
+        # Значение прочитано до инвалидации - не сохраняем
+        if epoch != self.epoch:
+            return
+        self.data[key] = (value, time.monotonic() + self.ttl)
+        self.data.move_to_end(key)
+        while len(self.data) > self.max_size:
+            self.data.popitem(last=False)
+
+    def invalidate(self, keys: Optional[Iterable[str]] = None):
+        self.epoch += 1
+        if keys is None:
+            self.data.clear()
+            return
+        for key in keys:
+            self.data.pop(key, None)
+
 
 class Client:
-    def __init__(self, host: str, port: int, password: str, database: str):
+    def __init__(self, host: str, port: int, password: str, database: str, retry_interval: float = 5,
+                 max_connections: int = 50, socket_timeout: float = 2, serializer: str = "json",
+                 local_cache: bool = False, local_cache_prefixes: Iterable[str] = (),
+                 local_cache_size: int = 10000, local_cache_ttl: float = 60, username: Optional[str] = None):
+        """
+        :param host: Хост для подключения
+        :param port: Порт для подключения
+        :param password: Пароль для подключения
+        :param database: Номер базы Redis
+        :param retry_interval: Пауза между попытками подключения (запросы не ждут недоступный Redis)
+        :param max_connections: Размер пула соединений
+        :param socket_timeout: Таймаут команд и подключения (сек)
+        :param serializer: Сериализатор значений get/set (json, orjson, msgpack, raw)
+        :param local_cache: Кэшировать значения get/mget в процессе (сброс по уведомлениям Redis CLIENT TRACKING)
+        :param local_cache_prefixes: Префиксы ключей для локального кэша (пусто - все ключи)
+        :param local_cache_size: Максимум записей локального кэша
+        :param local_cache_ttl: Время жизни записи локального кэша (сек)
+        :param username: Пользователь ACL Redis 6+ (None - пользователь default)
+        """
+
         self.host = host
         self.port = port
 
+        self.username = username or None
         self.password = password
-        self.database = database
+        self.database = str(database) if database is not None else "0"
 
         self.redis_client = None
         self.connected = False
 
+        # Явный пул соединений (одно подключение на команду, не более max_connections одновременно)
+        self.pool = redis.ConnectionPool(
+            host=self.host,
+            port=int(self.port),
+            username=self.username,
+            password=self.password,
+            db=int(self.database) if self.database.isdigit() else 0,
+            max_connections=int(max_connections),
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+            health_check_interval=30,
+        )
+
+        # Сериализация значений
+        self.serializer = resolve_serializer(serializer)
+        self.dumps, self.loads = SERIALIZERS[self.serializer]
+
+        # Локальный кэш с отслеживанием изменений на сервере
+        self.local_cache = LocalCache(int(local_cache_size), float(local_cache_ttl)) if local_cache else None
+        self.local_cache_prefixes = tuple(local_cache_prefixes)
+        self._tracking_task: Optional[asyncio.Task] = None
+
+        # Зарегистрированные Lua-скрипты: исходный текст -> Script
+        self._scripts: Dict[str, Any] = {}
+
+        # Пауза между попытками подключения
+        self.retry_interval = retry_interval
+        self._retry_at = 0.0
+
     async def connect(self):
         try:
-            self.redis_client = redis.Redis(
-                host=self.host,
-                port=self.port,
-                password=self.password,
-                db=int(self.database) if self.database.isdigit() else 0,
-                decode_responses=True
-            )
+            if self.redis_client is None:
+                self.redis_client = redis.Redis(connection_pool=self.pool)
             self.connected = await self.redis_client.ping()
+
+            # Запуск отслеживания изменений для локального кэша
+            if self.connected and self.local_cache is not None and (self._tracking_task is None or self._tracking_task.done()):
+                self._tracking_task = asyncio.create_task(self._track_invalidations())
         except Exception as e:
             await self.handle_error(e)
             self.connected = False
 
     async def is_connected(self) -> bool:
         try:
-            return await self.redis_client.ping()
+            return await self._ensure() and await self.redis_client.ping()
         except Exception as ex:
-            await self.handle_error(ex)
+            await self._failed(ex)
+            return False
+
+    # Закрытие пула и отслеживания
+    async def close(self):
+        if self._tracking_task is not None:
+            self._tracking_task.cancel()
+            await asyncio.gather(self._tracking_task, return_exceptions=True)
+            self._tracking_task = None
+        if self.redis_client is not None:
+            await self.redis_client.aclose()
+            self.redis_client = None
+        await self.pool.disconnect()
+        self.connected = False
+
+    # Подключение при первом обращении и после паузы retry_interval
+    async def _ensure(self) -> bool:
+        if self.connected:
+            return True
+        if time.monotonic() < self._retry_at:
             return False
+        await self.connect()
+        if not self.connected:
+            self._retry_at = time.monotonic() + self.retry_interval
+        return self.connected
+
+    # Ошибка команды: переподключение после паузы
+    async def _failed(self, error: Exception):
+        await self.handle_error(error)
+        if isinstance(error, (redis.ConnectionError, redis.TimeoutError)):
+            self.connected = False
+            self._retry_at = time.monotonic() + self.retry_interval
 
     async def execute(self, key: str, *args, **kwargs) -> List[Dict[str, Any]]:
         if not self.connected:
@@ -47,6 +202,362 @@ class Client:
             await self.handle_error(e)
             return []
 
+    # ============================================================
+    # Строковые значения
+
+    # Получение значения без десериализации (None - ключа нет или Redis недоступен)
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        if not await self._ensure():
+            return None
+        try:
+            return await self.redis_client.get(key)
+        except Exception as e:
+            await self._failed(e)
+            return None
+
+    # Запись значения с временем жизни и добавление ключа в индексы (один round-trip)
+    async def set_raw(self, key: str, value, ttl: Optional[int] = None, index: Optional[List[str]] = None) -> bool:
+        if not await self._ensure():
+            return False
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(key, value, ex=ttl)
+                for index_key in index or ():
+                    pipe.sadd(index_key, key)
+                    if ttl:
+                        pipe.expire(index_key, ttl * 2)  # Индекс живет дольше ключей, которые в нем перечислены
+                await pipe.execute()
+            return True
+        except Exception as e:
+            await self._failed(e)
+            return False
+
+    # Получение значения
+    async def get(self, key: str, default=None):
+        return (await self.mget([key])).get(key, default)
+
+    # Запись значения (ttl - время жизни в секундах, nx - только если ключа нет)
+    async def set(self, key: str, value, ttl: Optional[int] = None, nx: bool = False) -> bool:
+        if not await self._ensure():
+            return False
+        try:
+            return bool(await self.redis_client.set(key, self.dumps(value), ex=ttl, nx=nx))
+        except Exception as e:
+            await self._failed(e)
+            return False
+
+    # Получение множества значений одним запросом MGET (отсутствующие ключи не попадают в результат)
+    async def mget(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(dict.fromkeys(keys))
+        result = {}
+
+        # Сначала локальный кэш
+        cache = self.local_cache
+        if cache is not None:
+            missing = []
+            for key in keys:
+                value = cache.get(key) if self._cacheable(key) else None
+                if value is None:
+                    missing.append(key)
+                else:
+                    result[key] = value
+            keys = missing
+
+        if not keys or not await self._ensure():
+            return result
+        try:
+            epoch = cache.epoch if cache is not None else 0
+            for key, raw in zip(keys, await self.redis_client.mget(keys)):
+                if raw is None:
+                    continue
+                value = self.loads(raw)
+                result[key] = value
+                if cache is not None and self._cacheable(key):
+                    cache.put(key, value, epoch)
+        except Exception as e:
+            await self._failed(e)
+        return result
+
+    # Запись множества значений одним запросом (MSET или пакет SET EX при ttl)
+    async def mset(self, mapping: Mapping[str, Any], ttl: Optional[int] = None) -> bool:
+        if not mapping or not await self._ensure():
+            return not mapping
+        try:
+            if ttl is None:
+                await self.redis_client.mset({key: self.dumps(value) for key, value in mapping.items()})
+            else:
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for key, value in mapping.items():
+                        pipe.set(key, self.dumps(value), ex=ttl)
+                    await pipe.execute()
+            return True
+        except Exception as e:
+            await self._failed(e)
+            return False
+
+    # Установка времени жизни ключа
+    async def expire(self, key: str, ttl: int) -> bool:
+        if not await self._ensure():
+            return False
+        try:
+            return bool(await self.redis_client.expire(key, ttl))
+        except Exception as e:
+            await self._failed(e)
+            return False
+
+    # Удаление ключей и всех ключей, перечисленных в индексах
+    async def delete(self, *keys: str, index: Optional[List[str]] = None) -> bool:
+        if not await self._ensure():
+            return False
+        try:
+            members = []
+            if index:
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for index_key in index:
+                        pipe.smembers(index_key)
+                    for found in await pipe.execute():
+                        members.extend(found)
+
+            targets = [*keys, *members, *(index or ())]
+            if targets:
+                await self.redis_client.delete(*targets)
+            if self.local_cache is not None:
+                self.local_cache.invalidate(key.decode() if isinstance(key, bytes) else key for key in targets)
+            return True
+        except Exception as e:
+            await self._failed(e)
+            return False
+
+    # ============================================================
+    # Пакетные операции
+
+    # Пакет команд одним round-trip: async with client.pipeline() as pipe: pipe.get(...); await pipe.execute()
+    def pipeline(self, transaction: bool = False):
+        if self.redis_client is None:
+            self.redis_client = redis.Redis(connection_pool=self.pool)
+        return self.redis_client.pipeline(transaction=transaction)
+
+    # Выполнение списка команд [("hget", key, field), ("zadd", key, {...}), ...] одним round-trip
+    async def batch(self, commands: Iterable[tuple], transaction: bool = False) -> Optional[List[Any]]:
+        if not await self._ensure():
+            return None
+        try:
+            async with self.pipeline(transaction) as pipe:
+                for name, *args in commands:
+                    getattr(pipe, name)(*args)
+                return await pipe.execute()
+        except Exception as e:
+            await self._failed(e)
+            return None
+
+    # Выполнение Lua-скрипта (EVALSHA, скрипт загружается на сервер один раз)
+    async def run_script(self, script: str, keys: Iterable[str] = (), args: Iterable[Any] = ()):
+        if not await self._ensure():
+            return None
+        try:
+            registered = self._scripts.get(script)
+            if registered is None:
+                registered = self._scripts[script] = self.redis_client.register_script(script)
+            return await registered(keys=list(keys), args=list(args))
+        except Exception as e:
+            await self._failed(e)
+            return None
+
+    # ============================================================
+    # Хэши
+
+    # Получение поля хэша
+    async def hget(self, key: str, field: str, default=None):
+        if not await self._ensure():
+            return default
+        try:
+            raw = await self.redis_client.hget(key, field)
+            return default if raw is None else self.loads(raw)
+        except Exception as e:
+            await self._failed(e)
+            return default
+
+    # Получение нескольких полей хэша (отсутствующие поля не попадают в результат)
+    async def hmget(self, key: str, fields: Iterable[str]) -> Dict[str, Any]:
+        fields = list(fields)
+        if not fields or not await self._ensure():
+            return {}
+        try:
+            values = await self.redis_client.hmget(key, fields)
+            return {field: self.loads(raw) for field, raw in zip(fields, values) if raw is not None}
+        except Exception as e:
+            await self._failed(e)
+            return {}
+
+    # Получение всего хэша
+    async def hgetall(self, key: str) -> Dict[str, Any]:
+        if not await self._ensure():
+            return {}
+        try:
+            return {field.decode(): self.loads(raw) for field, raw in (await self.redis_client.hgetall(key)).items()}
+        except Exception as e:
+            await self._failed(e)
+            return {}
+
+    # Запись полей хэша (ttl - время жизни всего хэша)
+    async def hset(self, key: str, mapping: Mapping[str, Any], ttl: Optional[int] = None) -> bool:
+        if not mapping or not await self._ensure():
+            return not mapping
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.hset(key, mapping={field: self.dumps(value) for field, value in mapping.items()})
+                if ttl:
+                    pipe.expire(key, ttl)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            await self._failed(e)
+            return False
+
+    # Удаление полей хэша
+    async def hdel(self, key: str, *fields: str) -> int:
+        if not fields or not await self._ensure():
+            return 0
+        try:
+            return await self.redis_client.hdel(key, *fields)
+        except Exception as e:
+            await self._failed(e)
+            return 0
+
+    # ============================================================
+    # Упорядоченные множества (элементы - строки, без сериализации)
+
+    # Добавление элементов {элемент: вес}
+    async def zadd(self, key: str, mapping: Mapping[str, float], ttl: Optional[int] = None) -> int:
+        if not mapping or not await self._ensure():
+            return 0
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.zadd(key, dict(mapping))
+                if ttl:
+                    pipe.expire(key, ttl)
+                added, *_ = await pipe.execute()
+            return added
+        except Exception as e:
+            await self._failed(e)
+            return 0
+
+    # Изменение веса элемента
+    async def zincrby(self, key: str, member: str, amount: float = 1) -> Optional[float]:
+        if not await self._ensure():
+            return None
+        try:
+            return await self.redis_client.zincrby(key, amount, member)
+        except Exception as e:
+            await self._failed(e)
+            return None
+
+    # Элементы по позиции (desc - по убыванию веса)
+    async def zrange(self, key: str, start: int = 0, end: int = -1, desc: bool = False,
+                     withscores: bool = False) -> List[Union[str, tuple]]:
+        if not await self._ensure():
+            return []
+        try:
+            items = await self.redis_client.zrange(key, start, end, desc=desc, withscores=withscores)
+            return [(member.decode(), score) for member, score in items] if withscores else [member.decode() for member in items]
+        except Exception as e:
+            await self._failed(e)
+            return []
+
+    # Элементы по диапазону веса (постранично: offset/count)
+    async def zrange_by_score(self, key: str, minimum: float = float("-inf"), maximum: float = float("inf"),
+                              offset: Optional[int] = None, count: Optional[int] = None,
+                              withscores: bool = False) -> List[Union[str, tuple]]:
+        if not await self._ensure():
+            return []
+        try:
+            items = await self.redis_client.zrangebyscore(key, minimum, maximum, start=offset, num=count, withscores=withscores)
+            return [(member.decode(), score) for member, score in items] if withscores else [member.decode() for member in items]
+        except Exception as e:
+            await self._failed(e)
+            return []
+
+    # Вес элемента
+    async def zscore(self, key: str, member: str) -> Optional[float]:
+        if not await self._ensure():
+            return None
+        try:
+            return await self.redis_client.zscore(key, member)
+        except Exception as e:
+            await self._failed(e)
+            return None
+
+    # Удаление элементов
+    async def zrem(self, key: str, *members: str) -> int:
+        if not members or not await self._ensure():
+            return 0
+        try:
+            return await self.redis_client.zrem(key, *members)
+        except Exception as e:
+            await self._failed(e)
+            return 0
+
+    # ============================================================
+    # Локальный кэш
+
+    # Ключ подходит для локального кэша
+    def _cacheable(self, key: str) -> bool:
+        return not self.local_cache_prefixes or key.startswith(self.local_cache_prefixes)
+
+    # Получение уведомлений об изменении ключей (CLIENT TRACKING BCAST с перенаправлением в pub/sub соединение)
+    async def _track_invalidations(self):
+        delay = 1
+        while True:
+            pubsub = self.redis_client.pubsub()
+            tracker = redis.Redis(connection_pool=redis.ConnectionPool(**self.pool.connection_kwargs, max_connections=1))
+            try:
+                # ID соединения, в которое сервер будет присылать уведомления
+                await pubsub.execute_command("CLIENT", "ID")
+                client_id = await pubsub.parse_response()
+                await pubsub.subscribe("__redis__:invalidate")
+
+                # Отслеживание ключей с нужными префиксами (соединение tracker держим открытым)
+                prefixes = [arg for prefix in self.local_cache_prefixes for arg in ("PREFIX", prefix)]
+                await tracker.execute_command("CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST", *prefixes)
+                self.local_cache.invalidate()  # Изменения до начала отслеживания неизвестны
+                delay = 1
+
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    keys = message["data"]
+                    self.local_cache.invalidate(None if keys is None else [key.decode() for key in keys])
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await self.handle_error(e)
+            finally:
+                # Без отслеживания локальному кэшу доверять нельзя
+                self.local_cache.invalidate()
+                await pubsub.aclose()
+                await tracker.aclose(close_connection_pool=True)
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+
+    # Статистика пула и локального кэша
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "connected": self.connected,
+            "serializer": self.serializer,
+            "max_connections": self.pool.max_connections,
+            "in_use": len(self.pool._in_use_connections),
+            "available": len(self.pool._available_connections),
+        }
+        if self.local_cache is not None:
+            stats["local_cache"] = {
+                "size": len(self.local_cache.data),
+                "hits": self.local_cache.hits,
+                "misses": self.local_cache.misses,
+            }
+        return stats
+
     @staticmethod
     async def handle_error(error: Exception) -> None:
         print(f"redis [ERROR] - {str(error)}")
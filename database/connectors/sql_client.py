@@ -1,15 +1,64 @@
-from typing import Optional, List, Dict, Any, Union, Type
+from typing import Optional, List, Dict, Any, Union, Type, AsyncIterator, Callable
 from urllib.parse import quote_plus
-from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+import functools
+import asyncio
+import time
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import text
-from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError, InterfaceError, IntegrityError, ProgrammingError, StatementError
+from sqlalchemy import select, insert, update, delete, tuple_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from database.connectors import engine_registry, sql_stats
+from settings.get_config import get_config
+from logger import sender as lg
+
+
+# Разбиение списка на пакеты
+def _chunks(rows: List[Any], size: int):
+    size = max(1, int(size))
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+# UPDATE с возвратом измененных строк для MySQL (нет RETURNING): первичные ключи строк по условию
+# блокируются SELECT ... FOR UPDATE, обновление и повторное чтение выполняются по этим ключам.
+# Чтение по исходному условию вернуло бы неверные строки, если обновление меняет поля условия
+async def _update_returning_mysql(session, model: Type, filters: Any, values: dict, selected: list) -> List[Dict[str, Any]]:
+    primary = list(model.__table__.primary_key.columns)
+    query = select(*primary).with_for_update()
+    query = query.filter_by(**filters) if isinstance(filters, dict) else query.where(filters)
+    keys = [tuple(row) for row in (await session.execute(query)).all()]
+    if not keys:
+        return []
+
+    condition = primary[0].in_([key[0] for key in keys]) if len(primary) == 1 else tuple_(*primary).in_(keys)
+    await session.execute(update(model).where(condition).values(**values).execution_options(synchronize_session=False))
+    return [dict(row) for row in (await session.execute(select(*selected).where(condition))).mappings()]
+
+
+# Замер времени выполнения метода клиента (с разбивкой по модели)
+def instrumented(method):
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        result = await method(self, *args, **kwargs)
+
+        target = kwargs.get("model", args[0] if args else None)
+        target = target.__name__ if isinstance(target, type) else "sql"
+        rows = len(result) if isinstance(result, list) else result if type(result) is int else None
+        sql_stats.record_method(method.__name__, target, time.perf_counter() - started, rows)
+        return result
+    return wrapper
 
 
 class Client:
-    def __init__(self, db_type: str, host: str, port: int, username: str, password: str, database: str):
+    def __init__(self, db_type: str, host: str, port: int, username: str, password: str, database: str,
+                 report_to_logger: bool = True, **pool_options):
         # Установка значений переменных
         self.db_type = db_type
         self.host = host
@@ -17,51 +66,131 @@ class Client:
         self.username = username
         self.password = password
         self.database = database
+        self.pool_options = pool_options  # pool_size, max_overflow, pool_recycle, statement_cache_size, ...
+        # False - ошибки и медленные запросы только в консоль: клиент, которым consumer пишет логи в БД,
+        # иначе порождает новые логи о собственных ошибках (бесконечная петля через RabbitMQ)
+        self.report_to_logger = report_to_logger
 
         # Служебные переменные
         self.connected = False
+        self.url: Optional[str] = None
         self.engine = None
         self.async_session: Optional[sessionmaker] = None
-        self._last_check: datetime = datetime.min
-        self._reconnect_interval = timedelta(minutes=30)
+
+        # Проверка состояния: фоновый SELECT 1 и повторное подключение с экспоненциальной паузой
+        health = get_config().get("sql_health", {})
+        self.health_interval = float(health.get("interval", 30))
+        self.health_timeout = float(health.get("timeout", 5))
+        self.backoff_base = float(health.get("backoff_base", 1))
+        self.backoff_max = float(health.get("backoff_max", 60))
+        self._failures = 0
+        self._retry_at = 0.0
+        self._connect_lock = asyncio.Lock()
+        self._health_task: Optional[asyncio.Task] = None
+
+    # Формирование строки подключения в зависимости от типа СУБД
+    def build_url(self) -> str:
+        # Преобразование пароля
+        quoted_password = quote_plus(self.password)
+
+        if self.db_type in ["postgres", "timescale"]:
+            return f"postgresql+asyncpg://{self.username}:{quoted_password}@{self.host}:{self.port}/{self.database}"
+        elif self.db_type == "mysql":
+            return f"mysql+asyncmy://{self.username}:{quoted_password}@{self.host}:{self.port}/{self.database}"
+        raise ValueError(f"Unsupported relational database type: {self.db_type}")
 
     # Подключение к СУБД
     async def connect(self):
         try:
+            # Получение общего для процесса движка SQLAlchemy (один пул на DSN)
+            self.url = self.build_url()
+            self.engine = engine_registry.get_engine(self.url, **self.pool_options)
+            if not self.report_to_logger:
+                sql_stats.mute(self.engine)
 
-            # Преобразование пароля
-            quoted_password = quote_plus(self.password)
-
-            # Формирование строки подключения в зависимости от типа СУБД
-            if self.db_type in ["postgres", "timescale"]:
-                url = f"postgresql+asyncpg://{self.username}:{quoted_password}@{self.host}:{self.port}/{self.database}"
-            elif self.db_type == "mysql":
-                url = f"mysql+asyncmy://{self.username}:{quoted_password}@{self.host}:{self.port}/{self.database}"
-            else:
-                raise ValueError(f"Unsupported relational database type: {self.db_type}")
-
-            # Инициализация асинхронного движка SQLAlchemy
-            self.engine = create_async_engine(url, echo=False, pool_pre_ping=True)
+            # После сбоя закрываем старые соединения пула перед повторной попыткой
+            if self._failures:
+                await engine_registry.reset_engine(self.url)
 
             # Тест запроса на подключение
-            async with self.engine.connect() as conn:
-                await conn.execute(text("SELECT 1"))
+            await self._ping()
 
             # Создание асинхронной сессии
             self.async_session = sessionmaker(self.engine, expire_on_commit=False, class_=AsyncSession)
             self.connected = True
-            self._last_check = datetime.now()
+            self._failures = 0
         except Exception as e:
             await self.handle_error(e)
-            self.connected = False
+            self._mark_failed()
+
+        # Запуск фоновой проверки состояния (один раз на клиент)
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_loop())
 
-    # Проверка подключения или переподключение при истечении таймера
+    # Проверка подключения без переподключения в запросе (повтор только после паузы backoff)
     async def is_connected(self) -> bool:
-        if not self.connected or datetime.now() - self._last_check > self._reconnect_interval:
-            await self.connect()
+        if self.connected:
+            return True
+        if time.monotonic() < self._retry_at:
+            return False
+
+        async with self._connect_lock:
+            if not self.connected and time.monotonic() >= self._retry_at:
+                await self.connect()
         return self.connected
 
+    # Закрытие клиента: остановка фоновой проверки (движок остается в общем реестре)
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        self.connected = False
+
+    # Фоновая проверка состояния подключения
+    async def _health_loop(self):
+        while True:
+            delay = self.health_interval if self.connected else max(0.0, self._retry_at - time.monotonic())
+            await asyncio.sleep(delay)
+
+            if self.connected:
+                try:
+                    await self._ping()
+                except Exception as e:
+                    await self.handle_error(e)  # Ошибка соединения уже отмечена сбоем в handle_error
+                    if self.connected:
+                        self._mark_failed()
+            else:
+                async with self._connect_lock:
+                    if not self.connected and time.monotonic() >= self._retry_at:
+                        await self.connect()
+
+    # Тестовый запрос к СУБД
+    async def _ping(self):
+        async with self.engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), self.health_timeout)
+
+    # Отметка о сбое подключения и расчет следующей попытки (экспоненциальная пауза)
+    def _mark_failed(self):
+        self.connected = False
+        self._failures += 1
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (self._failures - 1))
+        self._retry_at = time.monotonic() + delay
+
+    # Открытие сессии с замером ожидания соединения из пула
+    @asynccontextmanager
+    async def _session(self):
+        async with self.async_session() as session:
+            started = time.perf_counter()
+            await session.connection()
+            engine_registry.get_stats(self.url).record_wait(time.perf_counter() - started)
+            yield session
+
+    # Статистика пула соединений клиента
+    def pool_stats(self) -> Dict[str, Any]:
+        return engine_registry.engine_stats(self.url) if self.url else {}
+
     # Создание таблицы модели, если она ещё не существует
+    @instrumented
     async def create_table_if_not_exists(self, model: Type):
         if not await self.is_connected():
             return
@@ -72,13 +201,14 @@ class Client:
             await self.handle_error(e)
 
     # Выполнение произвольного SQL-запроса
+    @instrumented
     async def execute(self, query: str, params: Optional[Union[Dict[str, Any], tuple]] = None, fetch_one: bool = False) -> Union[List[Dict[str, Any]], Dict[str, Any], None]:
         if not await self.is_connected():
             return []
 
         try:
             # Открытие сессии и выполнение запроса
-            async with self.async_session() as session:
+            async with self._session() as session:
                 result = await session.execute(text(query), params)
                 keys = result.keys()
                 rows = [dict(zip(keys, row)) for row in result]
@@ -90,13 +220,27 @@ class Client:
             return []
 
     # Вставка записи по переданным полям
-    async def insert_model(self, model: Type, data: dict):
+    @instrumented
+    async def insert_model(self, model: Type, data: dict, refresh: bool = True, raise_conflict: bool = False):
+        """
+        :param model: ORM модель таблицы
+        :param data: Поля новой записи
+        :param refresh: Перечитать запись из БД (значения по умолчанию, автоинкремент); False - один запрос INSERT
+        :param raise_conflict: Пробросить IntegrityError (нарушение ключа) вызывающему коду вместо логирования
+        :return: Словарь полей записи или None при ошибке
+        """
+
         # Если Бд - не подключена
         if not await self.is_connected():
             return
 
         try:
-            async with self.async_session() as session:
+            async with self._session() as session:
+                if not refresh:
+                    await session.execute(insert(model).values(**data))
+                    await session.commit()
+                    return dict(data)
+
                 instance = model(**data)
                 session.add(instance)
                 await session.commit()
@@ -107,15 +251,295 @@ class Client:
                     k: v for k, v in vars(instance).items()
                     if not k.startswith("_")
                 }
+        except IntegrityError as e:
+            if raise_conflict:
+                raise
+            await self.handle_error(e)
+        except Exception as e:
+            await self.handle_error(e)
+
+    # Массовая вставка записей в одной транзакции пакетами по chunk_size (executemany / multi-VALUES)
+    @instrumented
+    async def insert_many(self, model: Type, rows: List[dict], chunk_size: int = 1000) -> Optional[int]:
+        if not rows:
+            return 0
+        if not await self.is_connected():
+            return None
+
+        try:
+            async with self._session() as session:
+                for chunk in _chunks(rows, chunk_size):
+                    await session.execute(insert(model), chunk)
+                await session.commit()
+                return len(rows)
+        except Exception as e:
+            await self.handle_error(e)
+            return None
+
+    # Массовая вставка или обновление (ON CONFLICT для PostgreSQL, ON DUPLICATE KEY для MySQL)
+    @instrumented
+    async def upsert_many(self, model: Type, rows: List[dict], conflict_keys: Optional[List[str]] = None,
+                          update_fields: Optional[List[str]] = None, chunk_size: int = 500,
+                          update_expressions: Optional[Dict[str, Callable[[Any], Any]]] = None,
+                          guard: Optional[tuple] = None) -> Optional[int]:
+        """
+        :param model: ORM модель таблицы
+        :param rows: Список записей (словари с одинаковым набором полей)
+        :param conflict_keys: Поля уникального ключа (по умолчанию - первичный ключ, только PostgreSQL)
+        :param update_fields: Поля для обновления при конфликте (по умолчанию - все поля записи, кроме ключа)
+        :param chunk_size: Количество записей в одном INSERT
+        :param update_expressions: Выражения для полей при конфликте: поле -> функция(новая строка) -> выражение
+                                   (например, {"total": lambda new: Model.total + new.total})
+        :param guard: Пара (модель, запись) - метка, вставляемая в той же транзакции. Если метка уже есть,
+                      записи не изменяются (повторное применение того же пакета ничего не меняет)
+        :return: Количество обработанных записей (0 - пакет уже применен) или None при ошибке
+        """
+
+        if not rows:
+            return 0
+        if not await self.is_connected():
+            return None
+
+        keys = conflict_keys or [column.name for column in model.__table__.primary_key.columns]
+        fields = update_fields if update_fields is not None else [k for k in rows[0] if k not in keys]
+        fields = [f for f in fields if f not in (update_expressions or {})]
+
+        try:
+            async with self._session() as session:
+                # Метка пакета: если уже вставлена - пакет применен ранее
+                if guard is not None:
+                    guard_model, guard_row = guard
+                    if self.db_type == "mysql":
+                        result = await session.execute(mysql_insert(guard_model).values(guard_row).prefix_with("IGNORE"))
+                    else:
+                        result = await session.execute(pg_insert(guard_model).values(guard_row).on_conflict_do_nothing())
+                    if not result.rowcount:
+                        await session.rollback()
+                        return 0
+
+                for chunk in _chunks(rows, chunk_size):
+                    if self.db_type == "mysql":
+                        stmt = mysql_insert(model).values(chunk)
+                        new = stmt.inserted
+                    else:
+                        stmt = pg_insert(model).values(chunk)
+                        new = stmt.excluded
+
+                    values = {f: new[f] for f in fields}
+                    values.update({f: expression(new) for f, expression in (update_expressions or {}).items()})
+
+                    if self.db_type == "mysql":
+                        stmt = stmt.on_duplicate_key_update(values or {f: new[f] for f in keys})
+                    else:
+                        stmt = stmt.on_conflict_do_update(index_elements=keys, set_=values) \
+                            if values else stmt.on_conflict_do_nothing(index_elements=keys)
+                    await session.execute(stmt)
+                await session.commit()
+                return len(rows)
+        except Exception as e:
+            await self.handle_error(e)
+            return None
+
+    # Обновление записей одним запросом UPDATE ... WHERE с возвратом измененных строк
+    @instrumented
+    async def update_where(self, model: Type, filters: Any, values: dict,
+                           returning: Union[bool, List[str]] = False) -> Union[int, List[Dict[str, Any]], None]:
+        """
+        :param model: ORM модель таблицы
+        :param filters: Условие (выражение SQLAlchemy) или словарь поле=значение
+        :param values: Новые значения полей
+        :param returning: True - вернуть все поля измененных строк, список - только указанные поля
+        :return: Количество измененных строк, список измененных строк (returning) или None при ошибке
+        """
+
+        if not await self.is_connected():
+            return None
+
+        columns = model.__table__.columns
+        selected = [columns[name] for name in returning] if isinstance(returning, list) else list(columns)
+
+        try:
+            async with self._session() as session:
+                stmt = update(model).values(**values).execution_options(synchronize_session=False)
+                stmt = stmt.filter_by(**filters) if isinstance(filters, dict) else stmt.where(filters)
+
+                # PostgreSQL: RETURNING в том же запросе; MySQL: обновление по заблокированным ключам
+                if returning:
+                    if self.db_type == "mysql":
+                        rows = await _update_returning_mysql(session, model, filters, values, selected)
+                    else:
+                        rows = [dict(row) for row in (await session.execute(stmt.returning(*selected))).mappings()]
+                    await session.commit()
+                    return rows
+
+                result = await session.execute(stmt)
+                await session.commit()
+                return result.rowcount
+        except Exception as e:
+            await self.handle_error(e)
+            return None
+
+    # Обновление набора записей разными значениями в одной транзакции
+    @instrumented
+    async def update_batch(self, model: Type, items: List[tuple], returning: Union[bool, List[str]] = True,
+                           atomic: bool = True) -> Optional[List[Union[int, List[Dict[str, Any]]]]]:
+        """
+        :param model: ORM модель таблицы
+        :param items: Список пар (условие или словарь поле=значение, новые значения)
+        :param returning: Как в update_where: вернуть измененные строки (True / список полей) или количество
+        :param atomic: Откатить всю транзакцию, если хотя бы одно условие не затронуло ни одной строки
+        :return: Результат update_where для каждой пары (в том же порядке) или None при ошибке.
+                 При atomic=True наличие пустого результата означает, что изменения не сохранены
+        """
+
+        if not items:
+            return []
+        if not await self.is_connected():
+            return None
+
+        columns = model.__table__.columns
+        selected = [columns[name] for name in returning] if isinstance(returning, list) else list(columns)
+
+        try:
+            async with self._session() as session:
+                results = []
+                for filters, values in items:
+                    stmt = update(model).values(**values).execution_options(synchronize_session=False)
+                    stmt = stmt.filter_by(**filters) if isinstance(filters, dict) else stmt.where(filters)
+
+                    if returning and self.db_type == "mysql":
+                        results.append(await _update_returning_mysql(session, model, filters, values, selected))
+                    elif returning:
+                        result = await session.execute(stmt.returning(*selected))
+                        results.append([dict(row) for row in result.mappings()])
+                    else:
+                        # rowcount - найденные строки, а не измененные (MySQL: флаг CLIENT_FOUND_ROWS в engine_registry)
+                        results.append((await session.execute(stmt)).rowcount)
+
+                if atomic and not all(results):
+                    await session.rollback()
+                else:
+                    await session.commit()
+                return results
+        except Exception as e:
+            await self.handle_error(e)
+            return None
+
+    # Удаление записей по условию одним запросом DELETE ... WHERE
+    @instrumented
+    async def delete_where(self, model: Type, filters: Any) -> Optional[int]:
+        """
+        :param model: ORM модель таблицы
+        :param filters: Условие (выражение SQLAlchemy) или словарь поле=значение
+        :return: Количество удаленных строк или None при ошибке
+        """
+
+        if not await self.is_connected():
+            return None
+        try:
+            async with self._session() as session:
+                stmt = delete(model).execution_options(synchronize_session=False)
+                stmt = stmt.filter_by(**filters) if isinstance(filters, dict) else stmt.where(filters)
+                result = await session.execute(stmt)
+                await session.commit()
+                return result.rowcount
+        except Exception as e:
+            await self.handle_error(e)
+            return None
+
+    # Добавление связей в таблицу связей (составной первичный ключ): существующие пары пропускаются
+    @instrumented
+    async def add_relations(self, model: Type, rows: List[dict], chunk_size: int = 1000) -> Optional[int]:
+        """
+        :param model: ORM модель таблицы связей
+        :param rows: Пары ключей (например, [{"news_id": 1, "user_id": 42}])
+        :param chunk_size: Количество пар в одном INSERT
+        :return: Количество новых связей или None при ошибке
+        """
+
+        if not rows:
+            return 0
+        if not await self.is_connected():
+            return None
+
+        keys = [column.name for column in model.__table__.primary_key.columns]
+        try:
+            async with self._session() as session:
+                added = 0
+                for chunk in _chunks(rows, chunk_size):
+                    if self.db_type == "mysql":
+                        stmt = mysql_insert(model).values(chunk).prefix_with("IGNORE")
+                    else:
+                        stmt = pg_insert(model).values(chunk).on_conflict_do_nothing(index_elements=keys)
+                    added += (await session.execute(stmt)).rowcount
+                await session.commit()
+                return added
+        except Exception as e:
+            await self.handle_error(e)
+            return None
+
+    # Удаление связей по парам ключей (замер - в delete_where)
+    async def remove_relations(self, model: Type, rows: List[dict]) -> Optional[int]:
+        """
+        :param model: ORM модель таблицы связей
+        :param rows: Пары ключей удаляемых связей
+        :return: Количество удаленных связей или None при ошибке
+        """
+
+        if not rows:
+            return 0
+        keys = [column.name for column in model.__table__.primary_key.columns]
+        columns = tuple_(*[model.__table__.c[key] for key in keys])
+        return await self.delete_where(model, columns.in_([tuple(row[key] for key in keys) for row in rows]))
+
+    # Проверка существования записи по условию (SELECT EXISTS, поиск по индексу без чтения строк)
+    @instrumented
+    async def exists_where(self, model: Type, filters: Any) -> Optional[bool]:
+        """
+        :param model: ORM модель таблицы
+        :param filters: Условие (выражение SQLAlchemy) или словарь поле=значение
+        :return: True / False или None при ошибке
+        """
+
+        if not await self.is_connected():
+            return None
+        try:
+            query = select(model)
+            query = query.filter_by(**filters) if isinstance(filters, dict) else query.where(filters)
+            async with self._session() as session:
+                return bool(await session.scalar(select(query.exists())))
         except Exception as e:
             await self.handle_error(e)
+            return None
+
+    # Количество записей по условию (SELECT COUNT(*))
+    @instrumented
+    async def count_where(self, model: Type, filters: Optional[Any] = None) -> Optional[int]:
+        """
+        :param model: ORM модель таблицы
+        :param filters: Условие (выражение SQLAlchemy) или словарь поле=значение (None - вся таблица)
+        :return: Количество записей или None при ошибке
+        """
+
+        if not await self.is_connected():
+            return None
+        try:
+            query = select(func.count()).select_from(model)
+            if filters is not None:
+                query = query.filter_by(**filters) if isinstance(filters, dict) else query.where(filters)
+            async with self._session() as session:
+                return int(await session.scalar(query))
+        except Exception as e:
+            await self.handle_error(e)
+            return None
 
     # Обновление записи по фильтру и новым данным
+    @instrumented
     async def update_fields(self, model: Type, filter_by: dict, new_data: dict):
         if not await self.is_connected():
             return
         try:
-            async with self.async_session() as session:
+            async with self._session() as session:
                 stmt = select(model).filter_by(**filter_by)
                 result = await session.execute(stmt)
                 instance = result.scalars().first()
@@ -139,12 +563,13 @@ class Client:
             await self.handle_error(e)
 
     # Выборка моделей из БД с фильтрацией (ORM)
+    @instrumented
     async def select_model(self, model: Type, filters: Optional[Any] = None, fetch_one: bool = False) -> List[Any]:
         if not await self.is_connected():
             return []
         try:
             # Открытие сессии и выполнение запроса
-            async with self.async_session() as session:
+            async with self._session() as session:
                 stmt = select(model)  # Создание запроса SELECT * FROM model WHERE filters
 
                 # Добавляем фильтр при наличии
@@ -157,6 +582,145 @@ class Client:
             await self.handle_error(e)
             return []
 
-    # Обработка и вывод ошибок
+    # Выборка строк без создания ORM-объектов: только нужные поля, сортировка и пагинация
+    @instrumented
+    async def select_rows(self, model: Type, columns: Optional[List[str]] = None, filters: Optional[Any] = None,
+                          order_by: Optional[List[Any]] = None, limit: Optional[int] = None, offset: Optional[int] = None,
+                          after: Optional[Any] = None, fetch_one: bool = False) -> Union[List[Dict[str, Any]], Dict[str, Any], None]:
+        """
+        :param model: ORM модель таблицы
+        :param columns: Список полей для выборки (по умолчанию - все поля таблицы)
+        :param filters: Условие (выражение SQLAlchemy) или словарь поле=значение
+        :param order_by: Поля сортировки: имя поля, "-имя" для обратного порядка или выражение SQLAlchemy
+        :param limit: Максимальное количество строк
+        :param offset: Смещение (пагинация limit/offset)
+        :param after: Значение (или кортеж значений) полей order_by последней строки предыдущей страницы
+                      (keyset-пагинация, поля order_by сортируются в одном направлении)
+        :param fetch_one: Вернуть только первую строку
+        :return: Список словарей, словарь (fetch_one) или None
+        """
+
+        if not await self.is_connected():
+            return None if fetch_one else []
+        try:
+            stmt = self._build_select(model, columns, filters, order_by, limit, offset, after)
+            async with self._session() as session:
+                result = await session.execute(stmt.limit(1) if fetch_one else stmt)
+                if fetch_one:
+                    row = result.mappings().first()
+                    return dict(row) if row is not None else None
+                return [dict(row) for row in result.mappings()]
+        except Exception as e:
+            await self.handle_error(e)
+            return None if fetch_one else []
+
+    # Потоковое чтение строк таблицы серверным курсором (память не зависит от размера таблицы)
+    async def stream_rows(self, model: Type, columns: Optional[List[str]] = None, filters: Optional[Any] = None,
+                          order_by: Optional[List[Any]] = None, fetch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Использование: async for row in DB.stream_rows(QueryModel, fetch_size=5000): ...
+
+        :param model: ORM модель таблицы
+        :param columns: Список полей для выборки (по умолчанию - все поля таблицы)
+        :param filters: Условие (выражение SQLAlchemy) или словарь поле=значение
+        :param order_by: Поля сортировки (как в select_rows)
+        :param fetch_size: Количество строк, получаемых с сервера за одну выборку
+        :return: Асинхронный итератор словарей. В отличие от остальных методов ошибка не скрывается:
+                 после логирования она пробрасывается (ConnectionError - БД недоступна), поэтому
+                 завершение итерации без исключения означает, что прочитаны все строки
+        """
+
+        stmt = self._build_select(model, columns, filters, order_by)
+        async for row in self._stream(stmt, None, fetch_size):
+            yield row
+
+    # Потоковое выполнение произвольного SQL-запроса серверным курсором
+    async def stream(self, query: str, params: Optional[Dict[str, Any]] = None, fetch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        async for row in self._stream(text(query), params, fetch_size):
+            yield row
+
+    # Неполный результат нельзя отличить от полного по строкам - ошибка пробрасывается вызывающему коду
+    async def _stream(self, stmt, params: Optional[Dict[str, Any]], fetch_size: int) -> AsyncIterator[Dict[str, Any]]:
+        if not await self.is_connected():
+            raise ConnectionError(f"{self.db_type}: нет подключения к БД")
+        try:
+            async with self._session() as session:
+                result = await session.stream(stmt.execution_options(yield_per=fetch_size), params)
+                async for partition in result.mappings().partitions(fetch_size):
+                    for row in partition:
+                        yield dict(row)
+        except Exception as e:
+            await self.handle_error(e)
+            raise
+
+    # Сборка SELECT по полям, фильтрам, сортировке и пагинации
+    @staticmethod
+    def _build_select(model: Type, columns: Optional[List[str]] = None, filters: Optional[Any] = None,
+                      order_by: Optional[List[Any]] = None, limit: Optional[int] = None, offset: Optional[int] = None,
+                      after: Optional[Any] = None):
+        table_columns = model.__table__.columns
+        stmt = select(*(table_columns[name] for name in columns)) if columns else select(*table_columns)
+
+        # Фильтрация
+        if isinstance(filters, dict):
+            stmt = stmt.where(*(table_columns[name] == value for name, value in filters.items()))
+        elif filters is not None:
+            stmt = stmt.where(filters)
+
+        # Сортировка
+        order_columns, descending = [], False
+        for item in order_by or []:
+            if isinstance(item, str):
+                descending = item.startswith("-")
+                column = table_columns[item.lstrip("-")]
+                order_columns.append(column)
+                stmt = stmt.order_by(column.desc() if descending else column.asc())
+            else:
+                stmt = stmt.order_by(item)
+
+        # Keyset-пагинация: строки после последней строки предыдущей страницы (по полям order_by)
+        if after is not None:
+            if not order_columns:
+                raise ValueError("Для пагинации по after необходимо указать order_by именами полей")
+            values = after if isinstance(after, (tuple, list)) else (after,)
+            key, bound = (order_columns[0], values[0]) if len(order_columns) == 1 else (tuple_(*order_columns), tuple_(*values))
+            stmt = stmt.where(key < bound if descending else key > bound)
+
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        if offset is not None:
+            stmt = stmt.offset(offset)
+        return stmt
+
+    # Обработка и вывод ошибок (ошибки соединения переводят клиент в режим переподключения)
     async def handle_error(self, error: Exception) -> None:
         print(f"{self.db_type} [ERROR] - {str(error)}")
+
+        code = self._error_code(error)
+        if self._is_connection_error(error) and self.connected:
+            self._mark_failed()
+        if not self.report_to_logger:
+            return
+        try:
+            lg.error(f"{self.db_type}: {str(error)[:500]}", module="database", code=code)
+        except RuntimeError:
+            pass  # Нет запущенного event loop
+
+    # Код ошибки СУБД (см. logger/code_errors.py)
+    def _error_code(self, error: Exception) -> int:
+        if self._is_connection_error(error):
+            return 20002 if self.connected else 20001
+        if isinstance(error, IntegrityError):
+            return 20401
+        if isinstance(error, ProgrammingError):
+            return 20101
+        if isinstance(error, StatementError) and str(error.statement).lstrip().upper().startswith("SELECT"):
+            return 20102
+        return 20103
+
+    # Проверка, что ошибка вызвана потерей соединения с СУБД
+    @staticmethod
+    def _is_connection_error(error: Exception) -> bool:
+        if isinstance(error, DBAPIError) and error.connection_invalidated:
+            return True
+        return isinstance(error, (InterfaceError, ConnectionError, OSError, asyncio.TimeoutError))
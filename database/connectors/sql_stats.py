@@ -0,0 +1,153 @@
+import re  # Нормализация SQL
+import time  # Замер времени выполнения
+from typing import Dict, Any, Optional  # Типы данных
+
+from sqlalchemy import event  # События движка SQLAlchemy
+
+from settings.get_config import get_config  # Получение локального конфига
+from logger import sender as lg  # Логер
+
+
+# Настройки сбора статистики
+config = get_config().get("sql_stats", {})
+SLOW_QUERY_MS = float(config.get("slow_query_ms", 500))
+MAX_STATEMENTS = int(config.get("max_statements", 500))
+
+# Границы корзин гистограммы задержек (мс)
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+# Гистограмма задержек с количеством, суммой и максимумом
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+    def record(self, ms: float, rows: Optional[int] = None):
+        index = 0
+        while index < len(BUCKETS_MS) and ms > BUCKETS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+        if rows is not None and rows > 0:
+            self.rows += rows
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max, 3),
+            "rows": self.rows,
+            "buckets": {label: n for label, n in zip(labels, self.buckets) if n},
+        }
+
+
+# Накопленная статистика процесса
+_statements: Dict[str, Histogram] = {}
+_methods: Dict[str, Histogram] = {}
+_slow_queries = 0
+
+# Движки, медленные запросы которых не отправляются в логер (БД, в которую пишет сам consumer логов)
+_muted = set()
+
+# Регулярные выражения нормализации SQL
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|%s|\?|:\w+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_GROUP = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_GROUPS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_SPACES = re.compile(r"\s+")
+
+
+# Нормализация SQL: параметры и литералы -> ?, списки значений и пакеты VALUES схлопываются
+def normalize_sql(statement: str) -> str:
+    sql = _PLACEHOLDER.sub("?", statement)
+    sql = _GROUP.sub("(?)", sql)
+    sql = _REPEATED_GROUPS.sub("(?), ...", sql)
+    return _SPACES.sub(" ", sql).strip()[:300]
+
+
+# Запись времени выполнения выражения
+def record_statement(statement: str, seconds: float, rows: Optional[int] = None, report: bool = True):
+    global _slow_queries
+
+    key = normalize_sql(statement)
+    histogram = _statements.get(key)
+    if histogram is None:
+        key = key if len(_statements) < MAX_STATEMENTS else "<other>"
+        histogram = _statements.setdefault(key, Histogram())
+
+    ms = seconds * 1000
+    histogram.record(ms, rows)
+
+    # Логирование медленных запросов
+    if ms >= SLOW_QUERY_MS:
+        _slow_queries += 1
+        code = 20102 if key.upper().startswith("SELECT") else 20103
+        if not report:
+            print(f"[database][WARNING] Медленный запрос ({ms:.0f} мс): {key}")
+            return
+        try:
+            lg.warning(f"Медленный запрос ({ms:.0f} мс): {key}", module="database", code=code)
+        except RuntimeError:
+            pass  # Нет запущенного event loop
+
+
+# Запись времени выполнения метода клиента (select_model, insert_model, ...)
+def record_method(method: str, target: str, seconds: float, rows: Optional[int] = None):
+    _methods.setdefault(f"{method}:{target}", Histogram()).record(seconds * 1000, rows)
+
+
+# Медленные запросы движка выводятся только в консоль (без отправки в RabbitMQ)
+def mute(engine):
+    _muted.add(engine.sync_engine)
+
+
+# Подключение к событиям движка (вызывается один раз на движок)
+def instrument(engine):
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        rowcount = getattr(cursor, "rowcount", -1)
+        record_statement(
+            statement, time.perf_counter() - started, rowcount if rowcount and rowcount > 0 else None,
+            report=conn.engine not in _muted,
+        )
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+# Статистика для API (задержки по выражениям и методам, пулы соединений)
+def stats() -> Dict[str, Any]:
+    from database.connectors import engine_registry  # Импорт здесь: реестр сам подключает статистику
+
+    return {
+        "slow_query_ms": SLOW_QUERY_MS,
+        "slow_queries": _slow_queries,
+        "statements": {key: h.to_dict() for key, h in _statements.items()},
+        "methods": {key: h.to_dict() for key, h in _methods.items()},
+        "pools": engine_registry.pool_stats(),
+    }
+
+
+# Сброс накопленной статистики
+def reset():
+    global _slow_queries
+    _statements.clear()
+    _methods.clear()
+    _slow_queries = 0
@@ -1,9 +1,9 @@
 import asyncio
-import aiohttp
 
 from database.connectors.connector import get_client  # Клиент для подключения к СУБД
 from database.models.mysql import SettingsModel  # Модель СУБД MySQL
-from api.mysql.fastapi_app import get_url  # URL для общения с API
+from database.models.postgresql import NewsViewsModel, GroupUsersModel  # Таблицы связей PostgreSQL
+from settings import client as settings_client  # Клиент API настроек (кэш)
 from logger import sender as lg  # Логер
 from settings.get_config import get_config  # Получение локальных настроек
 
@@ -78,11 +78,18 @@ async def main():
     )
     print(settings)
 
+    # ============================================================
+    # Потоковое чтение всей таблицы через stream_rows() (память не зависит от размера таблицы)
+    async for row in mysql_client.stream_rows(
+        model=SettingsModel,  # Модель для выборки
+        columns=["key", "value"],  # Поля для выборки
+        fetch_size=500  # Количество строк за одну выборку с сервера
+    ):
+        print(f"{row['key']}: {row['value']}")
+
     # ============================================================
     # Пример подключения к СУБД через настройки из API
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f'{get_url()}/secret/many?tag=postgres') as response:
-            pg_settings = await response.json()
+    pg_settings = await settings_client.aget_many(tag="postgres")  # Ответ кэшируется клиентом настроек
     settings = {
         'db_type': 'postgres',
         'host': pg_settings['pg_host'],
@@ -95,6 +102,33 @@ async def main():
     await postgres_client.connect()
     print("PG Connected:", await postgres_client.is_connected())
 
+    # ============================================================
+    # Пример работы с таблицами связей: просмотры новости без чтения и перезаписи списка
+    await postgres_client.add_relations(NewsViewsModel, [{"news_id": 1, "user_id": user} for user in range(1000)])
+    seen = await postgres_client.exists_where(NewsViewsModel, {"news_id": 1, "user_id": 42})  # Поиск по первичному ключу
+    views = await postgres_client.count_where(NewsViewsModel, {"news_id": 1})
+    groups = await postgres_client.select_rows(GroupUsersModel, columns=["group_id"], filters={"user_id": 42})
+    await postgres_client.remove_relations(NewsViewsModel, [{"news_id": 1, "user_id": 42}])
+    print("Relations:", seen, views, groups)
+
+    # ============================================================
+    # Пример работы с Redis: пакетная запись и чтение одним запросом, хэши и пакет команд
+    rd_settings = await settings_client.aget_many(tag="redis")
+    redis_client = get_client(
+        db_type="redis",
+        host=rd_settings.get("rd_host", "localhost"),
+        port=rd_settings.get("rd_port", 6379),
+        username=None,
+        password=rd_settings.get("rd_password"),
+        database=rd_settings.get("rd_database", "0"),
+    )
+    await redis_client.mset({f"user:{i}": {"id": i, "role": "user"} for i in range(50)}, ttl=60)
+    users = await redis_client.mget([f"user:{i}" for i in range(50)])  # Один round-trip на 50 ключей
+    await redis_client.hset("user:1:profile", {"nick": "airborne", "rating": 4.8}, ttl=60)
+    results = await redis_client.batch([("zincrby", "rating", 1, "user:1"), ("hget", "user:1:profile", "nick")])
+    print("Redis:", len(users), results, redis_client.stats())
+    await redis_client.close()
+
     # ============================================================
     # Пример записи Telegram запроса в БД
     lg.query(12345, 54321, "message", "Привет, бот!", 150)
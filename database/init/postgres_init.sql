@@ -11,8 +11,28 @@ CREATE TABLE knowledge (
     type VARCHAR(16) NOT NULL, -- [file, text, keyboard]
     tag VARCHAR(64),  -- 'Любой текст'
     description TEXT, -- 'Любой текст'
-    meta JSONB NOT NULL, -- {'size', 'format', 'type'}
-    value TEXT -- ['Путь до файла', 'Текст', 'JSON клавиатура']
+    meta JSONB DEFAULT '{}' NOT NULL, -- {'name', 'ext', 'size', 'sha256', 'content_type'}
+    value TEXT -- ['SHA-256 файла', 'Текст', 'JSON клавиатура']
+);
+
+-- Файлы хранилища по содержимому (storage/blobs)
+CREATE TABLE blobs (
+    sha256 VARCHAR(64) PRIMARY KEY NOT NULL,
+    size BIGINT NOT NULL,
+    refs INT DEFAULT 0 NOT NULL,
+    created TIMESTAMP DEFAULT NOW() NOT NULL,
+    updated TIMESTAMP DEFAULT NOW() NOT NULL
+);
+
+-- Производные файлы (результаты конвертации блоба)
+CREATE TABLE blob_variants (
+    source VARCHAR(64) NOT NULL, -- SHA-256 исходного файла
+    variant VARCHAR(32) NOT NULL, -- [webp_1280, jpeg_1280, thumb, voice]
+    sha256 VARCHAR(64) NOT NULL, -- SHA-256 результата
+    size BIGINT NOT NULL,
+    content_type VARCHAR(64) NOT NULL,
+    created TIMESTAMP DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (source, variant)
 );
 
 -- Новости
@@ -25,9 +45,7 @@ CREATE TABLE news (
     text_id INT NOT NULL,
     images_id JSONB DEFAULT '[]',
     files_id JSONB DEFAULT '[]',
-    keyboard_id INT NOT NULL,
-    users JSONB DEFAULT '[]',
-    ignores JSONB DEFAULT '[]'
+    keyboard_id INT NOT NULL
 );
 
 -- Данные пользователей
@@ -48,8 +66,7 @@ CREATE TABLE users (
     device VARCHAR(64),
     role VARCHAR(16) DEFAULT 'user' NOT NULL,
     rating FLOAT DEFAULT 0 NOT NULL,
-    description TEXT,
-    groups JSONB DEFAULT '[]'
+    description TEXT
 );
 
 -- Группы пользователей
@@ -57,11 +74,7 @@ CREATE TABLE groups (
     id SERIAL PRIMARY KEY NOT NULL,
     name TEXT NOT NULL,
     tag VARCHAR(64),
-    description TEXT,
-    admins JSONB DEFAULT '[]' NOT NULL,
-    users JSONB DEFAULT '[]' NOT NULL,
-    invites JSONB DEFAULT '[]' NOT NULL,
-    events JSONB DEFAULT '[]' NOT NULL
+    description TEXT
 );
 
 -- События
@@ -70,13 +83,101 @@ CREATE TABLE events (
     name TEXT NOT NULL,
     description TEXT,
     date TIMESTAMP DEFAULT NOW() NOT NULL,
-    location TEXT,
-    users JSONB DEFAULT '[]' NOT NULL,
-    invites JSONB DEFAULT '[]' NOT NULL
+    location TEXT
+);
+
+-- Просмотры новостей
+CREATE TABLE news_views (
+    news_id INT NOT NULL,
+    user_id BIGINT NOT NULL,
+    created TIMESTAMP DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (news_id, user_id)
+);
+
+-- Оповещения о новостях
+CREATE TABLE news_invites (
+    news_id INT NOT NULL,
+    user_id BIGINT NOT NULL,
+    created TIMESTAMP DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (news_id, user_id)
+);
+
+-- Скрытые новости
+CREATE TABLE news_ignores (
+    news_id INT NOT NULL,
+    user_id BIGINT NOT NULL,
+    created TIMESTAMP DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (news_id, user_id)
+);
+
+-- Администраторы групп
+CREATE TABLE group_admins (
+    group_id INT NOT NULL,
+    user_id BIGINT NOT NULL,
+    created TIMESTAMP DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (group_id, user_id)
+);
+
+-- Участники групп
+CREATE TABLE group_users (
+    group_id INT NOT NULL,
+    user_id BIGINT NOT NULL,
+    created TIMESTAMP DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (group_id, user_id)
+);
+
+-- Приглашения в группы
+CREATE TABLE group_invites (
+    group_id INT NOT NULL,
+    user_id BIGINT NOT NULL,
+    created TIMESTAMP DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (group_id, user_id)
+);
+
+-- События групп
+CREATE TABLE group_events (
+    group_id INT NOT NULL,
+    event_id INT NOT NULL,
+    created TIMESTAMP DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (group_id, event_id)
+);
+
+-- Участники событий
+CREATE TABLE event_users (
+    event_id INT NOT NULL,
+    user_id BIGINT NOT NULL,
+    created TIMESTAMP DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (event_id, user_id)
+);
+
+-- Приглашения на события
+CREATE TABLE event_invites (
+    event_id INT NOT NULL,
+    user_id BIGINT NOT NULL,
+    created TIMESTAMP DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (event_id, user_id)
+);
+
+-- Метки примененных пакетов синхронизации Redis -> SQL
+CREATE TABLE sync_batches (
+    id VARCHAR(64) PRIMARY KEY NOT NULL,
+    applied TIMESTAMP DEFAULT NOW() NOT NULL
 );
 
 -- Индексы
 CREATE INDEX idx_knowledge_tag ON knowledge(tag);
 CREATE INDEX idx_news_tag ON news(tag);
 CREATE INDEX idx_users_nick ON users(nick);
-CREATE INDEX idx_groups_tag ON groups(tag);
\ No newline at end of file
+CREATE INDEX idx_groups_tag ON groups(tag);
+CREATE INDEX idx_sync_batches_applied ON sync_batches(applied);
+CREATE INDEX idx_blobs_refs ON blobs(refs) WHERE refs <= 0;
+CREATE INDEX idx_blob_variants_sha256 ON blob_variants(sha256);
+CREATE INDEX idx_news_views_user ON news_views(user_id, news_id);
+CREATE INDEX idx_news_invites_user ON news_invites(user_id, news_id);
+CREATE INDEX idx_news_ignores_user ON news_ignores(user_id, news_id);
+CREATE INDEX idx_group_admins_user ON group_admins(user_id, group_id);
+CREATE INDEX idx_group_users_user ON group_users(user_id, group_id);
+CREATE INDEX idx_group_invites_user ON group_invites(user_id, group_id);
+CREATE INDEX idx_group_events_event ON group_events(event_id, group_id);
+CREATE INDEX idx_event_users_user ON event_users(user_id, event_id);
+CREATE INDEX idx_event_invites_user ON event_invites(user_id, event_id);
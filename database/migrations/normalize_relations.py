@@ -0,0 +1,105 @@
+import argparse  # Аргументы командной строки
+import asyncio  # Асинхронный запуск функций
+
+from sqlalchemy.sql import text  # Текстовые SQL запросы
+
+from database.connectors.connector import get_client  # Подключение к PostgreSQL
+from settings import client as settings_client  # Клиент API настроек (кэш)
+from database.models.postgresql import (  # Таблицы связей
+    NewsViewsModel, NewsInvitesModel, NewsIgnoresModel,
+    GroupAdminsModel, GroupUsersModel, GroupInvitesModel, GroupEventsModel,
+    EventUsersModel, EventInvitesModel,
+)
+
+
+# Перенос JSON списков в таблицы связей: (таблица связей, таблица-источник, поле JSON, поле ID источника, поле значения)
+RELATIONS = [
+    (NewsViewsModel, "news", "views", "news_id", "user_id"),
+    (NewsViewsModel, "news", "users", "news_id", "user_id"),  # Просмотры в исходной схеме postgres_init.sql
+    (NewsInvitesModel, "news", "invites", "news_id", "user_id"),
+    (NewsIgnoresModel, "news", "ignores", "news_id", "user_id"),
+    (GroupAdminsModel, "groups", "admins", "group_id", "user_id"),
+    (GroupUsersModel, "groups", "users", "group_id", "user_id"),
+    (GroupUsersModel, "users", "groups", "user_id", "group_id"),  # Та же связь со стороны пользователя
+    (GroupInvitesModel, "groups", "invites", "group_id", "user_id"),
+    (GroupEventsModel, "groups", "events", "group_id", "event_id"),
+    (EventUsersModel, "events", "users", "event_id", "user_id"),
+    (EventInvitesModel, "events", "invites", "event_id", "user_id"),
+]
+
+# Один INSERT ... SELECT на поле: элементы массива разворачиваются в строки на стороне PostgreSQL,
+# нечисловые значения и не-массивы пропускаются, уже перенесенные пары не дублируются (повторный запуск безопасен)
+COPY_QUERY = """
+INSERT INTO {target} ({owner}, {member})
+SELECT DISTINCT source.id, item.value::bigint
+FROM {source} AS source
+CROSS JOIN LATERAL jsonb_array_elements_text(
+    CASE WHEN jsonb_typeof(source.{column}::jsonb) = 'array' THEN source.{column}::jsonb ELSE '[]'::jsonb END
+) AS item(value)
+WHERE item.value ~ '^-?[0-9]+$'
+ON CONFLICT DO NOTHING
+"""
+
+COLUMN_EXISTS = """
+SELECT 1 FROM information_schema.columns
+WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column
+"""
+
+
+# Перенос данных в одной транзакции (ошибка в любом поле - ничего не меняется)
+async def migrate(db, drop: bool = False) -> dict:
+    """
+    :param db: SqlClient PostgreSQL
+    :param drop: Удалить JSON поля после переноса
+    :return: Количество перенесенных связей по полям ("news.views": 1200, ...), None - поля нет в схеме
+    """
+
+    for model in {relation[0] for relation in RELATIONS}:
+        await db.create_table_if_not_exists(model)
+    if not await db.is_connected():
+        raise ConnectionError("База данных недоступна")
+
+    copied = {}
+    async with db.engine.begin() as conn:
+        for model, source, column, owner, member in RELATIONS:
+            exists = await conn.scalar(text(COLUMN_EXISTS), {"table": source, "column": column})
+            if not exists:
+                copied[f"{source}.{column}"] = None  # Поле уже удалено (повторный запуск) или отсутствует в схеме
+                continue
+
+            query = COPY_QUERY.format(target=model.__tablename__, owner=owner, member=member, source=source, column=column)
+            copied[f"{source}.{column}"] = (await conn.execute(text(query))).rowcount
+
+        if drop:
+            for _, source, column, _, _ in RELATIONS:
+                await conn.execute(text(f"ALTER TABLE {source} DROP COLUMN IF EXISTS {column}"))
+    return copied
+
+
+async def main(drop: bool):
+    pg = settings_client.get_many(tag="postgres")
+    db = get_client(
+        "postgres",
+        host=pg.get("pg_host"),
+        port=int(pg.get("pg_port")),
+        username=pg.get("pg_username"),
+        password=pg.get("pg_password"),
+        database=pg.get("pg_database"),
+    )
+
+    copied = await migrate(db, drop)
+    for field, count in copied.items():
+        if count is None:
+            print(f"[Migration] {field}: поле отсутствует, пропущено")
+        else:
+            print(f"[Migration] {field}: перенесено связей - {count}")
+    if drop:
+        print("[Migration] JSON поля удалены")
+    await db.close()
+
+
+# Запуск: python -m database.migrations.normalize_relations [--drop]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перенос JSON списков news/groups/events/users в таблицы связей")
+    parser.add_argument("--drop", action="store_true", help="Удалить JSON поля после переноса")
+    asyncio.run(main(parser.parse_args().drop))
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column  # Преобразование данных
-from sqlalchemy import Integer, Float, Text, Boolean, TIMESTAMP, BigInteger, JSON, Date, String  # Типы SQL данных
+from sqlalchemy import Integer, Float, Text, Boolean, TIMESTAMP, BigInteger, JSON, Date, String, Index  # Типы SQL данных
 from sqlalchemy.sql import func  # SQL функции
 
 from database.models.basemodel import BaseModel  # Базовая модель данных ORM
@@ -15,7 +15,8 @@ class KnowledgeModel(BaseModel):
     type: Тип компонента (text, photo, audio, document, file, keyboard, location) (Текст длиной не более 16 символов)
     tag: Тэг для группировки компонентов (Текст длиной не более 64 символов)
     description: Описание компонента (Текст любой длины)
-    value: Значение компонента (Текст любой длины)
+    value: Значение компонента (Текст любой длины; для файлов - SHA-256 содержимого в хранилище блобов)
+    meta: Метаданные компонента (для файлов: name, ext, size, sha256, content_type)
     """
 
     __tablename__ = "knowledge"
@@ -28,6 +29,47 @@ class KnowledgeModel(BaseModel):
     tag: Mapped[str] = mapped_column(String(64), nullable=True)
     description: Mapped[str] = mapped_column(Text, nullable=True)
     value: Mapped[str] = mapped_column(Text, nullable=False)
+    meta: Mapped[dict] = mapped_column(JSON, nullable=False, server_default="{}")
+
+
+# Класс для хранения файлов хранилища по содержимому (storage/blobs)
+class BlobsModel(BaseModel):
+    """
+    sha256: SHA-256 содержимого файла (ключ блоба в хранилище)
+    size: Размер файла в байтах
+    refs: Количество записей knowledge, ссылающихся на блоб
+    created: Timestamp дата первой загрузки
+    updated: Timestamp дата последнего изменения количества ссылок
+    """
+
+    __tablename__ = "blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True, nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    refs: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    created: Mapped[int] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+    updated: Mapped[int] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+
+# Класс для хранения производных файлов (варианты, полученные конвертацией блоба)
+class BlobVariantsModel(BaseModel):
+    """
+    source: SHA-256 исходного файла (блоб записи knowledge)
+    variant: Название варианта (webp_1280, jpeg_1280, thumb, voice)
+    sha256: SHA-256 результата конвертации (блоб в хранилище)
+    size: Размер результата в байтах
+    content_type: MIME тип результата
+    created: Timestamp дата конвертации
+    """
+
+    __tablename__ = "blob_variants"
+
+    source: Mapped[str] = mapped_column(String(64), primary_key=True, nullable=False)
+    variant: Mapped[str] = mapped_column(String(32), primary_key=True, nullable=False)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_type: Mapped[str] = mapped_column(String(64), nullable=False)
+    created: Mapped[int] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
 
 
 # Класс для хранения новостей
@@ -42,9 +84,8 @@ class NewsModel(BaseModel):
     images_id: Список ID изображений из таблицы knowledge
     files_id: Список ID файлов из таблицы knowledge
     keyboard_id: ID клавиатуры из таблицы knowledge
-    views: Список Telegram ID пользователей просмотревших запись
-    invites: Список Telegram ID кому придет оповещение о новой записи
-    ignores: Список Telegram ID кому нельзя показывать запись
+
+    Просмотры, оповещения и скрытие записи - таблицы news_views, news_invites, news_ignores
     """
 
     __tablename__ = "news"
@@ -58,9 +99,6 @@ class NewsModel(BaseModel):
     images_id: Mapped[dict] = mapped_column(JSON, nullable=True)
     files_id: Mapped[dict] = mapped_column(JSON, nullable=True)
     keyboard_id: Mapped[int] = mapped_column(Integer, nullable=False)
-    views: Mapped[dict] = mapped_column(JSON, nullable=True, server_default="[]")
-    invites: Mapped[dict] = mapped_column(JSON, nullable=True, server_default="[]")
-    ignores: Mapped[dict] = mapped_column(JSON, nullable=True, server_default="[]")
 
 
 # Класс для хранения пользователей
@@ -83,7 +121,8 @@ class UsersModel(BaseModel):
     role: Роль пользователя (user, trusted, admin, root) (Текст длиной не более 16 символов)
     rating: Рейтинг пользователя на основе отзывов о нем
     description: Описание себя как пользователя (Текст любой длины)
-    groups: Список групп в которых состоит пользователь
+
+    Группы пользователя - таблица group_users (индекс по user_id)
     """
 
     __tablename__ = "users"
@@ -105,7 +144,6 @@ class UsersModel(BaseModel):
     role: Mapped[str] = mapped_column(String(16), nullable=False, server_default="user")
     rating: Mapped[float] = mapped_column(Float, nullable=False, server_default="0")
     description: Mapped[str] = mapped_column(Text, nullable=True)
-    groups: Mapped[dict] = mapped_column(JSON, nullable=True, server_default="[]")
 
 
 # Класс для хранения групп пользователей
@@ -115,10 +153,8 @@ class GroupsModel(BaseModel):
     name: Название группы (Текст любой длины)
     tag: Тэг группы для быстрого поиска (Текст длиной не более 64 символов)
     description: Описание группы (Текст любой длины)
-    admins: Список Telegram ID администраторов группы
-    users: Список Telegram ID пользователей группы
-    invites: Список Telegram ID кому отправить приглашение в группу
-    events: Список ID событий в группе
+
+    Администраторы, участники, приглашения и события - таблицы group_admins, group_users, group_invites, group_events
     """
 
     __tablename__ = "groups"
@@ -127,10 +163,6 @@ class GroupsModel(BaseModel):
     name: Mapped[str] = mapped_column(Text, nullable=False)
     tag: Mapped[str] = mapped_column(String(64), nullable=True)
     description: Mapped[str] = mapped_column(Text, nullable=True)
-    admins: Mapped[dict] = mapped_column(JSON, nullable=False, server_default="[]")
-    users: Mapped[dict] = mapped_column(JSON, nullable=False, server_default="[]")
-    invites: Mapped[dict] = mapped_column(JSON, nullable=False, server_default="[]")
-    events: Mapped[dict] = mapped_column(JSON, nullable=False, server_default="[]")
 
 
 # Класс для хранения событий
@@ -141,8 +173,8 @@ class EventsModel(BaseModel):
     description: Описание события (Текст любой длины)
     date: Дата предстоящего события
     location: Локация события (URL ссылка на Яндекс Картах)
-    users: Список Telegram ID пользователей, которые придут на событие
-    invites: Список Telegram ID пользователей, кого приглашают на событие
+
+    Участники и приглашения - таблицы event_users, event_invites
     """
 
     __tablename__ = "events"
@@ -152,5 +184,164 @@ class EventsModel(BaseModel):
     description: Mapped[str] = mapped_column(Text, nullable=True)
     date: Mapped[int] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
     location: Mapped[str] = mapped_column(Text, nullable=True)
-    users: Mapped[dict] = mapped_column(JSON, nullable=False, server_default="[]")
-    invites: Mapped[dict] = mapped_column(JSON, nullable=False, server_default="[]")
+
+
+# ============================================================
+# Таблицы связей: первичный ключ (запись, пользователь) отвечает на "есть ли связь" и "сколько связей у записи",
+# обратный индекс (пользователь, запись) - на "какие записи у пользователя"
+
+# Просмотры новостей
+class NewsViewsModel(BaseModel):
+    """
+    news_id: ID новости
+    user_id: Telegram ID пользователя, просмотревшего новость
+    created: Timestamp дата просмотра
+    """
+
+    __tablename__ = "news_views"
+    __table_args__ = (Index("idx_news_views_user", "user_id", "news_id"),)
+
+    news_id: Mapped[int] = mapped_column(Integer, primary_key=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, nullable=False)
+    created: Mapped[int] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+
+# Пользователи, которым придет оповещение о новости
+class NewsInvitesModel(BaseModel):
+    """
+    news_id: ID новости
+    user_id: Telegram ID пользователя
+    created: Timestamp дата добавления
+    """
+
+    __tablename__ = "news_invites"
+    __table_args__ = (Index("idx_news_invites_user", "user_id", "news_id"),)
+
+    news_id: Mapped[int] = mapped_column(Integer, primary_key=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, nullable=False)
+    created: Mapped[int] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+
+# Пользователи, которым нельзя показывать новость
+class NewsIgnoresModel(BaseModel):
+    """
+    news_id: ID новости
+    user_id: Telegram ID пользователя
+    created: Timestamp дата добавления
+    """
+
+    __tablename__ = "news_ignores"
+    __table_args__ = (Index("idx_news_ignores_user", "user_id", "news_id"),)
+
+    news_id: Mapped[int] = mapped_column(Integer, primary_key=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, nullable=False)
+    created: Mapped[int] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+
+# Администраторы групп
+class GroupAdminsModel(BaseModel):
+    """
+    group_id: ID группы
+    user_id: Telegram ID администратора
+    created: Timestamp дата назначения
+    """
+
+    __tablename__ = "group_admins"
+    __table_args__ = (Index("idx_group_admins_user", "user_id", "group_id"),)
+
+    group_id: Mapped[int] = mapped_column(Integer, primary_key=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, nullable=False)
+    created: Mapped[int] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+
+# Участники групп (и группы пользователя - по индексу user_id)
+class GroupUsersModel(BaseModel):
+    """
+    group_id: ID группы
+    user_id: Telegram ID участника
+    created: Timestamp дата вступления
+    """
+
+    __tablename__ = "group_users"
+    __table_args__ = (Index("idx_group_users_user", "user_id", "group_id"),)
+
+    group_id: Mapped[int] = mapped_column(Integer, primary_key=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, nullable=False)
+    created: Mapped[int] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+
+# Приглашения в группы
+class GroupInvitesModel(BaseModel):
+    """
+    group_id: ID группы
+    user_id: Telegram ID приглашенного пользователя
+    created: Timestamp дата приглашения
+    """
+
+    __tablename__ = "group_invites"
+    __table_args__ = (Index("idx_group_invites_user", "user_id", "group_id"),)
+
+    group_id: Mapped[int] = mapped_column(Integer, primary_key=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, nullable=False)
+    created: Mapped[int] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+
+# События групп
+class GroupEventsModel(BaseModel):
+    """
+    group_id: ID группы
+    event_id: ID события
+    created: Timestamp дата добавления
+    """
+
+    __tablename__ = "group_events"
+    __table_args__ = (Index("idx_group_events_event", "event_id", "group_id"),)
+
+    group_id: Mapped[int] = mapped_column(Integer, primary_key=True, nullable=False)
+    event_id: Mapped[int] = mapped_column(Integer, primary_key=True, nullable=False)
+    created: Mapped[int] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+
+# Участники событий
+class EventUsersModel(BaseModel):
+    """
+    event_id: ID события
+    user_id: Telegram ID пользователя, который придет на событие
+    created: Timestamp дата записи
+    """
+
+    __tablename__ = "event_users"
+    __table_args__ = (Index("idx_event_users_user", "user_id", "event_id"),)
+
+    event_id: Mapped[int] = mapped_column(Integer, primary_key=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, nullable=False)
+    created: Mapped[int] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+
+# Приглашения на события
+class EventInvitesModel(BaseModel):
+    """
+    event_id: ID события
+    user_id: Telegram ID приглашенного пользователя
+    created: Timestamp дата приглашения
+    """
+
+    __tablename__ = "event_invites"
+    __table_args__ = (Index("idx_event_invites_user", "user_id", "event_id"),)
+
+    event_id: Mapped[int] = mapped_column(Integer, primary_key=True, nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, nullable=False)
+    created: Mapped[int] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+
+# Класс для хранения меток примененных пакетов синхронизации Redis -> SQL
+class SyncBatchModel(BaseModel):
+    """
+    id: Идентификатор пакета (тип данных и номер пакета, например users:42)
+    applied: Timestamp дата применения пакета
+    """
+
+    __tablename__ = "sync_batches"
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True, nullable=False)
+    applied: Mapped[int] = mapped_column(TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,178 @@
+import asyncio  # Асинхронные примитивы ожидания
+from collections import deque  # Кольцевая очередь записей
+from typing import Callable, Dict, Iterable, Optional  # Типы данных
+
+
+# Ограниченная очередь логов с политикой переполнения и счетчиками отброшенных записей
+class LogBuffer:
+    """
+    maxsize: Максимальное количество записей в очереди
+    policy: Политика переполнения:
+        block - отправитель ждет освобождения места (put); put_nowait в полную очередь отбрасывает запись
+        drop_oldest - вытесняется самая старая запись
+        drop_newest - отбрасывается новая запись
+        sample - выше порога заполнения низкие уровни пропускаются через выборку (1 из sample_every),
+                 при полном заполнении отбрасываются только они; protected уровни не теряются никогда
+    sample_every: Доля сохраняемых записей при выборке (каждая N-ая)
+    watermark: Порог заполнения (доля от maxsize), с которого включается выборка
+    protected: Уровни, которые политика sample никогда не отбрасывает
+    on_drop: Callback(level), вызываемый при каждом отбрасывании записи
+    """
+
+    POLICIES = ("block", "drop_oldest", "drop_newest", "sample")
+
+    def __init__(
+            self,
+            maxsize: int = 10000,
+            policy: str = "sample",
+            sample_every: int = 10,
+            watermark: float = 0.8,
+            protected: Iterable[str] = ("ERROR", "CRITICAL"),
+            on_drop: Optional[Callable[[str], None]] = None
+    ):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Неизвестная политика переполнения очереди логов: {policy}")
+
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.sample_every = max(1, int(sample_every))
+        self.watermark = max(0, int(self.maxsize * watermark))
+        self.protected = frozenset(protected)
+        self.on_drop = on_drop
+
+        # Счетчики
+        self.dropped: Dict[str, int] = {}
+        self._sampled: Dict[str, int] = {}
+
+        # Внутреннее состояние очереди
+        self._items = deque()
+        self._unfinished = 0
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._finished = asyncio.Event()
+        self._writable.set()
+        self._finished.set()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def full(self) -> bool:
+        return len(self._items) >= self.maxsize
+
+    # Добавление записи без ожидания. Возвращает False, если запись не попала в очередь
+    def put_nowait(self, entry: dict, force: bool = False) -> bool:
+        if not force:
+            level = entry.get("level", "QUERY")
+            size = len(self._items)
+
+            # Выборка низких уровней при высоком заполнении очереди
+            if self.policy == "sample" and level not in self.protected and size >= self.watermark:
+                seen = self._sampled.get(level, 0) + 1
+                self._sampled[level] = seen
+                if seen % self.sample_every:
+                    self._drop(level)
+                    return False
+
+            if size >= self.maxsize and not self._make_room(level):
+                return False
+
+        self._items.append(entry)
+        self._unfinished += 1
+        self._finished.clear()
+        self._readable.set()
+        if len(self._items) >= self.maxsize:
+            self._writable.clear()
+        return True
+
+    # Добавление записи с ожиданием места (только для политики block)
+    async def put(self, entry: dict) -> bool:
+        if self.policy == "block":
+            while len(self._items) >= self.maxsize:
+                self._writable.clear()
+                await self._writable.wait()
+            return self.put_nowait(entry, force=True)
+        return self.put_nowait(entry)
+
+    # Получение записи с ожиданием
+    async def get(self) -> dict:
+        while not self._items:
+            self._readable.clear()
+            await self._readable.wait()
+        return self._pop()
+
+    # Получение записи без ожидания
+    def get_nowait(self) -> dict:
+        if not self._items:
+            raise asyncio.QueueEmpty
+        return self._pop()
+
+    # Отметка об обработке полученной записи
+    def task_done(self):
+        if self._unfinished <= 0:
+            raise ValueError("task_done() вызван больше раз, чем было записей")
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._finished.set()
+
+    # Ожидание обработки всех записей
+    async def join(self):
+        if self._unfinished:
+            await self._finished.wait()
+
+    # Статистика очереди
+    def stats(self) -> dict:
+        return {
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "policy": self.policy,
+            "dropped": dict(self.dropped),
+            "dropped_total": sum(self.dropped.values()),
+        }
+
+    # Освобождение места в полной очереди согласно политике
+    def _make_room(self, level: str) -> bool:
+        # block: ожидание места - только через put(), запись, не принятая put_nowait(), считается отброшенной
+        if self.policy in ("block", "drop_newest"):
+            self._drop(level)
+            return False
+
+        if self.policy == "drop_oldest":
+            self._evict(0)
+            return True
+
+        # sample: новые записи низких уровней отбрасываются, защищенные вытесняют самую старую незащищенную
+        if level not in self.protected:
+            self._drop(level)
+            return False
+
+        for index, item in enumerate(self._items):
+            if item.get("level", "QUERY") not in self.protected:
+                self._evict(index)
+                break
+
+        # Если в очереди только защищенные записи - допускаем временное превышение размера
+        return True
+
+    def _evict(self, index: int):
+        entry = self._items[index]
+        del self._items[index]
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._finished.set()
+        self._drop(entry.get("level", "QUERY"))
+
+    def _drop(self, level: str):
+        self.dropped[level] = self.dropped.get(level, 0) + 1
+        if self.on_drop is not None:
+            self.on_drop(level)
+
+    def _pop(self) -> dict:
+        entry = self._items.popleft()
+        if not self._items:
+            self._readable.clear()
+        if len(self._items) < self.maxsize:
+            self._writable.set()
+        return entry
@@ -1,11 +1,12 @@
 import asyncio  # Асинхронный запуск функций
 import json  # Работа с JSON строками
+import signal  # Обработка сигналов остановки
+import multiprocessing  # Запуск нескольких процессов consumer
 import aio_pika  # Асинхронный движок RabbitMq
-import requests  # Отправка HTTP запросов
 
 from settings.get_config import get_config  # Получение локального конфига
-from api.mysql.fastapi_app import get_url  # Получение URL API настроек
-from logger.methods.to_console import ConsoleLogger  # Вывод логов в консоль
+from settings import client as settings_client  # Клиент API настроек (кэш)
+from logger.methods.to_console import ConsoleLogger, to_datetime  # Вывод логов в консоль
 from logger.methods.to_file import FileLogger  # Вывод логов в файл
 from database.connectors.connector import get_client  # Подключение Базы Данных
 from database.models.timescale import LogsModel, QueryModel  # Модель данных TimeScaleDb
@@ -18,9 +19,7 @@ RABBITMQ_URL = f"amqp://{config['username']}:{config['password']}@{config['host'
 
 # Получение методов вывода логов (Консоль, Файл, БД)
 def get_methods():
-    response = requests.get(f"{get_url()}/secret/many?keys=log_save_method")
-    response.raise_for_status()
-    raw_data = response.json().get("log_save_method")
+    raw_data = settings_client.get_many(keys=["log_save_method"]).get("log_save_method")
 
     if isinstance(raw_data, str):
         save_methods = json.loads(raw_data)
@@ -34,7 +33,7 @@ def get_methods():
 
 # Получение настроек подключения к TimeScaleDB
 def get_connection_settings():
-    data = requests.get(f"{get_url()}/secret/many?tag=timescale").json()
+    data = settings_client.get_many(tag="timescale")
     return {
         "host": data.get("tm_host", "localhost"),
         "port": data.get("tm_port", None),
@@ -47,68 +46,275 @@ def get_connection_settings():
 # Создание объектов для записи логов
 save_to_console, save_to_file, save_to_database = get_methods()
 CONSOLE = ConsoleLogger()
-FILE = FileLogger()
-DB = get_client(db_type="timescale", **get_connection_settings())
+FILE = None  # FileLogger создается в main(): у каждого процесса свой файл
+DB = get_client(db_type="timescale", report_to_logger=False, **get_connection_settings())  # Ошибки записи логов не логируются в ту же очередь
 
 
-# Логика обработки логов
-async def save_logs(message: aio_pika.IncomingMessage):
+# Распаковка сообщения: отправитель публикует пакеты (JSON-массив), одиночные записи поддерживаются
+def unpack(message: aio_pika.IncomingMessage) -> list:
+    data = json.loads(message.body.decode())
+    return data if isinstance(data, list) else [data]
+
+
+# Подготовка записи к сохранению в БД: timestamp (epoch или ISO 8601) -> datetime
+def to_row(entry: dict) -> dict:
+    row = dict(entry)
+    timestamp = row.pop("timestamp", None)
+    if timestamp:
+        row["timestamp"] = to_datetime(timestamp)
+    return row
+
+
+# Буфер записей с пакетной вставкой в БД и подтверждением сообщений только после коммита
+class BatchWriter:
+    def __init__(self, model, size: int, interval: float):
+        self.model = model
+        self.size = size
+        self.interval = interval
+
+        self.rows = []
+        self.messages = []
+        self.count = 0
+        self.lock = asyncio.Lock()
+        self.timer = None
+
+    # Добавление записей сообщения в буфер
+    async def add(self, message: aio_pika.IncomingMessage, rows: list):
+        self.rows.append(rows)  # Записи по сообщениям: при ошибке данных пакет повторяется по одному сообщению
+        self.messages.append(message)
+        self.count += len(rows)
+
+        if self.count >= self.size:
+            await self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.create_task(self._flush_later())
+
+    # Сброс буфера по истечении интервала
+    async def _flush_later(self):
+        await asyncio.sleep(self.interval)
+        self.timer = None
+        await self.flush()
+
+    # Остановка таймера и запись оставшихся записей
+    async def close(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        await self.flush()
+
+    # Запись буфера в БД одним запросом и подтверждение сообщений
+    async def flush(self):
+        async with self.lock:
+            rows, messages = self.rows, self.messages
+            self.rows, self.messages, self.count = [], [], 0
+            if not messages:
+                return
 
-    # Читаем сообщение с автоматическим удалением после чтения
-    async with message.process():
+            inserted = await DB.insert_many(self.model, [row for message_rows in rows for row in message_rows])
+            if inserted is not None:
+                for message in messages:
+                    await message.ack()
+                return
 
-        # Распаковка сообщения
-        message = json.loads(message.body.decode())
+            # БД недоступна - возвращаем сообщения в очередь для повторной доставки
+            if not DB.connected:
+                for message in messages:
+                    await message.nack(requeue=True)
+                return
+
+            # Ошибка данных (например, нарушение ограничения): пакет записывается по сообщениям,
+            # чтобы одно битое сообщение не возвращалось в очередь бесконечно вместе с остальными
+            for message, message_rows in zip(messages, rows):
+                if await DB.insert_many(self.model, message_rows) is not None:
+                    await message.ack()
+                elif not DB.connected:
+                    await message.nack(requeue=True)
+                else:
+                    print(f"[Consumer][WARNING] Сообщение очереди {self.model.__tablename__} отброшено: записи не приняты БД")
+                    await message.reject()
+
+
+# Настройки consumer (размер пакета, интервал сброса, количество наблюдателей и процессов)
+consumer_config = get_config().get("consumer", {})
+BATCH_SIZE = max(1, int(consumer_config.get("batch_size", 500)))
+FLUSH_INTERVAL = max(0.01, float(consumer_config.get("flush_interval_ms", 500)) / 1000)
+WORKERS = consumer_config.get("workers", {"logs": 1, "queries": 1})
+PREFETCH = consumer_config.get("prefetch", {})
+PROCESSES = max(1, int(consumer_config.get("processes", 1)))
+REPORT_INTERVAL = float(consumer_config.get("report_interval_sec", 60))
+
+
+# Логика обработки логов
+async def save_logs(writer: BatchWriter, message: aio_pika.IncomingMessage, entries: list):
+
+    # Повторно доставленные сообщения уже были выведены в консоль и файл
+    if not message.redelivered:
 
         # Проверка на вывод логов в консоль
         if save_to_console is True:
-            print(CONSOLE.format_log(message))
+            print(CONSOLE.format_many(entries))
 
-        # Проверка на сохранение логов в файл
+        # Проверка на сохранение логов в файл (пакетом)
         if save_to_file is True:
-            FILE.log(message)
+            FILE.writelines(entries)
 
-        # Проверка на сохранение логов в TimeScaleDb
-        if save_to_database is True:
-            # await DB.create_table_if_not_exists(LogsModel)
-            message.pop("timestamp", None)  # Удаляем TimeStamp из сообщения (т.к. он генерируется в БД)
-            await DB.insert_model(LogsModel, message)  # Записываем лог
+    # Проверка на сохранение логов в TimeScaleDb (подтверждение после коммита пакета)
+    if save_to_database is True:
+        await writer.add(message, [to_row(entry) for entry in entries])
+    else:
+        await message.ack()
 
 
 # Логика обработки Telegram запросов
-async def save_telegram_query(message: aio_pika.IncomingMessage):
-    async with message.process():  # автоматическое подтверждение
+async def save_telegram_query(writer: BatchWriter, message: aio_pika.IncomingMessage, entries: list):
+    await writer.add(message, [to_row(entry) for entry in entries])
+
+
+# Обработчики и модели для каждой очереди
+QUEUES = {
+    "logs": (save_logs, LogsModel),
+    "queries": (save_telegram_query, QueryModel),
+}
 
-        # Распаковка сообщения
-        message = json.loads(message.body.decode())
 
-        # await DB.create_table_if_not_exists(QueryModel)
-        await DB.insert_model(QueryModel, message)
+# Наблюдатель одной очереди: собственный канал, prefetch, буфер записи и счетчики
+class ConsumerWorker:
+    def __init__(self, queue_name: str, index: int):
+        self.name = f"{queue_name}-{index}"
+        self.queue_name = queue_name
+        self.handler, model = QUEUES[queue_name]
+        self.prefetch = max(1, int(PREFETCH.get(queue_name, BATCH_SIZE)))
+        self.writer = BatchWriter(model, BATCH_SIZE, FLUSH_INTERVAL)
 
+        self.channel = None
+        self.queue = None
+        self.consumer_tag = None
+
+        # Счетчики для отчета о пропускной способности
+        self.messages = 0
+        self.entries = 0
+        self._reported_entries = 0
+
+    # Открытие канала и подписка на очередь
+    async def start(self, connection: aio_pika.abc.AbstractRobustConnection):
+        self.channel = await connection.channel()
+        await self.channel.set_qos(prefetch_count=self.prefetch)
+        self.queue = await self.channel.declare_queue(
+            self.queue_name, durable=True, auto_delete=False, arguments={"x-message-ttl": 30000}
+        )
+        self.consumer_tag = await self.queue.consume(self.on_message)
+
+    # Обработка входящего сообщения
+    async def on_message(self, message: aio_pika.IncomingMessage):
+        try:
+            entries = unpack(message)
+        except ValueError:
+            await message.reject()  # Битое сообщение не возвращаем в очередь
+            return
+
+        self.messages += 1
+        self.entries += len(entries)
+        await self.handler(self.writer, message, entries)
+
+    # Остановка приема новых сообщений и запись уже полученных пакетов
+    async def drain(self):
+        if self.consumer_tag is not None:
+            await self.queue.cancel(self.consumer_tag)
+        await self.writer.close()
+        await self.channel.close()
+
+    # Записей в секунду с момента прошлого отчета
+    def throughput(self, interval: float) -> float:
+        processed, self._reported_entries = self.entries - self._reported_entries, self.entries
+        return processed / interval if interval > 0 else 0.0
+
+
+# Периодический отчет о пропускной способности наблюдателей
+async def report(workers: list):
+    while True:
+        await asyncio.sleep(REPORT_INTERVAL)
+        stats = ", ".join(f"{w.name}: {w.throughput(REPORT_INTERVAL):.0f}/s" for w in workers)
+        print(f"[Consumer] Записей в секунду - {stats}")
+
+
+# Периодический сброс буфера файла логов (при отсутствии новых записей)
+async def flush_file():
+    while True:
+        await asyncio.sleep(FILE.flush_interval)
+        FILE.flush()
+
+
+async def main(process: int = None):
+    """
+    :param process: Номер процесса при запуске нескольких процессов (None - единственный процесс)
+    """
+
+    global FILE
+    if save_to_file is True:
+        FILE = FileLogger(process=process)
 
-async def main():
     # Подключение к RabbitMQ
     connection = await aio_pika.connect_robust(RABBITMQ_URL)
-    channel = await connection.channel()
 
     # Перед запуском очередей
     await DB.create_table_if_not_exists(LogsModel)
     await DB.create_table_if_not_exists(QueryModel)
 
-    # Объявляем очередь (если не существует)
-    logs_queue = await channel.declare_queue("logs", durable=True, auto_delete=False, arguments={"x-message-ttl": 30000})
-    query_queue = await channel.declare_queue("queries", durable=True, auto_delete=False, arguments={"x-message-ttl": 30000})
+    # Запуск наблюдателей (по K на очередь, у каждого свой канал и prefetch)
+    workers = [
+        ConsumerWorker(queue_name, index)
+        for queue_name in QUEUES
+        for index in range(max(0, int(WORKERS.get(queue_name, 1))))
+    ]
+    for worker in workers:
+        await worker.start(connection)
+    background = [asyncio.create_task(report(workers))]
+    if FILE is not None:
+        background.append(asyncio.create_task(flush_file()))
+
+    # Ожидание сигнала остановки (SIGTERM при деплое, SIGINT из консоли)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    # Плавная остановка: прекращаем прием, дописываем пакеты, подтверждаем сообщения
+    print("[Consumer] Остановка: запись оставшихся пакетов...")
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*(worker.drain() for worker in workers), return_exceptions=True)
+    await connection.close()
+    if FILE is not None:
+        await asyncio.to_thread(FILE.close)
 
-    # Подписываемся на сообщения
-    await logs_queue.consume(save_logs)
-    await query_queue.consume(save_telegram_query)
 
-    # Бесконечное ожидание сообщений
-    await asyncio.Future()
+# Запуск consumer в текущем процессе
+def run(process: int = None):
+    asyncio.run(main(process))
+
+
+# Запуск нескольких процессов consumer с пересылкой сигнала остановки
+def run_processes(count: int):
+    context = multiprocessing.get_context("spawn")  # Каждый процесс создает свои подключения и потоки
+    processes = [context.Process(target=run, args=(i,), name=f"log-consumer-{i}") for i in range(count)]
+    for process in processes:
+        process.start()
+
+    def stop(signum, frame):
+        for child in processes:
+            if child.is_alive():
+                child.terminate()  # SIGTERM -> плавная остановка в дочернем процессе
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # SIGINT из консоли получат сами дочерние процессы
+    for process in processes:
+        process.join()
 
 
 if __name__ == "__main__":
-    try:
-        asyncio.run(main())
-    except KeyboardInterrupt:
-        print("\n[!] Выход из лог-consumer (Наблюдатель).")
+    if PROCESSES > 1:
+        run_processes(PROCESSES)
+    else:
+        run()
+    print("\n[!] Выход из лог-consumer (Наблюдатель).")
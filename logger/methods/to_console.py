@@ -1,13 +1,19 @@
 import json
-from datetime import datetime, timedelta
-from typing import Dict, Any
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterable, List, Tuple
 from colorama import init as colorama_init, Fore, Back, Style
-import requests
-from api.mysql.fastapi_app import get_url
+from settings import client as settings_client
 
 colorama_init(autoreset=True)
 
 
+# Преобразование timestamp лога (epoch UTC или ISO 8601) в datetime
+def to_datetime(value) -> datetime:
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc)
+    return datetime.fromisoformat(value)
+
+
 class ConsoleLogger:
     COLORS = {
         "black": Fore.BLACK,
@@ -33,51 +39,85 @@ class ConsoleLogger:
         "None": "",  # для отсутствия подложки
     }
 
-    def __init__(self):
-        try:
-            # Получение настроек из API
-            raw = requests.get(f"{get_url()}/secret/many?keys=log_console_settings").json()
-            timezone = requests.get(f"{get_url()}/secret/many?keys=log_timezone").json()
+    ERROR_PREFIX = f"{Style.BRIGHT}{Fore.RED}"  # Стиль строк с кодом ошибки (> 200)
 
-            # Распаковка JSON первого уровня
-            settings = json.loads(raw.get("log_console_settings", "{}"))
+    def __init__(self, settings: Dict[str, Any] = None, timezone_offset: int = None):
+        try:
+            # Получение настроек из API (если не переданы явно)
+            if settings is None or timezone_offset is None:
+                raw = settings_client.get_many(keys=["log_console_settings", "log_timezone"])
+            if settings is None:
+                settings = json.loads(raw.get("log_console_settings", "{}"))  # Распаковка JSON первого уровня
+            if timezone_offset is None:
+                timezone_offset = raw.get("log_timezone", 0)
 
             # Получение значений
             self.columns_order = settings.get("columns", [])
             self.columns_styles = settings.get("styles", {})
             self.time_format = settings.get("time_format", "%Y-%m-%d %H:%M:%S")
-            self.timezone_offset = int(timezone.get("log_timezone", 0))
+            self.timezone_offset = int(timezone_offset)
 
         except Exception as e:
             raise ValueError(f"[Formatter] Ошибка загрузки настроек: {e}")
 
-    def style_text(self, text: str, style: Dict[str, Any]) -> str:
+        # Часовой пояс и кэш форматирования времени (строка на текущую секунду)
+        self.tz = timezone(timedelta(hours=self.timezone_offset))
+        self._cache_time = "%f" not in self.time_format
+        self._cached_second = None
+        self._cached_time = ""
+
+        # План форматирования: (колонка, ANSI префикс, ANSI суффикс, колонка времени)
+        self.plan = self.compile_plan()
+
+    # Сборка плана форматирования из настроек колонок (выполняется один раз)
+    def compile_plan(self) -> List[Tuple[str, str, str, bool]]:
+        plan = []
+        for column in self.columns_order:
+            style = self.columns_styles.get(column, {})
+            if not style.get("show", False):
+                continue
+            plan.append((column, self.style_prefix(style), Style.RESET_ALL, column == "timestamp"))
+        return plan
+
+    def style_prefix(self, style: Dict[str, Any]) -> str:
         color = self.COLORS.get(style.get("color", "None"), "")
         highlight = self.HIGHLIGHTS.get(style.get("highlight", "None"), "")
         bold = Style.BRIGHT if style.get("bold", False) else ""
         underline = "\033[4m" if style.get("underline", False) else ""
-        return f"{bold}{underline}{highlight}{color}{text}{Style.RESET_ALL}"
+        return f"{bold}{underline}{highlight}{color}"
+
+    def style_text(self, text: str, style: Dict[str, Any]) -> str:
+        return f"{self.style_prefix(style)}{text}{Style.RESET_ALL}"
+
+    # Преобразование timestamp в указанный формат (epoch кэшируется на текущую секунду)
+    def format_time(self, value) -> str:
+        try:
+            if isinstance(value, (int, float)) and self._cache_time:
+                second = int(value)
+                if second != self._cached_second:
+                    self._cached_time = datetime.fromtimestamp(second, self.tz).strftime(self.time_format)
+                    self._cached_second = second
+                return self._cached_time
+
+            dt = to_datetime(value)
+            dt = dt.astimezone(self.tz) if dt.tzinfo else dt + timedelta(hours=self.timezone_offset)
+            return dt.strftime(self.time_format)
+        except Exception:
+            return value
 
     def format_log(self, log: Dict[str, Any]) -> str:
         parts = []
         error_mode = int(log.get("status_code", 0)) > 200
 
-        for column in self.columns_order:
-            if not self.columns_styles.get(column, {}).get("show", False):
-                continue
-
+        for column, prefix, suffix, is_time in self.plan:
             value = log.get(column, "")
-            style = self.columns_styles.get(column, {})
+            if is_time and value:
+                value = self.format_time(value)
 
-            # Преобразование timestamp в указанный формат
-            if column == "timestamp" and value:
-                try:
-                    dt = datetime.fromisoformat(value) + timedelta(hours=self.timezone_offset)
-                    value = dt.strftime(self.time_format)
-                except Exception:
-                    pass
-
-            styled = self.style_text(str(value), style) if not error_mode else f"{Style.BRIGHT}{Fore.RED}{value}"
-            parts.append(styled)
+            parts.append(f"{self.ERROR_PREFIX}{value}" if error_mode else f"{prefix}{value}{suffix}")
 
         return " | ".join(parts)
+
+    # Форматирование пакета логов в один блок строк (для одного вызова print)
+    def format_many(self, logs: Iterable[Dict[str, Any]]) -> str:
+        return "\n".join([self.format_log(log) for log in logs])
@@ -1,130 +1,260 @@
 import os  # Работа с ОС
 import json  # Работа с JSON строками
-import zipfile  # ZIP архивация данных
-from datetime import datetime, timedelta, timezone  # Работа со временем
+import time  # Текущее время (epoch)
+from concurrent.futures import ThreadPoolExecutor  # Фоновая архивация вне event loop
+from datetime import datetime, timedelta, timezone, time as day_start  # Работа со временем
 from pathlib import Path  # Путь
-from typing import Dict  # Тип данных Словарь
-import requests  # Отправка HTTP запросов
-from api.mysql.fastapi_app import get_url  # Получение URL API настроек
+from typing import Dict, Iterable, List, Optional  # Типы данных
+from settings import client as settings_client  # Клиент API настроек (кэш)
+from logger.methods.to_console import to_datetime  # Разбор timestamp лога
+from backup.archiver import compress_file, resolve_codec  # Потоковое сжатие архивов
 
 
 # Класс для автоматической записи логов в файл
 class FileLogger:
-    def __init__(self):
-        # Получение настроек из API
-        raw = requests.get(f"{get_url()}/secret/many?keys=log_file_settings").json()
-        utc = requests.get(f"{get_url()}/secret/many?keys=log_timezone").json()
+    # Файлы других процессов, измененные позже начала текущего периода минус этот запас, не архивируются
+    SHARED_GRACE = 60
 
-        # Распаковка JSON первого уровня
-        settings = json.loads(raw.get("log_file_settings", "{}"))
+    def __init__(self, settings: dict = None, utc: int = None, process: Optional[int] = None):
+        """
+        :param settings: Настройки файлов логов (по умолчанию - log_file_settings из API настроек)
+        :param utc: Смещение часового пояса логов (по умолчанию - log_timezone из API настроек)
+        :param process: Номер процесса при записи из нескольких процессов: у каждого свой файл (26-10-18-1.log),
+                        архивацию и очистку выполняет только процесс 0. None - один процесс, один файл
+        """
+
+        # Получение настроек из API (если не переданы явно)
+        if settings is None or utc is None:
+            raw = settings_client.get_many(keys=["log_file_settings", "log_timezone"])
+        if settings is None:
+            settings = json.loads(raw.get("log_file_settings", "{}"))  # Распаковка JSON первого уровня
+        if utc is None:
+            utc = raw.get("log_timezone", 0)
 
         # Получение настроек из config
-        self.utc = int(utc.get("log_timezone", 0))
+        self.utc = int(utc)
         self.format = settings.get("filename", "YY-MM-DD.log")
         self.change_days = int(settings.get("change_days", 1))
         self.save_dir = Path(settings.get("directory", "./logger/logs/"))
         self.delete_old = settings.get("delete_logs", False)
         self.max_files = int(settings.get("max_files", 10))
         self.max_archives = int(settings.get("max_archive", 60))
+        self.buffer_size = int(settings.get("buffer_size", 64 * 1024))
+        self.flush_interval = float(settings.get("flush_interval", 1))
+        self.archive_codec = resolve_codec(settings.get("archive_codec", "deflate"))
+        self.archive_level = settings.get("archive_level", None)
+        self.process = process
+
+        # Часовой пояс логов (вычисляется один раз)
+        self.tz = timezone(timedelta(hours=self.utc))
 
-        # Создание переменных для хранения актуального имени файла и даты
+        # Создание переменных для хранения актуального файла, даты и границы ротации
         self.current_file: Path = None
         self.current_date = None
+        self._handle = None
+        self._next_rotation = 0.0
+        self._last_flush = time.monotonic()
+
+        # Кэш форматирования времени (одна строка на секунду)
+        self._cached_second = None
+        self._cached_time = ""
+
+        # Фоновый поток для архивации и очистки старых файлов
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-archiver")
 
         # Создание необходимых папок для сохранения файлов
+        self.archive_dir = self.save_dir / "archive"
+        self.index_file = self.archive_dir / "index.json"
         self.save_dir.mkdir(parents=True, exist_ok=True)
-        (self.save_dir / "archive").mkdir(parents=True, exist_ok=True)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
 
         # Форсированный запуск проверки на актуальность файла
         self._rotate_file(force=True)
 
     # Пишем лог в файл
     def log(self, entry: Dict[str, str]):
-        self._rotate_file()
+        self.writelines((entry,))
+
+    # Пишем пакет логов в файл
+    def writelines(self, entries: Iterable[Dict[str, str]]):
+        if time.time() >= self._next_rotation:
+            self._rotate_file()
+
+        self._handle.writelines([self._format_line(entry) for entry in entries])
+
+        # Сброс буфера по интервалу (по размеру буфер сбрасывается сам)
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
 
-        # Разбор параметров
-        ts = entry.get("timestamp", datetime.utcnow().isoformat())
+    # Принудительный сброс буфера на диск
+    def flush(self):
+        if self._handle is not None:
+            self._handle.flush()
+        self._last_flush = time.monotonic()
+
+    # Завершение работы: сброс буфера, закрытие файла, ожидание архивации
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        self._executor.shutdown(wait=True)
+
+    # Форматирование строки лога
+    def _format_line(self, entry: Dict[str, str]) -> str:
+        ts = entry.get("timestamp", time.time())
         level = entry.get("level", "INFO")
         module = entry.get("module", "unknown")
         message = entry.get("message", "")
         code = entry.get("status_code", 0)
 
-        # Форматирование времени
-        try:
-            # Преобразуем timestamp из ISO 8601 и явно делаем его UTC
-            dt = datetime.fromisoformat(ts)
-            dt = dt.replace(tzinfo=timezone.utc)
+        return f"[{self._format_time(ts)}] [{level}] [{module}] {message} [code: {code}]\n"
 
-            # Применяем смещение
-            tz = timezone(timedelta(hours=int(self.utc)))
-            dt = dt.astimezone(tz)
+    # Форматирование времени с учетом смещения (строка кэшируется на текущую секунду)
+    def _format_time(self, ts) -> str:
+        try:
+            if isinstance(ts, (int, float)):
+                second = int(ts)
+                if second != self._cached_second:
+                    self._cached_time = datetime.fromtimestamp(second, self.tz).strftime("%Y-%m-%d %H:%M:%S")
+                    self._cached_second = second
+                return self._cached_time
 
-            timestamp = dt.strftime("%Y-%m-%d %H:%M:%S")
+            # Преобразуем timestamp из ISO 8601 и явно делаем его UTC
+            dt = to_datetime(ts).replace(tzinfo=timezone.utc)
+            return dt.astimezone(self.tz).strftime("%Y-%m-%d %H:%M:%S")
         except Exception:
-            timestamp = ts  # fallback
-
-        # Форматирование строки
-        log_line = f"[{timestamp}] [{level}] [{module}] {message} [code: {code}]\n"
-
-        # Запись строки в файл
-        with self.current_file.open("a", encoding="utf-8") as f:
-            f.write(log_line)
+            return str(ts)  # fallback
 
     # Проверка актуальности файла, начало и окончание файла
     def _rotate_file(self, force: bool = False):
         # Получаем актуальную дату, учитывая смещение часового пояса
-        tz = timezone(timedelta(hours=int(self.utc)))
-        now = datetime.now(tz)
+        now = datetime.now(self.tz)
         date_key = now.date()
 
         # Проверяем что актуальная дата разниться с последним файлом
-        if self.current_date is None or (now.date() - self.current_date).days >= self.change_days or force:
+        if self.current_date is None or (date_key - self.current_date).days >= self.change_days or force:
 
             # Проверяем что есть последний файл и завершаем его
-            if self.current_file:
-                with self.current_file.open("a", encoding="utf-8") as f:
-                    f.write("# === END OF FILE ===\n")
+            if self._handle is not None:
+                self._handle.write("# === END OF FILE ===\n")
+                self._handle.close()
 
             # Получаем актуальную дату и форматируем имя нового файла
             self.current_date = date_key
             file_name = now.strftime(self.format.replace("YY", "%y").replace("MM", "%m").replace("DD", "%d"))
             self.current_file = self.save_dir / file_name
+            if self.process is not None:
+                self.current_file = self.current_file.with_name(f"{self.current_file.stem}-{self.process}{self.current_file.suffix}")
 
             # Создаем строку для старта
             string_start = "" if self.current_file.exists() else f"# === START OF FILE: {now.strftime('%Y-%m-%d %H:%M:%S')} ===\n"
 
-            # Создаем новый файл и добавляем в него строчку старта
-            with self.current_file.open("a", encoding="utf-8") as f:
-                f.write(string_start)
+            # Открываем новый файл (дескриптор держим открытым до следующей ротации)
+            self._handle = self.current_file.open("a", encoding="utf-8", buffering=self.buffer_size)
+            self._handle.write(string_start)
+            self.flush()
 
-            # Запускаем проверку количества файлов в директории logs и archive
-            self._manage_file_limits()
+            # Запускаем проверку количества файлов в директории logs и archive в фоне (при нескольких процессах - только в процессе 0)
+            if not self.process:
+                period_start = datetime.combine(self.current_date, day_start.min, tzinfo=self.tz).timestamp()
+                self._executor.submit(self._manage_file_limits, self.current_file, period_start)
 
-    # Проверка количество файлов логов в директориях
-    def _manage_file_limits(self):
+        # Вычисляем следующую границу ротации (полночь через change_days от даты текущего файла)
+        boundary = datetime.combine(self.current_date + timedelta(days=self.change_days), day_start.min, tzinfo=self.tz)
+        self._next_rotation = boundary.timestamp()
 
-        # Сортируем список файлов относительно даты
-        log_files = sorted(self.save_dir.glob("*.log"), key=os.path.getmtime)
+    # Проверка количество файлов логов в директориях
+    def _manage_file_limits(self, current: Path, period_start: float):
+        try:
+            # Сортируем список файлов относительно даты (текущий файл не архивируем).
+            # При нескольких процессах не архивируем и файлы, в которые другие процессы еще могут писать
+            log_files = sorted((f for f in self.save_dir.glob("*.log") if f != current), key=os.path.getmtime)
+            if self.process is not None:
+                log_files = [f for f in log_files if os.path.getmtime(f) < period_start - self.SHARED_GRACE]
 
-        # Архивация лишних файлов
-        while len(log_files) > self.max_files:
-            oldest = log_files.pop(0)
-            self._archive_file(oldest)
+            # Архивация лишних файлов
+            while len(log_files) >= self.max_files:
+                oldest = log_files.pop(0)
+                self._archive_file(oldest)
 
-        # Удаление старых архивов
-        if self.delete_old:
-            archive_files = sorted((self.save_dir / "archive").glob("*.zip"), key=os.path.getmtime)
-            while len(archive_files) > self.max_archives:
-                archive_files.pop(0).unlink()
+            # Удаление старых архивов
+            if self.delete_old:
+                archive_files = [f for f in self.archive_dir.glob("archive_*") if f.suffix != ".tmp"]
+                archive_files.sort(key=os.path.getmtime)
+                removed = []
+                while len(archive_files) > self.max_archives:
+                    oldest = archive_files.pop(0)
+                    oldest.unlink()
+                    removed.append(oldest.name)
+                if removed:
+                    index = self._read_index()
+                    for name in removed:
+                        index.pop(name, None)
+                    self._write_index(index)
+        except Exception as e:
+            print(f"[FileLogger][ERROR] Ошибка архивации логов: {e}")
 
-    # Архивация файла логов
+    # Архивация файла логов (потоковое сжатие) с записью в индекс архивов
     def _archive_file(self, file: Path):
-        # Форматируем название архива
-        archive_name = (self.save_dir / "archive") / f"archive_{file.stem}.zip"
+        first, last = self._time_range(file)
+        original_size = file.stat().st_size
+
+        archive = compress_file(file, self.archive_dir, self.archive_codec, self.archive_level)
 
-        # Создаем новый архив и добавляем в него файл
-        with zipfile.ZipFile(archive_name, 'w', zipfile.ZIP_DEFLATED) as archive:
-            archive.write(file, arcname=file.name)
+        # Записываем временной диапазон архива в индекс
+        index = self._read_index()
+        index[archive.name] = {
+            "file": file.name,
+            "codec": self.archive_codec,
+            "first": first,
+            "last": last,
+            "size": archive.stat().st_size,
+            "original_size": original_size,
+        }
+        self._write_index(index)
 
         # Заканчивает операцию с архивом
         file.unlink()
+
+    # Поиск архивов, пересекающихся с интервалом времени (формат "%Y-%m-%d %H:%M:%S")
+    def find_archives(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Path]:
+        result = []
+        for name, meta in sorted(self._read_index().items(), key=lambda item: item[1].get("first") or ""):
+            if end is not None and meta.get("first") and meta["first"] > end:
+                continue
+            if start is not None and meta.get("last") and meta["last"] < start:
+                continue
+            result.append(self.archive_dir / name)
+        return result
+
+    # Первая и последняя отметка времени в файле (читаются только начало и конец файла)
+    @staticmethod
+    def _time_range(file: Path, tail_size: int = 64 * 1024):
+        def stamps(lines):
+            for line in lines:
+                if line.startswith("[") and "]" in line:
+                    yield line[1:line.index("]")]
+
+        with file.open("rb") as f:
+            head = f.read(tail_size).decode("utf-8", errors="ignore").splitlines()
+            f.seek(max(0, file.stat().st_size - tail_size))
+            tail = f.read().decode("utf-8", errors="ignore").splitlines()
+
+        first = next(stamps(head), None)
+        last = next(stamps(reversed(tail)), None)
+        return first, last
+
+    # Чтение индекса архивов
+    def _read_index(self) -> dict:
+        try:
+            with self.index_file.open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    # Атомарная запись индекса архивов
+    def _write_index(self, index: dict):
+        temp = self.index_file.with_suffix(".tmp")
+        with temp.open("w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+        temp.replace(self.index_file)
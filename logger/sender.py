@@ -1,21 +1,63 @@
 import json
+import time
 import asyncio
 import aio_pika
-from datetime import datetime, timezone
 from settings.get_config import get_config
+from logger.buffer import LogBuffer
 
 
 # Глобальное состояние
 class LoggerState:
-    def __init__(self):
+    def __init__(self, settings: dict = None):
+        settings = get_config().get("logger", {}) if settings is None else settings
+
         self.connection = None
         self.channel = None
         self.initialized = False
         self.init_lock = asyncio.Lock()
         self.ready_event = asyncio.Event()
-        self.log_queue = asyncio.Queue()
-        self.query_queue = asyncio.Queue()
-        self.worker_task = None
+        self.worker_tasks = []
+        self.pending = set()
+
+        # Параметры пакетной отправки (размер пакета, ожидание пакета, окно подтверждений)
+        self.batch_size = max(1, int(settings.get("batch_size", 200)))
+        self.linger = max(0.0, float(settings.get("linger_ms", 20)) / 1000)
+        self.confirm_window = max(1, int(settings.get("confirm_window", 16)))
+        self.confirm_slots = None
+
+        # Ограниченные очереди логов и запросов
+        buffer_settings = {
+            "maxsize": int(settings.get("queue_size", 10000)),
+            "policy": settings.get("overflow_policy", "sample"),
+            "sample_every": int(settings.get("sample_every", 10)),
+            "on_drop": self._on_drop,
+        }
+        self.log_queue = LogBuffer(**buffer_settings)
+        self.query_queue = LogBuffer(**buffer_settings)
+
+        # Интервал между уведомлениями о переполнении (50003)
+        self.overflow_interval = float(settings.get("overflow_report_sec", 10))
+        self._overflow_reported = 0.0
+        self._overflow_pending = 0
+
+    # Учет отброшенной записи и периодическое уведомление о переполнении
+    def _on_drop(self, level: str):
+        self._overflow_pending += 1
+        now = time.monotonic()
+        if now - self._overflow_reported < self.overflow_interval:
+            return
+
+        dropped, self._overflow_pending, self._overflow_reported = self._overflow_pending, 0, now
+        message = f"Очередь логов переполнена: отброшено записей - {dropped}"
+        print(f"[Logger][WARNING] {message}")
+
+        # Уведомление ставится после записи, вызвавшей отбрасывание, и по общей политике очереди:
+        # принудительная вставка здесь выводила бы очередь за maxsize
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Вне event loop очередь никто не читает - достаточно вывода в консоль
+        loop.call_soon(self.log_queue.put_nowait, _build_log("WARNING", message, "LOGGER", 50003))
 
 
 state = LoggerState()
@@ -29,62 +71,81 @@ async def init_logger():
 
         config = get_config()['rabbitmq']
         url = f"amqp://{config['username']}:{config['password']}@{config['host']}:{config['port']}/"
+        state.confirm_slots = asyncio.Semaphore(state.confirm_window)
 
         try:
             state.connection = await aio_pika.connect_robust(url)
-            state.channel = await state.connection.channel()
+            state.channel = await state.connection.channel(publisher_confirms=True)
 
             await state.channel.declare_queue("logs", durable=True, arguments={"x-message-ttl": 30000})
             await state.channel.declare_queue("queries", durable=True, arguments={"x-message-ttl": 30000})
 
-            state.worker_task = asyncio.create_task(_worker())
+            state.worker_tasks = [
+                asyncio.create_task(_publisher(state.log_queue, "logs")),
+                asyncio.create_task(_publisher(state.query_queue, "queries")),
+            ]
             state.initialized = True
             state.ready_event.set()
         except Exception as e:
             print(f"[Logger][ERROR] Ошибка подключения к RabbitMQ: {e}")
 
 
-# Универсальный наблюдатель для логов и запросов
-async def _worker():
+# Наблюдатель очереди: собирает пакеты и отправляет их с конвейерными подтверждениями
+async def _publisher(queue: LogBuffer, routing_key: str):
     while True:
-        log_task = asyncio.create_task(state.log_queue.get())
-        query_task = asyncio.create_task(state.query_queue.get())
+        batch = await _collect_batch(queue)
+
+        # Ограничиваем количество пакетов, ожидающих подтверждения брокера
+        await state.confirm_slots.acquire()
+        task = asyncio.create_task(_publish_batch(queue, batch, routing_key))
+        state.pending.add(task)
+        task.add_done_callback(state.pending.discard)
+
+
+# Сбор пакета: до batch_size записей или до истечения linger после первой записи
+async def _collect_batch(queue: LogBuffer) -> list:
+    batch = [await queue.get()]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + state.linger
+
+    while len(batch) < state.batch_size:
+        # Забираем всё, что уже лежит в очереди, без ожидания
+        if not queue.empty():
+            batch.append(queue.get_nowait())
+            continue
+
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout))
+        except asyncio.TimeoutError:
+            break
 
-        done, _ = await asyncio.wait(
-            [log_task, query_task],
-            return_when=asyncio.FIRST_COMPLETED
+    return batch
+
+
+# Отправка пакета одним сообщением (JSON-массив) и ожидание подтверждения брокера
+async def _publish_batch(queue: LogBuffer, batch: list, routing_key: str):
+    try:
+        await state.channel.default_exchange.publish(
+            aio_pika.Message(body=json.dumps(batch).encode(), content_type="application/json"),
+            routing_key=routing_key
         )
+    except Exception as e:
+        print(f"[Logger][Worker ERROR] Пакет ({routing_key}, {len(batch)} шт.) не отправлен: {e}")
+    finally:
+        state.confirm_slots.release()
+        for _ in batch:
+            queue.task_done()
+
 
-        if log_task in done:
-            log_entry = log_task.result()
-            try:
-                await state.channel.default_exchange.publish(
-                    aio_pika.Message(body=json.dumps(log_entry).encode()),
-                    routing_key="logs"
-                )
-            except Exception as e:
-                print(f"[Logger][Worker ERROR] Лог не отправлен: {e}")
-            finally:
-                state.log_queue.task_done()
-
-        if query_task in done:
-            query_entry = query_task.result()
-            try:
-                await state.channel.default_exchange.publish(
-                    aio_pika.Message(body=json.dumps(query_entry).encode()),
-                    routing_key="queries"
-                )
-            except Exception as e:
-                print(f"[Logger][Worker ERROR] Запрос не отправлен: {e}")
-            finally:
-                state.query_queue.task_done()
-
-
-# Формирование лог-сообщения
+# Формирование лог-сообщения (timestamp - epoch UTC, форматируется на стороне consumer)
 def _build_log(level: str, message: str, module: str = "None", code: int = 0):
     return {
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "level": level.upper(),
+        "timestamp": time.time(),
+        "level": level,
         "module": module.upper(),
         "message": message,
         "status_code": code
@@ -92,18 +153,18 @@ def _build_log(level: str, message: str, module: str = "None", code: int = 0):
 
 
 # Формирование запроса
-def _build_query(user_id: int, chat_id: int, text_type: str, text: str, time: int):
+def _build_query(user_id: int, chat_id: int, text_type: str, text: str, response_time: int):
     return {
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": time.time(),
         "user_id": user_id,
         "chat_id": chat_id,
         "query_type": text_type,
         "query_text": text,
-        "response_time": time
+        "response_time": response_time
     }
 
 
-# Добавление в очередь лога
+# Добавление в очередь лога (до инициализации логера)
 async def _safe_enqueue_log(level, message, module, code):
     if not state.initialized:
         await init_logger()
@@ -111,35 +172,56 @@ async def _safe_enqueue_log(level, message, module, code):
     await state.log_queue.put(_build_log(level, message, module, code))
 
 
-# Добавление в очередь запроса
-async def _safe_enqueue_query(user_id, chat_id, text_type, text, time):
+# Добавление в очередь запроса (до инициализации логера)
+async def _safe_enqueue_query(user_id, chat_id, text_type, text, response_time):
     if not state.initialized:
         await init_logger()
         await state.ready_event.wait()
-    await state.query_queue.put(_build_query(user_id, chat_id, text_type, text, time))
+    await state.query_queue.put(_build_query(user_id, chat_id, text_type, text, response_time))
+
+
+# Синхронное добавление в очередь без создания задач (после инициализации логера).
+# Синхронный вызов не может ждать места: при политике block запись в полную очередь отбрасывается и учитывается
+def _put(queue: LogBuffer, entry: dict):
+    queue.put_nowait(entry)
+
+
+def _log(level: str, message: str, module: str, code: int):
+    if state.initialized:
+        _put(state.log_queue, _build_log(level, message, module, code))
+    else:
+        asyncio.create_task(_safe_enqueue_log(level, message, module, code))
 
 
 # Публичные методы логирования
-def info(message: str, module="None", code=0): asyncio.create_task(_safe_enqueue_log("INFO", message, module, code))
-def warning(message: str, module="None", code=0): asyncio.create_task(_safe_enqueue_log("WARNING", message, module, code))
-def error(message: str, module="None", code=1): asyncio.create_task(_safe_enqueue_log("ERROR", message, module, code))
-def critical(message: str, module="None", code=2): asyncio.create_task(_safe_enqueue_log("CRITICAL", message, module, code))
-def none(message: str, module="None", code=0): asyncio.create_task(_safe_enqueue_log("NONE", message, module, code))
+def info(message: str, module="None", code=0): _log("INFO", message, module, code)
+def warning(message: str, module="None", code=0): _log("WARNING", message, module, code)
+def error(message: str, module="None", code=1): _log("ERROR", message, module, code)
+def critical(message: str, module="None", code=2): _log("CRITICAL", message, module, code)
+def none(message: str, module="None", code=0): _log("NONE", message, module, code)
 
 
 # Публичный метод отправки Telegram-запроса
 def query(user_id: int, chat_id: int, text_type: str, text: str, time: int):
-    asyncio.create_task(_safe_enqueue_query(user_id, chat_id, text_type, text, time))
+    if state.initialized:
+        _put(state.query_queue, _build_query(user_id, chat_id, text_type, text, time))
+    else:
+        asyncio.create_task(_safe_enqueue_query(user_id, chat_id, text_type, text, time))
 
 
 # Закрытие логера
 async def close_logger():
-    if state.worker_task:
-        state.worker_task.cancel()
+    for task in state.worker_tasks:
+        task.cancel()
         try:
-            await state.worker_task
+            await task
         except asyncio.CancelledError:
             pass
+    state.worker_tasks = []
+
+    # Дожидаемся подтверждений по уже отправленным пакетам
+    if state.pending:
+        await asyncio.gather(*state.pending, return_exceptions=True)
 
     if state.connection:
         try:
@@ -151,6 +233,14 @@ async def close_logger():
     state.ready_event.clear()
 
 
+# Статистика очередей логера (размер, политика, отброшенные записи по уровням)
+def get_stats() -> dict:
+    return {
+        "logs": state.log_queue.stats(),
+        "queries": state.query_queue.stats(),
+    }
+
+
 # Ожидание окончания всех задач
 async def flush_logs():
     if not state.initialized:
@@ -0,0 +1,291 @@
+import asyncio  # Асинхронный запуск функций
+import signal  # Обработка сигналов остановки
+import time  # Текущее время (epoch)
+from datetime import datetime, timedelta, timezone  # Работа со временем
+from typing import Dict, Any, List, Optional  # Типы данных
+
+from sqlalchemy import func  # SQL функции (GREATEST, LEAST)
+
+from settings.get_config import get_config  # Получение локального конфига
+from settings import client as settings_client  # Клиент API настроек (кэш)
+from database.connectors.connector import get_client  # Подключение к PostgreSQL и Redis
+from database.models.postgresql import UsersModel, NewsModel, NewsViewsModel, SyncBatchModel  # Модели таблиц БД
+from logger import sender as lg  # Логер
+
+
+# Перенос пакета грязных ключей в отдельный пакет одной атомарной операцией:
+# ключи из множества dirty переименовываются в ключи пакета, номер пакета попадает в список pending.
+# Новые изменения сразу пишутся в свежие ключи и попадают в следующий пакет.
+CLAIM_SCRIPT = """
+local ids = redis.call('SPOP', KEYS[1], ARGV[2])
+if #ids == 0 then
+    return nil
+end
+local batch = redis.call('INCR', KEYS[3])
+local prefix = ARGV[3] .. batch .. ':'
+for _, id in ipairs(ids) do
+    local source = ARGV[1] .. id .. ARGV[4]
+    if redis.call('EXISTS', source) == 1 then
+        redis.call('RENAME', source, prefix .. id)
+    end
+end
+redis.call('SADD', prefix .. 'ids', unpack(ids))
+redis.call('RPUSH', KEYS[2], batch)
+return batch
+"""
+
+
+# Ключи Redis одного типа данных
+class SyncKind:
+    def __init__(self, name: str, suffix: str = ""):
+        self.name = name
+        self.data = f"sync:{name}:"  # Значения: sync:users:{id}
+        self.suffix = suffix  # Окончание ключа значения: sync:news:{id}:views
+        self.dirty = f"sync:dirty:{name}"  # ID измененных записей
+        self.pending = f"sync:pending:{name}"  # Номера пакетов, ожидающих записи в БД
+        self.sequence = f"sync:seq:{name}"  # Счетчик номеров пакетов
+        self.batch = f"sync:batch:{name}:"  # Ключи пакета: sync:batch:users:{номер}:{id}
+
+    def key(self, id) -> str:
+        return f"{self.data}{id}{self.suffix}"
+
+    def batch_key(self, batch, id) -> str:
+        return f"{self.batch}{batch}:{id}"
+
+    def batch_ids(self, batch) -> str:
+        return f"{self.batch}{batch}:ids"
+
+
+USERS = SyncKind("users")
+NEWS_VIEWS = SyncKind("news", ":views")
+
+
+# Write-behind синхронизация: частые счетчики живут в Redis и пакетами переносятся в PostgreSQL
+class SyncEngine:
+    def __init__(self, redis_client, sql_client=None, settings: dict = None):
+        """
+        :param redis_client: RedisClient со счетчиками
+        :param sql_client: SqlClient PostgreSQL (None - только запись счетчиков, без переноса в БД)
+        :param settings: Настройки (по умолчанию - секция "redis_sync" локального конфига)
+        """
+
+        settings = get_config().get("redis_sync", {}) if settings is None else settings
+        self.redis = redis_client
+        self.db = sql_client
+        self.interval = float(settings.get("interval_sec", 10))
+        self.batch_size = min(int(settings.get("batch_size", 1000)), 5000)  # Ограничение unpack() в Lua
+        self.max_batches = int(settings.get("max_batches_per_flush", 50))
+        self.retention = timedelta(days=float(settings.get("marker_retention_days", 7)))
+
+        self._lock = asyncio.Lock()  # Один перенос за раз в процессе
+        self._last_cleanup = 0.0
+
+        # Статистика
+        self.flushed = {USERS.name: 0, NEWS_VIEWS.name: 0}
+        self.skipped_batches = 0
+        self.failed_flushes = 0
+
+    # ============================================================
+    # Запись счетчиков (горячий путь: один round-trip в Redis, без обращения к БД)
+
+    # Учет запроса пользователя: request_total + 1, request_first / request_last (False - Redis недоступен)
+    async def track_request(self, user_id: int, timestamp: Optional[float] = None) -> bool:
+        timestamp = time.time() if timestamp is None else timestamp
+        key = USERS.key(user_id)
+        return await self.redis.batch([
+            ("hincrby", key, "total", 1),
+            ("hsetnx", key, "first", timestamp),
+            ("hset", key, "last", timestamp),
+            ("sadd", USERS.dirty, user_id),
+        ]) is not None
+
+    # Учет просмотра новости пользователем (False - Redis недоступен)
+    async def track_view(self, news_id: int, user_id: int) -> bool:
+        return await self.redis.batch([
+            ("sadd", NEWS_VIEWS.key(news_id), user_id),
+            ("sadd", NEWS_VIEWS.dirty, news_id),
+        ]) is not None
+
+    # ============================================================
+    # Перенос в БД
+
+    # Перенос всех накопленных изменений (сначала незавершенные пакеты прошлых переносов)
+    async def flush(self) -> Dict[str, int]:
+        async with self._lock:
+            result = {}
+            for kind, apply in ((USERS, self._apply_users), (NEWS_VIEWS, self._apply_views)):
+                result[kind.name] = await self._flush_kind(kind, apply)
+            await self._cleanup_markers()
+            return result
+
+    async def _flush_kind(self, kind: SyncKind, apply) -> int:
+        total = 0
+
+        # Пакеты, которые были извлечены, но не записаны (сбой БД или остановка процесса)
+        pending = await self.redis.batch([("lrange", kind.pending, 0, -1)])
+        batches = [int(batch) for batch in (pending[0] if pending else [])]
+
+        for _ in range(self.max_batches):
+            if not batches:
+                batch = await self.redis.run_script(
+                    CLAIM_SCRIPT,
+                    keys=[kind.dirty, kind.pending, kind.sequence],
+                    args=[kind.data, self.batch_size, kind.batch, kind.suffix],
+                )
+                if batch is None:
+                    break
+                batches.append(int(batch))
+
+            batch = batches.pop(0)
+            count = await self._apply_batch(kind, batch, apply)
+            if count is None:
+                self.failed_flushes += 1
+                break  # Пакет остается в pending и будет записан при следующем переносе
+            total += count
+
+        self.flushed[kind.name] += total
+        return total
+
+    # Запись одного пакета и удаление его ключей из Redis
+    async def _apply_batch(self, kind: SyncKind, batch: int, apply) -> Optional[int]:
+        ids_reply = await self.redis.batch([("smembers", kind.batch_ids(batch))])
+        if ids_reply is None:
+            return None
+        ids = sorted(int(id) for id in ids_reply[0])
+
+        count = await apply(batch, ids) if ids else 0
+        if count is None:
+            return None
+
+        await self.redis.batch([
+            ("delete", *[kind.batch_key(batch, id) for id in ids], kind.batch_ids(batch)),
+            ("lrem", kind.pending, 1, batch),
+        ])
+        return count
+
+    # Счетчики пользователей: один INSERT ... ON CONFLICT на пакет, метка пакета в той же транзакции
+    async def _apply_users(self, batch: int, ids: List[int]) -> Optional[int]:
+        values = await self.redis.batch([("hgetall", USERS.batch_key(batch, id)) for id in ids])
+        if values is None:
+            return None
+
+        rows = []
+        for id, data in zip(ids, values):
+            if not data:
+                continue
+            rows.append({
+                "id": id,
+                "request_total": int(data.get(b"total", 0)),
+                "request_first": datetime.fromtimestamp(float(data.get(b"first", data[b"last"])), timezone.utc),
+                "request_last": datetime.fromtimestamp(float(data[b"last"]), timezone.utc),
+            })
+
+        result = await self.db.upsert_many(
+            UsersModel,
+            rows,
+            update_fields=[],
+            update_expressions={
+                "request_total": lambda new: UsersModel.request_total + new.request_total,
+                "request_first": lambda new: func.least(UsersModel.request_first, new.request_first),
+                "request_last": lambda new: func.greatest(UsersModel.request_last, new.request_last),
+            },
+            guard=(SyncBatchModel, {"id": f"{USERS.name}:{batch}"}),
+        )
+        if result == 0 and rows:
+            self.skipped_batches += 1  # Пакет уже был записан до сбоя - повторно не применяем
+        return None if result is None else len(rows)
+
+    # Просмотры новостей: вставка пар (новость, пользователь) без чтения уже записанных просмотров
+    # (повторное применение пакета ничего не меняет - существующие пары пропускаются)
+    async def _apply_views(self, batch: int, ids: List[int]) -> Optional[int]:
+        members = await self.redis.batch([("smembers", NEWS_VIEWS.batch_key(batch, id)) for id in ids])
+        if members is None:
+            return None
+
+        current = await self.db.select_rows(NewsModel, columns=["id"], filters=NewsModel.id.in_(ids))
+        if not current and not self.db.connected:
+            return None
+
+        existing = {row["id"] for row in current}
+        rows = [
+            {"news_id": id, "user_id": int(user)}
+            for id, users in zip(ids, members) if id in existing  # Новость удалена - просмотры отбрасываются
+            for user in users
+        ]
+        return await self.db.add_relations(NewsViewsModel, rows)
+
+    # Удаление старых меток пакетов (не чаще раза в час)
+    async def _cleanup_markers(self):
+        if time.monotonic() - self._last_cleanup < 3600:
+            return
+        self._last_cleanup = time.monotonic()
+        await self.db.delete_where(SyncBatchModel, SyncBatchModel.applied < datetime.now(timezone.utc) - self.retention)
+
+    # Статистика переноса
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "flushed": dict(self.flushed),
+            "skipped_batches": self.skipped_batches,
+            "failed_flushes": self.failed_flushes,
+        }
+
+    # Периодический перенос до сигнала остановки (последний перенос - после сигнала)
+    async def run(self, stop: asyncio.Event):
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                result = await self.flush()
+                if any(result.values()):
+                    lg.info(f"Синхронизация Redis -> SQL: {result}", module="sync_redis_sql")
+            except Exception as e:
+                self.failed_flushes += 1
+                lg.error(f"Ошибка синхронизации Redis -> SQL: {e}", module="sync_redis_sql")
+
+
+# Подключения из настроек API
+def create_engine() -> SyncEngine:
+    pg = settings_client.get_many(tag="postgres")
+    rd = settings_client.get_many(tag="redis")
+    sql = get_client(
+        "postgres",
+        host=pg.get("pg_host"),
+        port=int(pg.get("pg_port")),
+        username=pg.get("pg_username"),
+        password=pg.get("pg_password"),
+        database=pg.get("pg_database"),
+    )
+    redis = get_client(
+        "redis",
+        host=rd.get("rd_host", "localhost"),
+        port=int(rd.get("rd_port", 6379)),
+        username=rd.get("rd_username"),
+        password=rd.get("rd_password"),
+        database=rd.get("rd_database", "0"),
+    )
+    return SyncEngine(redis, sql)
+
+
+async def main():
+    await lg.init_logger()
+    engine = create_engine()
+    await engine.db.connect()
+    await engine.db.create_table_if_not_exists(SyncBatchModel)
+    await engine.db.create_table_if_not_exists(NewsViewsModel)
+
+    # Ожидание сигнала остановки (SIGTERM при деплое, SIGINT из консоли)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    await engine.run(stop)
+    await engine.redis.close()
+    await engine.db.close()
+    await lg.close_logger()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
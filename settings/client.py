@@ -0,0 +1,214 @@
+import asyncio  # Фоновое отслеживание изменений
+import threading  # Блокировка кэша для синхронных вызовов
+import time  # Время жизни записей кэша
+from typing import Dict, Iterable, Optional, Tuple  # Типы данных
+
+import aiohttp  # Асинхронные HTTP запросы (пул соединений)
+import requests  # Синхронные HTTP запросы (keep-alive сессия)
+
+from settings.get_config import get_config  # Получение локального конфига
+
+
+# Запись кэша: ответ /secret/many для одного запроса (набор ключей или тэг)
+class CacheEntry:
+    def __init__(self, data: Dict[str, str], etag: Optional[str], expires: float):
+        self.data = data
+        self.etag = etag
+        self.expires = expires
+
+
+# Клиент API настроек: пул HTTP соединений, кэш с TTL, ревалидация по ETag и инвалидация по изменениям
+class SettingsClient:
+    def __init__(self, base_url: str = None, settings: dict = None):
+        config = get_config()
+        settings = config.get("settings_client", {}) if settings is None else settings
+
+        self.base_url = base_url or f"http://{config['api']['host']}:{config['api']['port']}"
+        self.ttl = float(settings.get("ttl", 60))
+        self.timeout = float(settings.get("timeout", 5))
+        self.watch_timeout = float(settings.get("watch_timeout", 30))
+
+        # Кэш ответов: (ключи, тэг) -> запись
+        self._cache: Dict[Tuple[Tuple[str, ...], Optional[str]], CacheEntry] = {}
+        self._lock = threading.Lock()
+
+        # Сессии создаются при первом запросе
+        self._session: Optional[requests.Session] = None
+        self._async_session: Optional[aiohttp.ClientSession] = None
+
+        # Отслеживание изменений
+        self.version = 0
+        self.boot = None  # Идентификатор запуска API, к которому относится версия
+        self._watch_task: Optional[asyncio.Task] = None
+
+    # Ключ кэша запроса
+    @staticmethod
+    def _cache_key(keys: Optional[Iterable[str]], tag: Optional[str]):
+        return tuple(sorted(keys)) if keys else (), tag
+
+    # Параметры запроса /secret/many
+    @staticmethod
+    def _params(keys: Tuple[str, ...], tag: Optional[str]) -> list:
+        params = [("keys", key) for key in keys]
+        if tag:
+            params.append(("tag", tag))
+        return params
+
+    # Актуальная запись кэша (None - запись устарела или отсутствует)
+    def _fresh(self, cache_key) -> Optional[CacheEntry]:
+        entry = self._cache.get(cache_key)
+        if entry is not None and entry.expires > time.monotonic():
+            return entry
+        return None
+
+    # Сохранение ответа в кэш (status 304 - продление старой записи)
+    def _store(self, cache_key, status: int, data: Optional[Dict[str, str]], etag: Optional[str]) -> Dict[str, str]:
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if status == 304 and entry is not None:
+                entry.expires = time.monotonic() + self.ttl
+                return entry.data
+
+            self._cache[cache_key] = CacheEntry(data, etag, time.monotonic() + self.ttl)
+            return data
+
+    # Заголовки ревалидации для устаревшей записи
+    def _headers(self, cache_key) -> dict:
+        entry = self._cache.get(cache_key)
+        return {"If-None-Match": entry.etag} if entry is not None and entry.etag else {}
+
+    # Синхронное получение значений (используется при запуске сервисов)
+    def get_many(self, keys: Iterable[str] = None, tag: str = None) -> Dict[str, str]:
+        cache_key = self._cache_key(keys, tag)
+        entry = self._fresh(cache_key)
+        if entry is not None:
+            return entry.data
+
+        if self._session is None:
+            self._session = requests.Session()
+
+        response = self._session.get(
+            f"{self.base_url}/secret/many",
+            params=self._params(*cache_key),
+            headers=self._headers(cache_key),
+            timeout=self.timeout,
+        )
+        if response.status_code != 304:
+            response.raise_for_status()
+        data = None if response.status_code == 304 else response.json()
+        return self._store(cache_key, response.status_code, data, response.headers.get("ETag"))
+
+    # Асинхронное получение значений
+    async def aget_many(self, keys: Iterable[str] = None, tag: str = None) -> Dict[str, str]:
+        cache_key = self._cache_key(keys, tag)
+        entry = self._fresh(cache_key)
+        if entry is not None:
+            return entry.data
+
+        session = await self._get_async_session()
+        async with session.get(
+            f"{self.base_url}/secret/many",
+            params=self._params(*cache_key),
+            headers=self._headers(cache_key),
+        ) as response:
+            if response.status != 304:
+                response.raise_for_status()
+            data = None if response.status == 304 else await response.json()
+            return self._store(cache_key, response.status, data, response.headers.get("ETag"))
+
+    # Получение одного значения
+    def get(self, key: str, default=None):
+        return self.get_many([key]).get(key, default)
+
+    async def aget(self, key: str, default=None):
+        return (await self.aget_many([key])).get(key, default)
+
+    # Сброс записей кэша, затронутых изменением (все записи, если ключи неизвестны)
+    def invalidate(self, changes: Iterable[dict] = None):
+        with self._lock:
+            if changes is None:
+                self._cache.clear()
+                return
+
+            keys = {change.get("key") for change in changes}
+            tags = {change.get("tag") for change in changes}
+            for cache_key, entry in list(self._cache.items()):
+                query_keys, query_tag = cache_key
+                if keys.intersection(query_keys) or keys.intersection(entry.data) or query_tag in tags:
+                    del self._cache[cache_key]
+
+    # Запуск фонового отслеживания изменений (long-poll /secret/watch)
+    def start_watch(self) -> asyncio.Task:
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch())
+        return self._watch_task
+
+    async def _watch(self):
+        session = await self._get_async_session()
+        delay = 1
+        while True:
+            try:
+                async with session.get(
+                    f"{self.base_url}/secret/watch",
+                    params={"since": self.version, "boot": self.boot or "", "timeout": self.watch_timeout},
+                    timeout=aiohttp.ClientTimeout(total=self.watch_timeout + self.timeout),
+                ) as response:
+                    response.raise_for_status()
+                    data = await response.json()
+
+                # Сервер перезапущен или пропущены изменения - сбрасываем весь кэш
+                if data.get("reset"):
+                    self.invalidate()
+                elif data.get("changes"):
+                    self.invalidate(data["changes"])
+                self.version = data.get("version", self.version)
+                self.boot = data.get("boot", self.boot)
+                delay = 1
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[SettingsClient][WARNING] Ошибка отслеживания изменений настроек: {e}")
+                self.invalidate()  # Без уведомлений полагаемся только на TTL и ETag
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    # Асинхронная сессия (создается внутри работающего event loop)
+    async def _get_async_session(self) -> aiohttp.ClientSession:
+        if self._async_session is None or self._async_session.closed:
+            self._async_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._async_session
+
+    # Закрытие соединений и остановка отслеживания
+    async def close(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            await asyncio.gather(self._watch_task, return_exceptions=True)
+            self._watch_task = None
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+# Общий на процесс клиент настроек
+_client: Optional[SettingsClient] = None
+
+
+def get_settings_client() -> SettingsClient:
+    global _client
+    if _client is None:
+        _client = SettingsClient()
+    return _client
+
+
+# Синхронное получение значений через общий клиент
+def get_many(keys: Iterable[str] = None, tag: str = None) -> Dict[str, str]:
+    return get_settings_client().get_many(keys, tag)
+
+
+# Асинхронное получение значений через общий клиент
+async def aget_many(keys: Iterable[str] = None, tag: str = None) -> Dict[str, str]:
+    return await get_settings_client().aget_many(keys, tag)
@@ -0,0 +1,383 @@
+import asyncio  # Асинхронный запуск функций
+import json  # Сообщения очереди
+import multiprocessing  # Контекст процессов конвертации
+import signal  # Обработка сигналов остановки
+import subprocess  # Запуск ffmpeg
+import uuid  # Уникальные имена временных файлов
+from concurrent.futures import ProcessPoolExecutor  # Конвертация вне event loop и вне GIL
+from concurrent.futures.process import BrokenProcessPool  # Процесс конвертации аварийно завершился
+from typing import Any, Dict, Optional  # Типы данных
+
+import aio_pika  # Асинхронный движок RabbitMq
+from sqlalchemy.exc import IntegrityError  # Вариант уже создан другим обработчиком
+
+try:
+    from PIL import Image, ImageOps  # Обработка изображений (необязательная зависимость)
+except ImportError:
+    Image = ImageOps = None
+
+from settings.get_config import get_config  # Получение локального конфига
+from database.models.postgresql import KnowledgeModel, BlobVariantsModel  # Модели таблиц БД
+from storage.uploader import BlobStore, add_ref, release_ref  # Хранилище файлов по содержимому
+from logger import sender as lg  # Логер
+
+
+# Настройки конвертации
+config = get_config().get("converter", {})
+QUEUE = config.get("queue", "conversions")
+FFMPEG = config.get("ffmpeg", "ffmpeg")
+FFMPEG_TIMEOUT = float(config.get("ffmpeg_timeout_sec", 600))
+MAX_RETRIES = int(config.get("max_retries", 3))  # Повторы задания при временной ошибке конвертации
+
+# Временные ошибки: повтор задания может пройти (остальные - битый файл, нет кодека или Pillow)
+TEMPORARY_ERRORS = (subprocess.TimeoutExpired, BrokenProcessPool, MemoryError)
+
+
+# Варианты по типу записи: название -> параметры.
+# При изменении параметров меняется и название - результаты старых параметров не переиспользуются.
+VARIANTS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "image": {
+        "webp_1280": {"format": "WEBP", "max_side": 1280, "quality": 80, "content_type": "image/webp"},
+        "jpeg_1280": {"format": "JPEG", "max_side": 1280, "quality": 85, "content_type": "image/jpeg"},
+        "thumb": {"format": "WEBP", "max_side": 320, "quality": 70, "content_type": "image/webp"},
+    },
+    "audio": {
+        "voice": {"codec": "libopus", "bitrate": "48k", "content_type": "audio/ogg"},  # Голосовое сообщение Telegram
+    },
+    "video": {
+        "thumb": {"max_side": 320, "content_type": "image/jpeg"},
+    },
+}
+
+
+# ============================================================
+# Конвертация (выполняется в дочерних процессах)
+
+# Уменьшение и перекодирование изображения (меньшие изображения не увеличиваются)
+def convert_image(source: str, target: str, spec: dict):
+    if Image is None:
+        raise RuntimeError("Пакет Pillow не установлен")
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)  # Поворот по EXIF до удаления метаданных
+        image.thumbnail((spec["max_side"], spec["max_side"]))
+        if spec["format"] == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")  # JPEG без прозрачности
+        image.save(target, spec["format"], quality=spec["quality"], optimize=True)
+
+
+# Перекодирование аудио в OGG/Opus (моно, для голосовых сообщений)
+def convert_audio(source: str, target: str, spec: dict):
+    _ffmpeg(["-i", source, "-vn", "-ac", "1", "-c:a", spec["codec"], "-b:a", spec["bitrate"], "-f", "ogg", target])
+
+
+# Кадр-превью видео (характерный кадр из начала ролика)
+def convert_video(source: str, target: str, spec: dict):
+    side = spec["max_side"]
+    _ffmpeg([
+        "-i", source, "-an", "-frames:v", "1",
+        "-vf", f"thumbnail,scale={side}:{side}:force_original_aspect_ratio=decrease",
+        "-f", "image2", "-c:v", "mjpeg", target,
+    ])
+
+
+def _ffmpeg(args: list):
+    subprocess.run(
+        [FFMPEG, "-nostdin", "-y", "-loglevel", "error", *args],
+        check=True, capture_output=True, timeout=FFMPEG_TIMEOUT,
+    )
+
+
+CONVERTERS = {"image": convert_image, "audio": convert_audio, "video": convert_video}
+
+
+# Точка входа дочернего процесса
+def run_conversion(type_: str, source: str, target: str, spec: dict):
+    CONVERTERS[type_](source, target, spec)
+
+
+# ============================================================
+# Обработка заданий
+
+# Не все варианты созданы (созданные уже сохранены, повтор задания создаст только недостающие)
+class ConversionFailed(Exception):
+    def __init__(self, variants: Dict[str, Dict[str, Any]], errors: Dict[str, Exception]):
+        super().__init__(", ".join(f"{name}: {error!r}" for name, error in errors.items()))
+        self.variants = variants
+        self.errors = errors
+        self.temporary = all(isinstance(error, TEMPORARY_ERRORS) for error in errors.values())
+
+
+# Конвертация блобов в варианты: результат хранится по хэшу исходного содержимого,
+# поэтому одинаковый файл в разных записях конвертируется один раз, а повтор задания ничего не делает
+class Converter:
+    def __init__(self, db, store: BlobStore = None, workers: int = None):
+        """
+        :param db: SqlClient PostgreSQL
+        :param store: Хранилище блобов
+        :param workers: Количество процессов конвертации (по умолчанию - число ядер)
+        """
+
+        self.db = db
+        self.store = store or BlobStore()
+        self.workers = workers or multiprocessing.cpu_count()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+        # Статистика
+        self.converted = 0
+        self.cached = 0
+        self.failed = 0
+
+    # Создание недостающих вариантов блоба (ConnectionError - БД недоступна, задание нужно повторить;
+    # ConversionFailed - часть вариантов не создана)
+    async def convert(self, sha256: str, type_: str) -> Dict[str, Dict[str, Any]]:
+        specs = VARIANTS.get(type_, {})
+        if not specs:
+            return {}
+
+        existing = await self.db.select_rows(BlobVariantsModel, filters=BlobVariantsModel.source == sha256)
+        if not existing and not self.db.connected:
+            raise ConnectionError("База данных недоступна")
+
+        variants = {row["variant"]: row for row in existing}
+        errors = {}
+        self.cached += sum(1 for name in specs if name in variants)
+        for name, spec in specs.items():
+            if name in variants:
+                continue
+            try:
+                variants[name] = await self._convert_one(sha256, type_, name, spec)
+            except ConnectionError:
+                raise
+            except Exception as e:
+                # Ошибка одного варианта: остальные варианты все равно создаются
+                self.failed += 1
+                errors[name] = e
+
+        if errors:
+            raise ConversionFailed(variants, errors)
+        return variants
+
+    async def _convert_one(self, sha256: str, type_: str, name: str, spec: dict) -> Dict[str, Any]:
+        target = self.store.temp_dir / f"{uuid.uuid4().hex}.{name}.part"
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.pool, run_conversion, type_, str(self.store.path_for(sha256)), str(target), spec)
+            stored = await self.store.put_file(target)
+        finally:
+            await asyncio.to_thread(target.unlink, True)
+
+        # Ссылка на результат до записи варианта (как при загрузке файла)
+        if not await add_ref(self.db, stored.sha256, stored.size):
+            raise ConnectionError("База данных недоступна")
+
+        row = {
+            "source": sha256,
+            "variant": name,
+            "sha256": stored.sha256,
+            "size": stored.size,
+            "content_type": spec["content_type"],
+        }
+        try:
+            result = await self.db.insert_model(BlobVariantsModel, row, refresh=False, raise_conflict=True)
+        except IntegrityError:
+            await release_ref(self.db, stored.sha256)  # Вариант уже создан параллельным заданием
+            return row
+        if result is None:
+            await release_ref(self.db, stored.sha256)
+            raise ConnectionError("База данных недоступна")
+
+        self.converted += 1
+        return row
+
+    # Статистика конвертации
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "converted": self.converted, "cached": self.cached, "failed": self.failed}
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+# ============================================================
+# Очередь заданий (RabbitMQ)
+
+def get_rabbitmq_url() -> str:
+    rabbitmq = get_config()["rabbitmq"]
+    return f"amqp://{rabbitmq['username']}:{rabbitmq['password']}@{rabbitmq['host']}:{rabbitmq['port']}/"
+
+
+# Отправка заданий из API (подключение создается при первом задании)
+class JobPublisher:
+    def __init__(self):
+        self.connection = None
+        self.channel = None
+        self._lock = asyncio.Lock()
+        self._connecting: Optional[asyncio.Task] = None
+
+    async def _ensure(self):
+        async with self._lock:
+            if self.channel is None or self.channel.is_closed:
+                self.connection = await aio_pika.connect_robust(get_rabbitmq_url())
+                self.channel = await self.connection.channel(publisher_confirms=True)
+                await self.channel.declare_queue(QUEUE, durable=True)
+
+    # Подключение при запуске приложения (False - RabbitMQ недоступен)
+    async def connect(self) -> bool:
+        try:
+            await self._ensure()
+            return True
+        except Exception as e:
+            lg.warning(f"Нет подключения к RabbitMQ для заданий конвертации: {e}", module="Converter")
+            return False
+
+    # Постановка задания в очередь (False - RabbitMQ недоступен, варианты можно создать позже: backfill).
+    # Подключение не создается на пути запроса: при его отсутствии оно повторяется в фоне
+    async def enqueue(self, sha256: str, type_: str, id: Optional[int] = None) -> bool:
+        if type_ not in VARIANTS:
+            return False
+        if self.connection is None:
+            if self._connecting is None or self._connecting.done():
+                self._connecting = asyncio.create_task(self.connect())
+            return False
+        try:
+            body = json.dumps({"id": id, "sha256": sha256, "type": type_}).encode()
+            await self.channel.default_exchange.publish(
+                aio_pika.Message(body, delivery_mode=aio_pika.DeliveryMode.PERSISTENT, content_type="application/json"),
+                routing_key=QUEUE,
+            )
+            return True
+        except Exception as e:
+            lg.warning(f"Не удалось поставить задание конвертации {sha256}: {e}", module="Converter")
+            return False
+
+    async def close(self):
+        if self._connecting is not None:
+            self._connecting.cancel()
+            await asyncio.gather(self._connecting, return_exceptions=True)
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = self.channel = None
+
+
+publisher = JobPublisher()
+
+
+# Постановка задания в очередь через общий на процесс publisher
+async def enqueue(sha256: str, type_: str, id: Optional[int] = None) -> bool:
+    return await publisher.enqueue(sha256, type_, id)
+
+
+# Постановка заданий для всех файлов базы знаний (уже созданные варианты пропускаются обработчиком)
+async def backfill(db) -> int:
+    if not await publisher.connect():
+        return 0
+    rows = await db.select_rows(KnowledgeModel, columns=["id", "type", "meta"], filters=KnowledgeModel.type.in_(list(VARIANTS)))
+    count = 0
+    for row in rows:
+        sha256 = (row["meta"] or {}).get("sha256")
+        if sha256 and await enqueue(sha256, row["type"], row["id"]):
+            count += 1
+    return count
+
+
+# Обработчик очереди: prefetch = числу процессов, подтверждение после записи вариантов
+async def consume(converter: Converter, stop: asyncio.Event):
+    connection = await aio_pika.connect_robust(get_rabbitmq_url())
+    channel = await connection.channel()
+    await channel.set_qos(prefetch_count=converter.workers)
+    queue = await channel.declare_queue(QUEUE, durable=True)
+    handlers = set()  # Обрабатываемые сообщения (задачи aio_pika)
+
+    async def on_message(message: aio_pika.IncomingMessage):
+        task = asyncio.current_task()
+        handlers.add(task)
+        try:
+            await handle(message)
+        finally:
+            handlers.discard(task)
+
+    async def handle(message: aio_pika.IncomingMessage):
+        try:
+            job = json.loads(message.body)
+            sha256, type_ = job["sha256"], job["type"]
+        except (ValueError, KeyError, TypeError):
+            await message.reject()  # Битое сообщение не возвращаем в очередь
+            return
+
+        try:
+            variants = await converter.convert(sha256, type_)
+            await message.ack()
+            lg.info(f"Варианты {sha256} (id={job.get('id')}): {sorted(variants)}", module="Converter")
+        except ConnectionError:
+            await asyncio.sleep(5)
+            await message.nack(requeue=True)  # БД недоступна - задание будет повторено
+        except ConversionFailed as e:
+            await retry_or_reject(message, sha256, e)
+        except Exception as e:
+            # Неожиданная ошибка: повтор задания приведет к ней же, сообщение не возвращаем в очередь
+            lg.error(f"Ошибка задания конвертации {sha256}: {e}", module="Converter")
+            await message.reject()
+
+    # Временная ошибка: копия задания со счетчиком попыток в заголовке (nack не позволяет изменить заголовки).
+    # Постоянная ошибка или исчерпаны попытки - сообщение отклоняется, варианты можно создать позже: backfill
+    async def retry_or_reject(message: aio_pika.IncomingMessage, sha256: str, failure: ConversionFailed):
+        retries = int((message.headers or {}).get("x-retries", 0))
+        if failure.temporary and retries < MAX_RETRIES:
+            lg.warning(f"Повтор конвертации {sha256} ({retries + 1}/{MAX_RETRIES}): {failure}", module="Converter")
+            await channel.default_exchange.publish(
+                aio_pika.Message(message.body, headers={"x-retries": retries + 1},
+                                 delivery_mode=aio_pika.DeliveryMode.PERSISTENT, content_type="application/json"),
+                routing_key=QUEUE,
+            )
+            await message.ack()
+            return
+
+        lg.error(f"Ошибка конвертации {sha256}: {failure}", module="Converter")
+        await message.reject()
+
+    consumer_tag = await queue.consume(on_message)
+    await stop.wait()
+
+    # Плавная остановка: прекращаем прием, дожидаемся текущих заданий (их ack/nack идут через это подключение)
+    await queue.cancel(consumer_tag)
+    await asyncio.gather(*handlers, return_exceptions=True)
+    await asyncio.to_thread(converter.close)
+    await connection.close()
+
+
+# Запуск обработчика: python -m storage.converter [backfill]
+async def main(command: str):
+    from database.connectors.connector import get_client
+    from settings import client as settings_client
+
+    await lg.init_logger()
+    pg = settings_client.get_many(tag="postgres")
+    db = get_client(
+        "postgres",
+        host=pg.get("pg_host"),
+        port=int(pg.get("pg_port")),
+        username=pg.get("pg_username"),
+        password=pg.get("pg_password"),
+        database=pg.get("pg_database"),
+    )
+    await db.create_table_if_not_exists(BlobVariantsModel)
+
+    if command == "backfill":
+        print(f"[Converter] Поставлено заданий: {await backfill(db)}")
+        await publisher.close()
+    else:
+        # Ожидание сигнала остановки (SIGTERM при деплое, SIGINT из консоли)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        workers = config.get("workers")
+        await consume(Converter(db, workers=int(workers) if workers else None), stop)
+
+    await db.close()
+    await lg.close_logger()
+
+
+if __name__ == "__main__":
+    import sys
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "consume"))
@@ -0,0 +1,270 @@
+import asyncio  # Запись файла вне event loop
+import hashlib  # Хэш содержимого при записи
+import os  # Работа с ОС
+import time  # Возраст временных файлов
+import uuid  # Уникальные имена временных файлов
+from pathlib import Path  # Путь
+from typing import BinaryIO, Iterator  # Типы данных
+
+from settings.get_config import get_config  # Получение локального конфига
+
+
+# Настройки загрузки файлов
+config = get_config().get("storage", {})
+MAX_UPLOAD_SIZE = int(float(config.get("max_upload_mb", 512)) * 1024 * 1024)
+CHUNK_SIZE = int(config.get("chunk_size", 1024 * 1024))
+BLOBS_DIR = Path(config.get("blobs_dir", "storage/blobs"))
+
+
+# Превышен максимальный размер загружаемого файла
+class UploadTooLarge(Exception):
+    def __init__(self, max_size: int):
+        super().__init__(f"Размер файла превышает {max_size} байт")
+        self.max_size = max_size
+
+
+# Результат сохранения файла
+class StoredFile:
+    def __init__(self, path: Path, size: int, sha256: str, created: bool = True):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.created = created  # False - такое содержимое уже было сохранено (дедупликация)
+
+
+# Запись блока и обновление хэша (выполняется в пуле потоков)
+def _write_chunk(handle: BinaryIO, hasher, chunk: bytes):
+    handle.write(chunk)
+    hasher.update(chunk)
+
+
+# Потоковая запись загрузки во временный файл с подсчетом размера и SHA-256
+async def _stream_to_temp(upload, temp: Path, max_size: int, chunk_size: int):
+    # Размер известен заранее (multipart уже разобран) - отказываем без записи
+    known_size = getattr(upload, "size", None)
+    if known_size is not None and known_size > max_size:
+        raise UploadTooLarge(max_size)
+
+    hasher = hashlib.sha256()
+    size = 0
+    handle = await asyncio.to_thread(open, temp, "wb")
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLarge(max_size)
+            await asyncio.to_thread(_write_chunk, handle, hasher, chunk)
+        await asyncio.to_thread(handle.close)
+        return size, hasher.hexdigest()
+
+    except BaseException:
+        # Незавершенная загрузка не оставляет файлов
+        await asyncio.to_thread(handle.close)
+        await asyncio.to_thread(temp.unlink, True)
+        raise
+
+
+# Хранилище файлов по содержимому: blobs/ab/cd/abcd...(sha256), одинаковые файлы хранятся один раз
+class BlobStore:
+    def __init__(self, root: Path = BLOBS_DIR):
+        self.root = Path(root)
+        self.temp_dir = self.root / "tmp"
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+
+    # Путь блоба по хэшу (два уровня каталогов по 256 - не больше нескольких тысяч файлов в папке)
+    def path_for(self, sha256: str) -> Path:
+        sha256 = sha256.lower()
+        if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+            raise ValueError(f"Некорректный SHA-256: {sha256}")
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def exists(self, sha256: str) -> bool:
+        return self.path_for(sha256).exists()
+
+    # Сохранение загрузки: хэш считается при записи, существующий блоб не перезаписывается
+    async def put(self, upload, max_size: int = MAX_UPLOAD_SIZE, chunk_size: int = CHUNK_SIZE) -> StoredFile:
+        temp = self.temp_dir / f"{uuid.uuid4().hex}.part"
+        size, sha256 = await _stream_to_temp(upload, temp, max_size, chunk_size)
+        try:
+            path, created = await asyncio.to_thread(self._publish, temp, sha256)
+        except BaseException:
+            await asyncio.to_thread(temp.unlink, True)
+            raise
+        return StoredFile(path, size, sha256, created)
+
+    # Перенос во временный каталог -> каталог блоба (дубликат удаляется)
+    def _publish(self, temp: Path, sha256: str):
+        target = self.path_for(sha256)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(temp, target)
+            created = True
+        except FileExistsError:
+            os.utime(target)  # Свежий mtime: сборщик мусора не удалит блоб, на который сейчас появится ссылка
+            created = False
+        os.unlink(temp)
+        return target, created
+
+    # Сохранение существующего файла (перенос старых файлов в хранилище)
+    async def put_file(self, source: Path) -> StoredFile:
+        with open(source, "rb") as f:
+            class Reader:
+                size = None
+
+                @staticmethod
+                async def read(n):
+                    return await asyncio.to_thread(f.read, n)
+
+            return await self.put(Reader, max_size=float("inf"))
+
+    # Удаление блоба
+    def delete(self, sha256: str) -> bool:
+        try:
+            self.path_for(sha256).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    # Все блобы хранилища (хэш, путь)
+    def iter_blobs(self) -> Iterator[tuple]:
+        for path in self.root.glob("??/??/*"):
+            if len(path.name) == 64:
+                yield path.name, path
+
+    # Удаление временных файлов прерванных загрузок
+    def clean_temp(self, older_than: float = 3600) -> int:
+        removed = 0
+        for path in self.temp_dir.glob("*.part"):
+            if time.time() - path.stat().st_mtime > older_than:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+# ============================================================
+# Счетчики ссылок на блобы (таблица blobs рядом с knowledge)
+
+# Увеличение счетчика ссылок (запись блоба создается при первой ссылке)
+async def add_ref(db, sha256: str, size: int) -> bool:
+    from sqlalchemy import func  # Импорт здесь: модуль используется и без БД
+    from database.models.postgresql import BlobsModel
+
+    result = await db.upsert_many(
+        BlobsModel,
+        [{"sha256": sha256, "size": size, "refs": 1}],
+        update_fields=[],
+        update_expressions={
+            "refs": lambda new: BlobsModel.refs + 1,
+            "updated": lambda new: func.now(),
+        },
+    )
+    return result is not None
+
+
+# Уменьшение счетчика ссылок (файл удаляет сборщик мусора)
+async def release_ref(db, sha256: str) -> bool:
+    from sqlalchemy import func
+    from database.models.postgresql import BlobsModel
+
+    result = await db.update_where(BlobsModel, {"sha256": sha256}, {"refs": BlobsModel.refs - 1, "updated": func.now()})
+    return bool(result)
+
+
+# Сборка мусора: блобы без ссылок и файлы без записи в таблице старше grace секунд
+async def collect_garbage(db, store: BlobStore, grace: float = 3600) -> dict:
+    from datetime import datetime, timedelta, timezone
+    from database.models.postgresql import BlobsModel, BlobVariantsModel
+
+    deadline = time.time() - grace
+    removed = {"unreferenced": 0, "orphaned": 0, "temp": await asyncio.to_thread(store.clean_temp, grace)}
+
+    # Блобы с нулевым счетчиком: сначала удаляется запись (если счетчик все еще 0), затем файл
+    rows = await db.select_rows(
+        BlobsModel,
+        columns=["sha256"],
+        filters=(BlobsModel.refs <= 0) & (BlobsModel.updated < datetime.now(timezone.utc) - timedelta(seconds=grace)),
+    )
+    for row in rows:
+        path = store.path_for(row["sha256"])
+        if path.exists() and path.stat().st_mtime > deadline:
+            continue  # Содержимое только что загружено повторно - на блоб сейчас появится ссылка
+        if await db.delete_where(BlobsModel, (BlobsModel.sha256 == row["sha256"]) & (BlobsModel.refs <= 0)):
+            await asyncio.to_thread(store.delete, row["sha256"])
+            removed["unreferenced"] += 1
+
+            # Варианты конвертации удаленного файла больше не нужны (их блобы соберет следующий проход)
+            variants = await db.select_rows(BlobVariantsModel, columns=["sha256"],
+                                            filters=BlobVariantsModel.source == row["sha256"])
+            if variants and await db.delete_where(BlobVariantsModel, BlobVariantsModel.source == row["sha256"]):
+                for variant in variants:
+                    await release_ref(db, variant["sha256"])
+
+    # Файлы без записи (загрузка прервалась до создания ссылки).
+    # stream_rows при ошибке БД выбрасывает исключение - с неполным списком записей файлы не трогаем
+    try:
+        known = {row["sha256"] async for row in db.stream_rows(BlobsModel, columns=["sha256"], fetch_size=5000)}
+    except Exception as e:
+        print(f"[Storage] Список блобов не получен, поиск файлов без записи пропущен: {e}")
+        return removed
+    for sha256, path in list(store.iter_blobs()):
+        if sha256 not in known and path.stat().st_mtime < deadline:
+            await asyncio.to_thread(store.delete, sha256)
+            removed["orphaned"] += 1
+    return removed
+
+
+# Перенос файлов старого формата (storage/files/{type}/{name}) в хранилище блобов, имя - в метаданные
+async def migrate_legacy(db, store: BlobStore, files_dir: Path = Path("storage/files")) -> int:
+    from database.models.postgresql import KnowledgeModel
+
+    migrated = 0
+    rows = await db.select_rows(KnowledgeModel, columns=["id", "type", "value", "meta"],
+                                filters=KnowledgeModel.type.in_(["file", "document", "image", "audio", "video", "text", "unknown"]))
+    for row in rows:
+        meta = row["meta"] or {}
+        source = files_dir / row["type"] / row["value"]
+        if meta.get("sha256") or not source.is_file():
+            continue
+
+        stored = await store.put_file(source)
+        if not await add_ref(db, stored.sha256, stored.size):
+            break
+        meta = {**meta, "name": row["value"], "ext": source.suffix, "size": stored.size, "sha256": stored.sha256}
+        if not await db.update_where(KnowledgeModel, {"id": row["id"]}, {"value": stored.sha256, "meta": meta}):
+            await release_ref(db, stored.sha256)
+            break
+
+        await asyncio.to_thread(source.unlink)
+        migrated += 1
+    return migrated
+
+
+# Запуск обслуживания хранилища: python -m storage.uploader gc|migrate
+async def main(command: str):
+    from database.connectors.connector import get_client
+    from settings import client as settings_client
+
+    pg = settings_client.get_many(tag="postgres")
+    db = get_client(
+        "postgres",
+        host=pg.get("pg_host"),
+        port=int(pg.get("pg_port")),
+        username=pg.get("pg_username"),
+        password=pg.get("pg_password"),
+        database=pg.get("pg_database"),
+    )
+    store = BlobStore()
+
+    if command == "migrate":
+        print(f"[Storage] Перенесено файлов: {await migrate_legacy(db, store)}")
+    else:
+        print(f"[Storage] Удалено: {await collect_garbage(db, store, float(config.get('gc_grace_sec', 3600)))}")
+    await db.close()
+
+
+if __name__ == "__main__":
+    import sys
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "gc"))